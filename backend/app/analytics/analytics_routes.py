@@ -1,23 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Optional
 from uuid import UUID
 from app.dependencies import get_db
 from app.auth.dependencies import require_faculty, require_student, get_current_user
 from app.models.user import User
+from app.models.subject import Subject
 from app.analytics.schemas import (
     FacultyOverviewResponse,
     StudentDetailResponse,
     TopicHeatmapResponse,
+    TopicTrendResponse,
     LeaderboardResponse,
-    StudentSelfInsightsResponse
+    StudentSelfInsightsResponse,
+    AnalyticsCacheStatsResponse
 )
 from app.analytics.analytics_service import (
     get_faculty_overview,
     get_student_detail,
     get_topics_heatmap,
+    get_topic_trend,
     get_leaderboard,
-    get_student_self_insights
+    get_student_self_insights,
+    LEADERBOARD_DEFAULT_LIMIT,
+    LEADERBOARD_MAX_LIMIT
 )
+from app.analytics.result_cache import cached, get_cache_stats
+from app.analytics.export import EXPORT_FORMATS, stream_export
 
 router = APIRouter()
 
@@ -39,7 +49,7 @@ def faculty_overview(
     
     Access: Faculty only
     """
-    return get_faculty_overview(db)
+    return cached("faculty_overview", (), ("answers", "capabilities"), lambda: get_faculty_overview(db))
 
 
 @router.get("/faculty/student/{student_id}", response_model=StudentDetailResponse)
@@ -61,7 +71,10 @@ def faculty_student_detail(
     Access: Faculty only
     """
     try:
-        return get_student_detail(db, student_id)
+        return cached(
+            "faculty_student_detail", student_id, ("capabilities", "feedback"),
+            lambda: get_student_detail(db, student_id)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,11 +100,89 @@ def faculty_topics_heatmap(
     
     Access: Faculty only
     """
-    return get_topics_heatmap(db)
+    return cached(
+        "faculty_topics_heatmap", (), ("answers", "capabilities", "feedback"),
+        lambda: get_topics_heatmap(db)
+    )
+
+
+@router.get("/faculty/topics/{topic_id}/trend", response_model=TopicTrendResponse)
+def faculty_topic_trend(
+    topic_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_faculty)
+):
+    """
+    Weekly Topic Trend for Faculty
+    
+    Returns, for each of the last 12 weeks:
+    - Answers submitted
+    - Accuracy (% of graded answers correct)
+    - Partial attempt rate
+    - Average progress
+    
+    Read from the daily rollups, which trail live data by a few minutes
+    (python -m app.utils.daily_rollups).
+    
+    Access: Faculty only
+    """
+    try:
+        # Rollups are written by a separate job, so only the TTL expires these entries
+        return cached("faculty_topic_trend", topic_id, (), lambda: get_topic_trend(db, topic_id))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
+@router.get("/faculty/export")
+def faculty_export(
+    export_format: str = Query("csv", alias="format", description="csv or ndjson"),
+    subject_id: Optional[UUID] = Query(None, description="Export this subject's topics only"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_faculty)
+):
+    """
+    Cohort Export for Faculty
+    
+    Streams one row per student and topic:
+    - Student id, name and email
+    - Subject and topic
+    - Capability level and streak
+    - Answers, graded answers, correct answers and accuracy (%)
+    
+    Rows are streamed as they are read, so the export starts immediately
+    and works the same for any cohort size. Answer counts come from the
+    daily rollups and trail live data by a few minutes.
+    
+    Access: Faculty only
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be csv or ndjson"
+        )
+    if subject_id is not None and db.get(Subject, subject_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subject not found"
+        )
+    
+    return StreamingResponse(
+        stream_export(export_format, subject_id),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="cohort_export.{export_format}"'}
+    )
 
 
 @router.get("/leaderboard", response_model=LeaderboardResponse)
 def leaderboard(
+    limit: int = Query(LEADERBOARD_DEFAULT_LIMIT, ge=1, le=LEADERBOARD_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    around: Optional[str] = Query(None, description="'me' centres the page on the current student"),
+    subject_id: Optional[UUID] = Query(None, description="Rank on this subject's topics only"),
+    topic_id: Optional[UUID] = Query(None, description="Rank on this topic only"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -103,15 +194,41 @@ def leaderboard(
     - Learning streak
     - Learning consistency
     
+    Query parameters:
+    - limit / offset: page of the ranking (default: top 50)
+    - around=me: page centred on the current student instead of starting at offset
+    - subject_id or topic_id: leaderboard of one subject or topic
+    
     Returns:
     - Rank
     - Student name
     - Capability score
     - Streak
+    - total (students ranked) and my_rank (the current student's rank, if ranked)
     
     Access: Authenticated users (students and faculty)
     """
-    return get_leaderboard(db)
+    if subject_id is not None and topic_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide at most one of subject_id or topic_id"
+        )
+    if around is not None and around != "me":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="around only supports 'me'"
+        )
+    
+    try:
+        return get_leaderboard(
+            db, limit, offset, subject_id, topic_id,
+            student_id=current_user.id, around_student=around == "me"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
 
 
 @router.get("/student/self", response_model=StudentSelfInsightsResponse)
@@ -139,9 +256,26 @@ def student_self_insights(
     Access: Student only (shows own data)
     """
     try:
-        return get_student_self_insights(db, current_user.id)
+        return cached(
+            "student_self_insights", current_user.id, ("answers", "capabilities", "feedback"),
+            lambda: get_student_self_insights(db, current_user.id)
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+
+
+@router.get("/cache/stats", response_model=AnalyticsCacheStatsResponse)
+def analytics_cache_stats(
+    current_user: User = Depends(require_faculty)
+):
+    """
+    Analytics result cache metrics for this process: hit ratio, coalesced
+    misses and recompute durations per endpoint, evictions and the current
+    data versions.
+    
+    Access: Faculty only
+    """
+    return get_cache_stats()
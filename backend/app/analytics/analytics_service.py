@@ -1,19 +1,25 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, desc
-from typing import List, Dict, Tuple
+from sqlalchemy import Date, Float, Integer, Select, func, case, cast, desc, and_, literal, null, select, union_all
+from typing import List, Dict, Optional, Tuple
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from app.models.user import User, UserRole
 from app.models.capability import CapabilityScore
 from app.models.assessment import AssessmentAttempt, AssessmentStatus
 from app.models.answer_attempt import AnswerAttempt
 from app.models.feedback import Feedback, GapType
+from app.models.nlp_analysis import NLPAnalysis
 from app.models.topic import Topic
 from app.models.subject import Subject
+from app.analytics.topic_stats import load_topic_stats, most_common_gap
+from app.analytics.capability_history import load_student_growth, load_topic_growth
+from app.analytics.daily_rollups import COUNTER_COLUMNS as ROLLUP_COUNTER_COLUMNS, load_topic_days, student_days_select
+from app.analytics.leaderboard import GLOBAL_SCOPE, get_board
+from app.analytics.result_cache import cached
 from app.analytics.schemas import (
     FacultyOverviewResponse, TopicDifficulty, TopicImprovement,
     StudentDetailResponse, TopicCapability, FeedbackSummary, DetectedGap, TrendMetric,
-    TopicHeatmapResponse, TopicHeatmapItem,
+    TopicHeatmapResponse, TopicHeatmapItem, TopicTrendResponse, TopicTrendWeek,
     LeaderboardResponse, LeaderboardEntry,
     StudentSelfInsightsResponse, LearningWheelMetric, WeakTopic, RecommendedConcept
 )
@@ -24,17 +30,191 @@ HIGH_FAILURE_THRESHOLD = 0.6
 MEDIUM_FAILURE_THRESHOLD = 0.4
 LOW_CAPABILITY_THRESHOLD = 40
 MEDIUM_CAPABILITY_THRESHOLD = 60
-CAPABILITY_WEIGHT = 0.7
-STREAK_WEIGHT = 0.3
 STREAK_TO_SCORE_MULTIPLIER = 10
 DIFFICULT_QUESTION_THRESHOLD = 7
 LOW_CAPABILITY_CUTOFF = 50
 HIGH_CAPABILITY_CUTOFF = 80
 TREND_ANALYSIS_WINDOW_DAYS = 30
+TREND_WEEKS = 12
+LEARNING_BASELINE = 50
+LEADERBOARD_DEFAULT_LIMIT = 50
+LEADERBOARD_MAX_LIMIT = 500
+
+
+def _weekly_nlp_select(student_id: UUID, now: datetime, week_ends: List[datetime]) -> Select:
+    """
+    SELECT of the average originality and confidence scores of a student's
+    analyzed answers per week (week_offset 0 is the most recent), bucketed in SQL.
+    """
+    week_bucket = case(
+        *[
+            (NLPAnalysis.analyzed_at >= week_end - timedelta(days=7), week_offset)
+            for week_offset, week_end in enumerate(week_ends)
+        ],
+        else_=None
+    )
+    return select(
+        week_bucket.label('week_offset'),
+        func.avg(NLPAnalysis.originality_score).label('avg_originality'),
+        func.avg(NLPAnalysis.confidence_score).label('avg_confidence')
+    ).where(
+        NLPAnalysis.user_id == student_id,
+        NLPAnalysis.analyzed_at >= now - timedelta(days=TREND_WEEKS * 7),
+        NLPAnalysis.analyzed_at < now
+    ).group_by(week_bucket)
+
+
+def _weekly_rollups(days: List, today: date) -> List[Optional[Dict[str, int]]]:
+    """
+    Daily rollup rows summed into TREND_WEEKS weeks ending today, oldest
+    first (None for weeks without answers). Week 0 is the last 7 days.
+    """
+    weeks: List[Optional[Dict[str, int]]] = [None] * TREND_WEEKS
+    for day in days:
+        week_offset = (today - day.day).days // 7
+        if not 0 <= week_offset < TREND_WEEKS:
+            continue
+        week = weeks[week_offset]
+        if week is None:
+            week = weeks[week_offset] = dict.fromkeys(ROLLUP_COUNTER_COLUMNS, 0)
+        for column in ROLLUP_COUNTER_COLUMNS:
+            week[column] += getattr(day, column) or 0
+    return weeks[::-1]
+
+
+def _week_label(today: date, weeks_ago: int) -> str:
+    return (today - timedelta(days=weeks_ago * 7)).strftime('%Y-%m-%d')
+
+
+def get_weekly_trends(db: Session, student_id: UUID) -> Tuple[List[TrendMetric], ...]:
+    """
+    Weekly originality, confidence, accuracy and progress trends of a
+    student over the last TREND_WEEKS weeks, oldest first, in one query:
+    - originality / confidence: average NLP scores (0-100) of the analyzed
+      answers, per week ending now, from nlp_analysis
+    - accuracy (% of graded answers correct) / progress (average %): from the
+      student_topic_daily rollup, at most one row per day
+    The two reads are combined with UNION ALL (rows tagged by source, the
+    other source's columns NULL). Weeks without data have a value of 0.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    week_ends = [now - timedelta(days=week_offset * 7) for week_offset in range(TREND_WEEKS)]
+    
+    nlp_weeks = _weekly_nlp_select(student_id, now, week_ends).subquery()
+    days = student_days_select(student_id, today - timedelta(days=TREND_WEEKS * 7 - 1)).subquery()
+    rows = db.execute(union_all(
+        select(
+            literal('nlp').label('source'),
+            nlp_weeks.c.week_offset,
+            nlp_weeks.c.avg_originality,
+            nlp_weeks.c.avg_confidence,
+            cast(null(), Date).label('day'),
+            *[cast(null(), Integer).label(column) for column in ROLLUP_COUNTER_COLUMNS]
+        ),
+        select(
+            literal('answers'),
+            cast(null(), Integer),
+            cast(null(), Float),
+            cast(null(), Float),
+            days.c.day,
+            *[days.c[column] for column in ROLLUP_COUNTER_COLUMNS]
+        )
+    )).all()
+    
+    by_week = {row.week_offset: row for row in rows if row.source == 'nlp'}
+    originality_trend = []
+    confidence_trend = []
+    for week_offset in range(TREND_WEEKS - 1, -1, -1):
+        date_label = week_ends[week_offset].strftime('%Y-%m-%d')
+        row = by_week.get(week_offset)
+        originality_trend.append(TrendMetric(
+            date=date_label,
+            value=float(row.avg_originality) if row else 0.0
+        ))
+        confidence_trend.append(TrendMetric(
+            date=date_label,
+            value=float(row.avg_confidence) if row else 0.0
+        ))
+    
+    answer_days = [row for row in rows if row.source == 'answers']
+    accuracy_trend = []
+    progress_trend = []
+    for index, week in enumerate(_weekly_rollups(answer_days, today)):
+        date_label = _week_label(today, TREND_WEEKS - 1 - index)
+        accuracy_trend.append(TrendMetric(
+            date=date_label,
+            value=float(week["correct"]) / week["graded"] * 100 if week and week["graded"] else 0.0
+        ))
+        progress_trend.append(TrendMetric(
+            date=date_label,
+            value=float(week["progress_sum"]) / week["progress_count"] if week and week["progress_count"] else 0.0
+        ))
+    
+    return originality_trend, confidence_trend, accuracy_trend, progress_trend
+
+
+def get_topic_trend(db: Session, topic_id: UUID) -> TopicTrendResponse:
+    """
+    Weekly answer activity of a topic over the last TREND_WEEKS weeks,
+    oldest first, from the topic_daily rollup (at most one row per day).
+    Raises ValueError if the topic does not exist.
+    """
+    topic = db.query(Topic.name).filter(Topic.id == topic_id).first()
+    if topic is None:
+        raise ValueError("Topic not found")
+    
+    today = datetime.utcnow().date()
+    days = load_topic_days(db, topic_id, today - timedelta(days=TREND_WEEKS * 7 - 1))
+    
+    weeks = []
+    for index, week in enumerate(_weekly_rollups(days, today)):
+        week = week or dict.fromkeys(ROLLUP_COUNTER_COLUMNS, 0)
+        weeks.append(TopicTrendWeek(
+            date=_week_label(today, TREND_WEEKS - 1 - index),
+            attempts=week["attempts"],
+            accuracy=float(week["correct"]) / week["graded"] * 100 if week["graded"] else 0.0,
+            partial_rate=float(week["partials"]) / week["attempts"] if week["attempts"] else 0.0,
+            average_progress=float(week["progress_sum"]) / week["progress_count"] if week["progress_count"] else 0.0
+        ))
+    
+    return TopicTrendResponse(topic_id=topic_id, topic_name=topic.name, weeks=weeks)
+
+
+def load_student_capabilities(db: Session, student_id: UUID) -> Tuple[str, List]:
+    """
+    A student's name and capability rows in one query (the student outer-joined
+    to their scores and topics). Rows are (topic_id, topic_name, capability_level,
+    streak) tuples. Raises ValueError if the student does not exist.
+    """
+    rows = db.query(
+        User.name,
+        CapabilityScore.topic_id,
+        Topic.name.label('topic_name'),
+        CapabilityScore.capability_level,
+        CapabilityScore.streak
+    ).outerjoin(
+        CapabilityScore, CapabilityScore.user_id == User.id
+    ).outerjoin(
+        Topic, Topic.id == CapabilityScore.topic_id
+    ).filter(
+        User.id == student_id,
+        User.role == UserRole.student
+    ).all()
+    
+    if not rows:
+        raise ValueError("Student not found")
+    return rows[0].name, [row for row in rows if row.topic_id is not None]
+
+
+def _average(values: List) -> Optional[float]:
+    """Mean of the non-null values, or None (like SQL AVG)."""
+    values = [value for value in values if value is not None]
+    return float(sum(values)) / len(values) if values else None
 
 
 def get_faculty_overview(db: Session) -> FacultyOverviewResponse:
-    """Calculate faculty dashboard overview metrics."""
+    """Calculate faculty dashboard overview metrics (per-topic figures come from topic_stats)."""
     
     # Total students
     total_students = db.query(func.count(User.id)).filter(User.role == UserRole.student).scalar() or 0
@@ -44,67 +224,38 @@ def get_faculty_overview(db: Session) -> FacultyOverviewResponse:
         AssessmentAttempt.status == AssessmentStatus.in_progress
     ).scalar() or 0
     
+    # Per-topic counters from the topic_stats rollup (one query for all topics)
+    topic_stats = load_topic_stats(db)
+    
     # Average capability score across all students
-    avg_capability = db.query(func.avg(CapabilityScore.capability_level)).scalar() or 0.0
+    capability_sum = sum(row.capability_sum for row in topic_stats)
+    capability_count = sum(row.capability_count for row in topic_stats)
+    avg_capability = capability_sum / capability_count if capability_count else 0.0
     
     # Most difficult topics (based on failure rate)
-    # Simplified approach: iterate through topics and calculate failure rates
-    topics = db.query(Topic).all()
-    difficult_topics = []
-    
-    for topic in topics:
-        from app.models.question import Question
-        # Count total attempts for this topic
-        total_attempts = db.query(func.count(AnswerAttempt.id)).join(
-            Question, Question.id == AnswerAttempt.question_id
-        ).filter(
-            Question.topic_id == topic.id
-        ).scalar() or 0
-        
-        if total_attempts > 0:
-            # Count failures for this topic
-            failures = db.query(func.count(AnswerAttempt.id)).join(
-                Question, Question.id == AnswerAttempt.question_id
-            ).filter(
-                Question.topic_id == topic.id,
-                AnswerAttempt.is_correct == False
-            ).scalar() or 0
-            
-            failure_rate = float(failures) / float(total_attempts)
-            difficult_topics.append(TopicDifficulty(
-                topic_id=topic.id,
-                topic_name=topic.name,
-                failure_rate=failure_rate
-            ))
+    difficult_topics = [
+        TopicDifficulty(
+            topic_id=row.topic_id,
+            topic_name=row.topic_name,
+            failure_rate=float(row.failures) / float(row.attempts)
+        )
+        for row in topic_stats
+        if row.attempts > 0
+    ]
     
     difficult_topics.sort(key=lambda x: x.failure_rate, reverse=True)
     most_difficult = difficult_topics[:5]
     
-    # Most improved topics (based on capability growth)
+    # Most improved topics (capability growth over the trend window, from capability_history)
     thirty_days_ago = datetime.utcnow() - timedelta(days=TREND_ANALYSIS_WINDOW_DAYS)
     
-    improved_topics_query = db.query(
-        Topic.id,
-        Topic.name,
-        func.avg(case(
-            (CapabilityScore.last_updated >= thirty_days_ago, CapabilityScore.capability_level),
-            else_=None
-        )).label('recent_avg'),
-        func.avg(case(
-            (CapabilityScore.last_updated < thirty_days_ago, CapabilityScore.capability_level),
-            else_=None
-        )).label('old_avg')
-    ).join(
-        CapabilityScore, CapabilityScore.topic_id == Topic.id
-    ).group_by(Topic.id, Topic.name).all()
-    
     improved_topics = []
-    for topic in improved_topics_query:
-        if topic.recent_avg is not None and topic.old_avg is not None and topic.old_avg > 0:
-            improvement = (float(topic.recent_avg) - float(topic.old_avg)) / float(topic.old_avg)
+    for topic in load_topic_growth(db, thirty_days_ago):
+        if topic.start_avg is not None and topic.start_avg > 0:
+            improvement = (float(topic.end_avg) - float(topic.start_avg)) / float(topic.start_avg)
             improved_topics.append(TopicImprovement(
-                topic_id=topic.id,
-                topic_name=topic.name,
+                topic_id=topic.topic_id,
+                topic_name=topic.topic_name,
                 improvement_rate=improvement
             ))
     
@@ -121,36 +272,25 @@ def get_faculty_overview(db: Session) -> FacultyOverviewResponse:
 
 
 def get_student_detail(db: Session, student_id: UUID) -> StudentDetailResponse:
-    """Get detailed analytics for a specific student."""
+    """
+    Get detailed analytics for a specific student, in four queries: the student
+    with their capabilities, recent feedback, gap counts, and the weekly NLP
+    and answer trends.
+    """
     
-    # Get student info
-    student = db.query(User).filter(User.id == student_id, User.role == UserRole.student).first()
-    if not student:
-        raise ValueError("Student not found")
+    # Student info and topic-wise capabilities
+    student_name, capabilities = load_student_capabilities(db, student_id)
     
     # Overall capability score
-    overall_capability = db.query(func.avg(CapabilityScore.capability_level)).filter(
-        CapabilityScore.user_id == student_id
-    ).scalar() or 0.0
-    
-    # Topic-wise capabilities
-    topic_caps = db.query(
-        CapabilityScore.topic_id,
-        Topic.name,
-        CapabilityScore.capability_level
-    ).join(
-        Topic, Topic.id == CapabilityScore.topic_id
-    ).filter(
-        CapabilityScore.user_id == student_id
-    ).all()
+    overall_capability = _average([cap.capability_level for cap in capabilities]) or 0.0
     
     topic_capabilities = [
         TopicCapability(
-            topic_id=tc.topic_id,
-            topic_name=tc.name,
-            capability_level=tc.capability_level
+            topic_id=cap.topic_id,
+            topic_name=cap.topic_name,
+            capability_level=cap.capability_level
         )
-        for tc in topic_caps
+        for cap in capabilities
     ]
     
     # Recent feedback (last 10)
@@ -197,92 +337,32 @@ def get_student_detail(db: Session, student_id: UUID) -> StudentDetailResponse:
         for g in gaps_query
     ]
     
-    # Originality trend (based on actual assessment completion patterns)
-    # Note: Full NLP-based originality analysis to be implemented in future iteration
-    originality_trend = []
-    
-    # Confidence trend (based on actual completion rates and progress)
-    # Calculate from assessment attempts over time
-    confidence_trend = []
-    for week_offset in range(11, -1, -1):
-        week_start = datetime.utcnow() - timedelta(days=week_offset * 7 + 7)
-        week_end = datetime.utcnow() - timedelta(days=week_offset * 7)
-        
-        week_attempts = db.query(func.count(AssessmentAttempt.id)).filter(
-            AssessmentAttempt.user_id == student_id,
-            AssessmentAttempt.started_at >= week_start,
-            AssessmentAttempt.started_at < week_end
-        ).scalar() or 0
-        
-        week_completed = db.query(func.count(AssessmentAttempt.id)).filter(
-            AssessmentAttempt.user_id == student_id,
-            AssessmentAttempt.started_at >= week_start,
-            AssessmentAttempt.started_at < week_end,
-            AssessmentAttempt.status == AssessmentStatus.completed
-        ).scalar() or 0
-        
-        confidence_value = float(week_completed) / float(week_attempts) if week_attempts > 0 else 0.0
-        confidence_trend.append(TrendMetric(
-            date=week_end.strftime('%Y-%m-%d'),
-            value=confidence_value
-        ))
+    # Originality and confidence trends from the persisted NLP scores,
+    # accuracy and progress trends from the daily rollup
+    originality_trend, confidence_trend, accuracy_trend, progress_trend = get_weekly_trends(db, student_id)
     
     return StudentDetailResponse(
         student_id=student_id,
-        student_name=student.name,
+        student_name=student_name,
         overall_capability_score=float(overall_capability),
         topic_capabilities=topic_capabilities,
         recent_feedback=recent_feedback,
         detected_gaps=detected_gaps,
         originality_trend=originality_trend,
-        confidence_trend=confidence_trend
+        confidence_trend=confidence_trend,
+        accuracy_trend=accuracy_trend,
+        progress_trend=progress_trend
     )
 
 
 def get_topics_heatmap(db: Session) -> TopicHeatmapResponse:
-    """Generate topic heatmap with difficulty and intervention metrics."""
-    
-    from app.models.question import Question
+    """Generate topic heatmap with difficulty and intervention metrics, from the topic_stats rollup."""
     
-    topics = db.query(Topic).all()
     heatmap_items = []
     
-    for topic in topics:
-        # Average capability for this topic
-        avg_cap = db.query(func.avg(CapabilityScore.capability_level)).filter(
-            CapabilityScore.topic_id == topic.id
-        ).scalar() or 0.0
-        
-        # Failure rate for this topic
-        total_attempts = db.query(func.count(AnswerAttempt.id)).join(
-            Question, Question.id == AnswerAttempt.question_id
-        ).filter(
-            Question.topic_id == topic.id
-        ).scalar() or 0
-        
-        failed_attempts = db.query(func.count(AnswerAttempt.id)).join(
-            Question, Question.id == AnswerAttempt.question_id
-        ).filter(
-            Question.topic_id == topic.id,
-            AnswerAttempt.is_correct == False
-        ).scalar() or 0
-        
-        failure_rate = float(failed_attempts) / float(total_attempts) if total_attempts > 0 else 0.0
-        
-        # Most common gap type
-        common_gap = db.query(
-            Feedback.gap_type,
-            func.count(Feedback.id).label('count')
-        ).join(
-            AnswerAttempt, AnswerAttempt.id == Feedback.answer_attempt_id
-        ).join(
-            Question, Question.id == AnswerAttempt.question_id
-        ).filter(
-            Question.topic_id == topic.id,
-            Feedback.gap_type.isnot(None)
-        ).group_by(Feedback.gap_type).order_by(desc('count')).first()
-        
-        most_common_gap = common_gap.gap_type.value if common_gap else None
+    for row in load_topic_stats(db):
+        avg_cap = row.capability_sum / row.capability_count if row.capability_count else 0.0
+        failure_rate = float(row.failures) / float(row.attempts) if row.attempts > 0 else 0.0
         
         # Recommended intervention level based on failure rate and capability
         if failure_rate > HIGH_FAILURE_THRESHOLD or avg_cap < LOW_CAPABILITY_THRESHOLD:
@@ -293,144 +373,110 @@ def get_topics_heatmap(db: Session) -> TopicHeatmapResponse:
             intervention = "low"
         
         heatmap_items.append(TopicHeatmapItem(
-            topic_id=topic.id,
-            topic_name=topic.name,
+            topic_id=row.topic_id,
+            topic_name=row.topic_name,
             average_capability=float(avg_cap),
             failure_rate=failure_rate,
-            most_common_gap_type=most_common_gap,
+            most_common_gap_type=most_common_gap(row),
             recommended_intervention_level=intervention
         ))
     
     return TopicHeatmapResponse(topics=heatmap_items)
 
 
-def get_leaderboard(db: Session) -> LeaderboardResponse:
-    """Generate student leaderboard based on capability growth and consistency."""
-    
-    # Calculate capability growth (current vs initial)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=TREND_ANALYSIS_WINDOW_DAYS)
-    
-    students_query = db.query(
-        User.id,
-        User.name,
-        func.avg(CapabilityScore.capability_level).label('current_capability'),
-        func.max(CapabilityScore.streak).label('max_streak')
-    ).join(
-        CapabilityScore, CapabilityScore.user_id == User.id
-    ).filter(
-        User.role == UserRole.student
-    ).group_by(User.id, User.name).all()
-    
-    leaderboard_entries = []
-    for student in students_query:
-        # Calculate growth (simplified - in reality would compare initial vs current)
-        capability_score = float(student.current_capability or 0)
-        streak = student.max_streak or 0
-        
-        # Combined score for ranking: capability (70%) + streak contribution (30%)
-        combined_score = capability_score * CAPABILITY_WEIGHT + streak * STREAK_WEIGHT
-        
-        leaderboard_entries.append({
-            'student_id': student.id,
-            'student_name': student.name,
-            'capability_score': capability_score,
-            'streak': streak,
-            'combined_score': combined_score
-        })
-    
-    # Sort by combined score
-    leaderboard_entries.sort(key=lambda x: x['combined_score'], reverse=True)
-    
-    # Add ranks
-    leaderboard = [
-        LeaderboardEntry(
-            rank=idx + 1,
-            student_id=entry['student_id'],
-            student_name=entry['student_name'],
-            capability_score=entry['capability_score'],
-            streak=entry['streak']
-        )
-        for idx, entry in enumerate(leaderboard_entries)
-    ]
+def get_leaderboard(db: Session, limit: int = LEADERBOARD_DEFAULT_LIMIT, offset: int = 0,
+                    subject_id: Optional[UUID] = None, topic_id: Optional[UUID] = None,
+                    student_id: Optional[UUID] = None, around_student: bool = False) -> LeaderboardResponse:
+    """
+    Page of the student leaderboard, ranked by capability and streak (see
+    app/analytics/leaderboard.py), overall or for one subject or topic.
+    student_id: the caller, whose rank is returned as my_rank; with
+    around_student, the page is centred on them instead of starting at offset.
+    Raises ValueError if around_student is set and the student is not ranked.
+    """
+    scope = GLOBAL_SCOPE
+    if topic_id is not None:
+        scope = ("topic", topic_id)
+    elif subject_id is not None:
+        scope = ("subject", subject_id)
+    board = get_board(db, scope)
+    
+    my_rank = board.rank(student_id) if student_id is not None else None
+    if around_student:
+        if my_rank is None:
+            raise ValueError("You are not ranked on this leaderboard")
+        offset = max(0, min(my_rank - 1 - limit // 2, len(board) - limit))
+    
+    def build_page() -> LeaderboardResponse:
+        leaderboard = [
+            LeaderboardEntry(
+                rank=rank,
+                student_id=entry_student_id,
+                student_name=student_name,
+                capability_score=capability_score,
+                streak=streak
+            )
+            for rank, entry_student_id, (student_name, capability_score, streak) in board.page(offset, limit)
+        ]
+        return LeaderboardResponse(leaderboard=leaderboard, total=len(board), offset=offset)
     
-    return LeaderboardResponse(leaderboard=leaderboard)
+    # The page is shared by every caller (a rebuilt board is a new key); my_rank is per caller
+    page = cached("leaderboard", (scope, board.built_at, offset, limit), ("capabilities",), build_page)
+    return page.model_copy(update={"my_rank": my_rank})
 
 
 def get_student_self_insights(db: Session, student_id: UUID) -> StudentSelfInsightsResponse:
-    """Generate self-insights for a student."""
-    
-    # Verify student exists
-    student = db.query(User).filter(User.id == student_id, User.role == UserRole.student).first()
-    if not student:
-        raise ValueError("Student not found")
-    
-    # Learning wheel metrics (5 dimensions)
+    """
+    Generate self-insights for a student, in four queries: the student with
+    their capabilities (consistency, strengths, weak topics), their capability
+    growth from capability_history (learning), one conditional aggregation
+    over their answers (IQ, accuracy, originality), and the recommended
+    topics from feedback.
+    """
     
     from app.models.question import Question
     
-    # 1. IQ (reasoning quality) - based on correct answers to difficult questions
-    correct_difficult = db.query(func.count(AnswerAttempt.id)).join(
-        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
-    ).join(
-        Question, Question.id == AnswerAttempt.question_id
-    ).filter(
-        AssessmentAttempt.user_id == student_id,
-        AnswerAttempt.is_correct == True,
-        Question.difficulty_level >= DIFFICULT_QUESTION_THRESHOLD
-    ).scalar() or 0
-    
-    total_difficult = db.query(func.count(AnswerAttempt.id)).join(
+    thirty_days_ago = datetime.utcnow() - timedelta(days=TREND_ANALYSIS_WINDOW_DAYS)
+    _, capabilities = load_student_capabilities(db, student_id)
+    growth = load_student_growth(db, student_id, thirty_days_ago)
+    
+    # Accuracy and difficulty splits of the student's answers, with their average NLP originality
+    difficult = Question.difficulty_level >= DIFFICULT_QUESTION_THRESHOLD
+    answer_stats = db.query(
+        func.count(case((difficult, AnswerAttempt.id))).label('total_difficult'),
+        func.count(case((and_(difficult, AnswerAttempt.is_correct == True), AnswerAttempt.id))).label('correct_difficult'),
+        func.count(AnswerAttempt.is_correct).label('graded'),
+        func.count(case((AnswerAttempt.is_correct == True, AnswerAttempt.id))).label('correct'),
+        func.avg(NLPAnalysis.originality_score).label('avg_originality')
+    ).select_from(AnswerAttempt).join(
         AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
-    ).join(
+    ).outerjoin(
         Question, Question.id == AnswerAttempt.question_id
+    ).outerjoin(
+        NLPAnalysis, NLPAnalysis.answer_attempt_id == AnswerAttempt.id
     ).filter(
-        AssessmentAttempt.user_id == student_id,
-        Question.difficulty_level >= DIFFICULT_QUESTION_THRESHOLD
-    ).scalar() or 1
-    
-    iq_score = float(correct_difficult) / float(total_difficult) * 100
+        AssessmentAttempt.user_id == student_id
+    ).one()
     
-    # 2. Learning (capability growth)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=TREND_ANALYSIS_WINDOW_DAYS)
-    recent_cap = db.query(func.avg(CapabilityScore.capability_level)).filter(
-        CapabilityScore.user_id == student_id,
-        CapabilityScore.last_updated >= thirty_days_ago
-    ).scalar() or 50
+    # Learning wheel metrics (5 dimensions)
     
-    old_cap = db.query(func.avg(CapabilityScore.capability_level)).filter(
-        CapabilityScore.user_id == student_id,
-        CapabilityScore.last_updated < thirty_days_ago
-    ).scalar() or recent_cap
+    # 1. IQ (reasoning quality) - based on correct answers to difficult questions
+    iq_score = float(answer_stats.correct_difficult) / float(answer_stats.total_difficult or 1) * 100
     
-    learning_score = min(100, max(0, float(recent_cap)))
+    # 2. Learning (capability growth over the trend window: 50 = no change,
+    #    +/- the average points gained or lost on the topics that changed)
+    average_growth = _average([topic.end_level - topic.start_level for topic in growth]) or 0.0
+    learning_score = min(100, max(0, LEARNING_BASELINE + average_growth))
     
     # 3. Consistency (streak converted to 0-100 scale, where streak of 10 = 100)
-    max_streak = db.query(func.max(CapabilityScore.streak)).filter(
-        CapabilityScore.user_id == student_id
-    ).scalar() or 0
-    
+    max_streak = max((cap.streak for cap in capabilities if cap.streak is not None), default=0)
     consistency_score = min(100, float(max_streak) * STREAK_TO_SCORE_MULTIPLIER)
     
-    # 4. Originality (placeholder for future NLP-based analysis)
-    # Note: Requires NLP analysis implementation to calculate actual originality scores
-    originality_score = 0.0
+    # 4. Originality (average NLP originality score of analyzed answers)
+    originality_score = float(answer_stats.avg_originality) if answer_stats.avg_originality is not None else 0.0
     
     # 5. Accuracy (overall correctness)
-    total_answers = db.query(func.count(AnswerAttempt.id)).join(
-        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
-    ).filter(
-        AssessmentAttempt.user_id == student_id,
-        AnswerAttempt.is_correct.isnot(None)
-    ).scalar() or 1
-    
-    correct_answers = db.query(func.count(AnswerAttempt.id)).join(
-        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
-    ).filter(
-        AssessmentAttempt.user_id == student_id,
-        AnswerAttempt.is_correct == True
-    ).scalar() or 0
-    
-    accuracy_score = float(correct_answers) / float(total_answers) * 100
+    accuracy_score = float(answer_stats.correct) / float(answer_stats.graded or 1) * 100
     
     learning_wheel = LearningWheelMetric(
         iq=iq_score,
@@ -441,39 +487,27 @@ def get_student_self_insights(db: Session, student_id: UUID) -> StudentSelfInsig
     )
     
     # Strengths (top capabilities with high scores)
-    top_caps = db.query(
-        Topic.name
-    ).join(
-        CapabilityScore, CapabilityScore.topic_id == Topic.id
-    ).filter(
-        CapabilityScore.user_id == student_id,
-        CapabilityScore.capability_level >= HIGH_CAPABILITY_CUTOFF
-    ).limit(5).all()
-    
-    strengths = [cap.name for cap in top_caps]
+    strengths = [
+        cap.topic_name for cap in capabilities
+        if cap.capability_level is not None and cap.capability_level >= HIGH_CAPABILITY_CUTOFF
+    ][:5]
     if not strengths:
         strengths = ["Continue practicing to build strengths"]
     
-    # Weak topics (areas needing improvement)
-    weak_topics_query = db.query(
-        CapabilityScore.topic_id,
-        Topic.name,
-        CapabilityScore.capability_level
-    ).join(
-        Topic, Topic.id == CapabilityScore.topic_id
-    ).filter(
-        CapabilityScore.user_id == student_id,
-        CapabilityScore.capability_level < LOW_CAPABILITY_CUTOFF
-    ).order_by(CapabilityScore.capability_level).limit(5).all()
-    
+    # Weak topics (areas needing improvement), weakest first
+    by_level = sorted(
+        capabilities,
+        key=lambda cap: (cap.capability_level is None, cap.capability_level or 0)
+    )
     weak_topics = [
         WeakTopic(
-            topic_id=wt.topic_id,
-            topic_name=wt.name,
-            capability_level=wt.capability_level
+            topic_id=cap.topic_id,
+            topic_name=cap.topic_name,
+            capability_level=cap.capability_level
         )
-        for wt in weak_topics_query
-    ]
+        for cap in by_level
+        if cap.capability_level is not None and cap.capability_level < LOW_CAPABILITY_CUTOFF
+    ][:5]
     
     # Next recommended concepts (based on suggested topics from feedback)
     recommended_query = db.query(
@@ -504,22 +538,13 @@ def get_student_self_insights(db: Session, student_id: UUID) -> StudentSelfInsig
     
     if not next_recommended:
         # Fallback: recommend topics with lowest capability
-        fallback_topics = db.query(
-            CapabilityScore.topic_id,
-            Topic.name
-        ).join(
-            Topic, Topic.id == CapabilityScore.topic_id
-        ).filter(
-            CapabilityScore.user_id == student_id
-        ).order_by(CapabilityScore.capability_level).limit(3).all()
-        
         next_recommended = [
             RecommendedConcept(
-                topic_id=t.topic_id,
-                topic_name=t.name,
+                topic_id=cap.topic_id,
+                topic_name=cap.topic_name,
                 reason="Focus on improving this topic"
             )
-            for t in fallback_topics
+            for cap in by_level[:3]
         ]
     
     return StudentSelfInsightsResponse(
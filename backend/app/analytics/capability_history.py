@@ -0,0 +1,215 @@
+"""
+Capability History
+
+Growth analytics (most improved topics on the faculty overview, the
+learning dimension of the student learning wheel) read from the
+append-only capability_history table instead of comparing capability_scores
+rows split at last_updated, which only shows when a score last changed, not
+what it changed from.
+
+Writers append one point per changed score (record_capability_changes) in
+the transaction that changes it, with the level it replaced; code that
+changes capability scores does so through save_capability_changes, which
+also keeps topic_stats, the leaderboards and the analytics cache in step. Growth over a
+time range is then computed from the points inside the range alone, with
+window functions: for each student and topic, the level before the first
+point in the range (its previous_level) and the level of the last one. The
+range filter is served by the (topic_id, recorded_at) and (user_id,
+recorded_at) indexes, so reads cost the points in the range, not the table.
+
+Retention (python -m app.utils.capability_history downsample): points
+older than CAPABILITY_HISTORY_RAW_DAYS are merged into one point per
+student, topic and day, keeping the day's last level and the level it
+started from, so growth over old ranges stays correct at daily granularity.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from app.analytics.leaderboard import refresh_students
+from app.analytics.topic_stats import apply_topic_deltas, capability_change
+from app.models.capability import CapabilityScore
+from app.models.capability_history import CapabilityHistory
+from app.models.topic import Topic
+
+DEFAULT_BATCH_SIZE = 500  # students per downsampling transaction
+DELETE_CHUNK_SIZE = 900  # ids per DELETE ... IN (stays under SQLite's bound-parameter limit)
+
+
+def record_capability_changes(db: Session,
+                              changes: Iterable[Tuple[UUID, UUID, Optional[int], Optional[int], Optional[int]]]) -> int:
+    """
+    Append a point for each (user_id, topic_id, old_level, new_level, streak)
+    whose level was set or changed (removed scores, new_level None, are not
+    points). One bulk insert; does not commit. Returns the points written.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "topic_id": topic_id,
+            "capability_level": new_level,
+            "previous_level": old_level,
+            "streak": streak or 0
+        }
+        for user_id, topic_id, old_level, new_level, streak in changes
+        if new_level is not None and new_level != old_level
+    ]
+    if rows:
+        db.execute(insert(CapabilityHistory), rows)
+    return len(rows)
+
+
+def save_capability_changes(db: Session,
+                            changes: List[Tuple[UUID, UUID, Optional[int], Optional[int], Optional[int]]]):
+    """
+    Commit capability score changes the caller made to CapabilityScore rows,
+    given as (user_id, topic_id, old_level, new_level, streak): counts them in
+    topic_stats, appends their history points, commits, then re-places the
+    students on this process's leaderboards and invalidates the cached
+    analytics read from capability scores (leaderboard.refresh_students).
+    """
+    topic_deltas = {}
+    for _, topic_id, old_level, new_level, _ in changes:
+        capability_change(topic_deltas, topic_id, old_level, new_level)
+    apply_topic_deltas(db, topic_deltas)
+    record_capability_changes(db, changes)
+    db.commit()
+    refresh_students(db, {user_id for user_id, *_ in changes})
+
+
+def _points_in_range(db: Session, since: datetime, *criteria):
+    """
+    Points recorded since `since`, each with its series' start level (the
+    level before the first point in range) and its recency (1 = the latest
+    point of its student and topic).
+    """
+    series = (CapabilityHistory.user_id, CapabilityHistory.topic_id)
+    return db.query(
+        CapabilityHistory.user_id,
+        CapabilityHistory.topic_id,
+        func.first_value(
+            func.coalesce(CapabilityHistory.previous_level, CapabilityHistory.capability_level)
+        ).over(
+            partition_by=series, order_by=(CapabilityHistory.recorded_at, CapabilityHistory.id)
+        ).label("start_level"),
+        CapabilityHistory.capability_level.label("end_level"),
+        func.row_number().over(
+            partition_by=series, order_by=(CapabilityHistory.recorded_at.desc(), CapabilityHistory.id.desc())
+        ).label("recency")
+    ).filter(CapabilityHistory.recorded_at >= since, *criteria).subquery()
+
+
+def load_topic_growth(db: Session, since: datetime) -> List:
+    """
+    (topic_id, topic_name, start_avg, end_avg, students) of every topic with
+    capability changes since `since`: the average level of its changed scores
+    at the start of the range and now. One query.
+    """
+    points = _points_in_range(db, since)
+    return db.query(
+        Topic.id.label("topic_id"),
+        Topic.name.label("topic_name"),
+        func.avg(points.c.start_level).label("start_avg"),
+        func.avg(points.c.end_level).label("end_avg"),
+        func.count().label("students")
+    ).join(
+        points, points.c.topic_id == Topic.id
+    ).filter(points.c.recency == 1).group_by(Topic.id, Topic.name).all()
+
+
+def load_student_growth(db: Session, student_id: UUID, since: datetime) -> List:
+    """(topic_id, start_level, end_level) of each of a student's topics whose score changed since `since`."""
+    points = _points_in_range(db, since, CapabilityHistory.user_id == student_id)
+    return db.query(
+        points.c.topic_id,
+        points.c.start_level,
+        points.c.end_level
+    ).filter(points.c.recency == 1).all()
+
+
+def backfill_capability_history(db: Session) -> int:
+    """
+    One point (at last_updated) for every capability score without history,
+    e.g. once after deploying the table. Growth is counted from these points
+    on. Does not commit; returns the points written.
+    """
+    missing = select(
+        CapabilityScore.user_id,
+        CapabilityScore.topic_id,
+        CapabilityScore.capability_level,
+        literal(None).label("previous_level"),
+        func.coalesce(CapabilityScore.streak, 0),
+        func.coalesce(CapabilityScore.last_updated, func.now())
+    ).where(
+        CapabilityScore.capability_level.isnot(None),
+        ~exists().where(
+            CapabilityHistory.user_id == CapabilityScore.user_id,
+            CapabilityHistory.topic_id == CapabilityScore.topic_id
+        )
+    )
+    result = db.execute(insert(CapabilityHistory).from_select(
+        ["user_id", "topic_id", "capability_level", "previous_level", "streak", "recorded_at"], missing
+    ))
+    return result.rowcount
+
+
+def raw_cutoff(raw_days: int) -> datetime:
+    """Start of the UTC day raw_days ago: points before it are downsampled (whole days only)."""
+    day = (datetime.utcnow() - timedelta(days=raw_days)).date()
+    return datetime(day.year, day.month, day.day)
+
+
+def downsample_capability_history(db: Session, before: datetime,
+                                  batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Merge the points recorded before `before` into one per student, topic and
+    (UTC) day: the day's last point is kept, takes the previous_level of the
+    day's first point, and the others are deleted. Students are processed
+    batch_size at a time, each batch committed. Days already down to one
+    point are untouched, so running it again changes nothing.
+    """
+    student_ids = [
+        user_id for (user_id,) in db.query(CapabilityHistory.user_id).filter(
+            CapabilityHistory.recorded_at < before
+        ).distinct().all()
+    ]
+    totals = {"students": len(student_ids), "days_merged": 0, "points_deleted": 0}
+
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        rows = db.query(
+            CapabilityHistory.id,
+            CapabilityHistory.user_id,
+            CapabilityHistory.topic_id,
+            CapabilityHistory.previous_level,
+            CapabilityHistory.recorded_at
+        ).filter(
+            CapabilityHistory.user_id.in_(batch),
+            CapabilityHistory.recorded_at < before
+        ).order_by(
+            CapabilityHistory.user_id, CapabilityHistory.topic_id, CapabilityHistory.recorded_at, CapabilityHistory.id
+        ).all()
+
+        days: Dict[Tuple, List] = {}
+        for row in rows:
+            days.setdefault((row.user_id, row.topic_id, row.recorded_at.date()), []).append(row)
+
+        kept = []
+        deleted = []
+        for points in days.values():
+            if len(points) > 1:
+                kept.append({"id": points[-1].id, "previous_level": points[0].previous_level})
+                deleted.extend(point.id for point in points[:-1])
+        if kept:
+            db.execute(update(CapabilityHistory), kept)
+            for offset in range(0, len(deleted), DELETE_CHUNK_SIZE):
+                db.execute(delete(CapabilityHistory).where(
+                    CapabilityHistory.id.in_(deleted[offset:offset + DELETE_CHUNK_SIZE])
+                ))
+        db.commit()
+
+        totals["days_merged"] += len(kept)
+        totals["points_deleted"] += len(deleted)
+    return totals
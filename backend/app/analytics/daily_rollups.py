@@ -0,0 +1,220 @@
+"""
+Daily Rollups
+
+Answer activity per day, so trend charts read a bounded number of rollup
+rows instead of scanning answer_attempts over the whole trend window:
+- student_topic_daily: (user_id, day, topic_id) -> attempts, graded,
+  correct, partials, progress_sum, progress_count
+- topic_daily: (topic_id, day) -> the same counters for every student
+
+A student's 12-week trend reads at most 84 days of their rows (one per
+topic answered that day, summed per day in SQL); a topic's reads at most
+84 rows.
+
+The rollups are filled by an incremental job, run every
+ROLLUP_INTERVAL_SECONDS by a background thread of each API process
+(app/utils/background_jobs.py) or, with the interval set to 0, from cron
+(python -m app.utils.daily_rollups): it aggregates
+the answers submitted after its watermark (rollup_watermarks) in windows of
+at most ROLLUP_WINDOW_DAYS, adding each window's counts with one
+INSERT ... ON CONFLICT DO UPDATE SET x = x + delta per table and moving the
+watermark in the same transaction, so every answer is counted exactly once.
+The watermark row is locked while a window is processed (PostgreSQL), so
+overlapping runs wait for each other instead of counting twice; the
+watermark is only moved from the value the window was read at, so without
+row locks (SQLite) the run that loses the race rolls its window back.
+
+Answers are only aggregated once they are ROLLUP_LAG_SECONDS old, so a
+transaction that commits a little after its answers' submitted_at is
+never behind the watermark; trends therefore lag by up to the lag plus the
+job interval.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import Date, Select, case, func, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import ROLLUP_LAG_SECONDS, ROLLUP_WINDOW_DAYS
+from app.db.upsert import dialect_insert
+from app.models.answer_attempt import AnswerAttempt
+from app.models.assessment import AssessmentAttempt
+from app.models.daily_rollup import RollupWatermark, StudentTopicDaily, TopicDaily
+from app.models.question import Question
+
+WATERMARK_NAME = "daily_rollups"
+COUNTER_COLUMNS = ("attempts", "graded", "correct", "partials", "progress_sum", "progress_count")
+
+# Same rule as submit_answer: a thinking break below this progress is a partial attempt
+PARTIAL_PROGRESS_THRESHOLD = 40
+
+# Rows per upsert statement
+UPSERT_CHUNK_SIZE = 1000
+
+
+def aggregate_answers(db: Session, start: datetime, end: datetime) -> List:
+    """
+    (user_id, topic_id, day, counters...) of the answers submitted in
+    (start, end], grouped in SQL.
+    """
+    partial = or_(
+        AnswerAttempt.progress_percentage < PARTIAL_PROGRESS_THRESHOLD,
+        AnswerAttempt.stopped_at_step.isnot(None)
+    )
+    submitted_at = AnswerAttempt.submitted_at
+    if db.get_bind().dialect.name == "postgresql":
+        submitted_at = func.timezone("UTC", submitted_at)  # UTC day, whatever the session time zone
+    day = func.date(submitted_at, type_=Date)
+    return db.query(
+        AssessmentAttempt.user_id,
+        Question.topic_id,
+        day.label("day"),
+        func.count(AnswerAttempt.id).label("attempts"),
+        func.count(AnswerAttempt.is_correct).label("graded"),
+        func.sum(case((AnswerAttempt.is_correct == True, 1), else_=0)).label("correct"),
+        func.sum(case((partial, 1), else_=0)).label("partials"),
+        func.coalesce(func.sum(AnswerAttempt.progress_percentage), 0).label("progress_sum"),
+        func.count(AnswerAttempt.progress_percentage).label("progress_count")
+    ).select_from(AnswerAttempt).join(
+        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
+    ).join(
+        Question, Question.id == AnswerAttempt.question_id
+    ).filter(
+        AnswerAttempt.submitted_at > start,
+        AnswerAttempt.submitted_at <= end
+    ).group_by(AssessmentAttempt.user_id, Question.topic_id, day).all()
+
+
+def _increment(db: Session, model, key_columns: tuple, rows: List[Dict]):
+    """Add counter rows to a rollup table (one upsert per chunk, in key order). Does not commit."""
+    rows = sorted(rows, key=lambda row: tuple(str(row[column]) for column in key_columns))
+    if dialect_insert(db, model) is None:
+        for row in rows:
+            existing = db.get(model, tuple(row[column] for column in key_columns))
+            if existing is None:
+                db.add(model(**row))
+            else:
+                for column in COUNTER_COLUMNS:
+                    setattr(existing, column, getattr(existing, column) + row[column])
+        return
+
+    for offset in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = dialect_insert(db, model).values(rows[offset:offset + UPSERT_CHUNK_SIZE])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[getattr(model, column) for column in key_columns],
+            set_={column: getattr(model, column) + getattr(statement.excluded, column) for column in COUNTER_COLUMNS}
+        ))
+
+
+def apply_answer_rollups(db: Session, aggregated: List) -> int:
+    """Add aggregate_answers rows to student_topic_daily and topic_daily. Returns student rows written."""
+    student_rows = []
+    topic_rows: Dict[tuple, Dict] = {}
+    for row in aggregated:
+        counters = {column: int(getattr(row, column) or 0) for column in COUNTER_COLUMNS}
+        student_rows.append({"user_id": row.user_id, "day": row.day, "topic_id": row.topic_id, **counters})
+        topic_row = topic_rows.setdefault(
+            (row.topic_id, row.day),
+            {"topic_id": row.topic_id, "day": row.day, **dict.fromkeys(COUNTER_COLUMNS, 0)}
+        )
+        for column, value in counters.items():
+            topic_row[column] += value
+
+    _increment(db, StudentTopicDaily, ("user_id", "day", "topic_id"), student_rows)
+    _increment(db, TopicDaily, ("topic_id", "day"), list(topic_rows.values()))
+    return len(student_rows)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """UTC datetime without tzinfo (PostgreSQL returns aware datetimes, SQLite naive ones)."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _init_watermark(db: Session):
+    """Create the watermark just before the oldest answer on the first run. Commits."""
+    if db.get(RollupWatermark, WATERMARK_NAME) is not None:
+        return
+    oldest = db.query(func.min(AnswerAttempt.submitted_at)).scalar()
+    if oldest is None:
+        return
+    values = {"name": WATERMARK_NAME, "processed_until": oldest - timedelta(seconds=1)}
+    statement = dialect_insert(db, RollupWatermark)
+    if statement is None:
+        db.add(RollupWatermark(**values))
+    else:
+        db.execute(statement.values(**values).on_conflict_do_nothing())
+    db.commit()
+
+
+def run_daily_rollups(db: Session, until: Optional[datetime] = None) -> Dict[str, any]:
+    """
+    Aggregate every answer submitted after the watermark and up to `until`
+    (default: ROLLUP_LAG_SECONDS ago), one committed window of at most
+    ROLLUP_WINDOW_DAYS at a time. Returns the windows, answers and student
+    rows processed, and the new watermark.
+    """
+    if until is None:
+        until = datetime.utcnow() - timedelta(seconds=ROLLUP_LAG_SECONDS)
+    until = _naive_utc(until)
+    totals = {"windows": 0, "answers": 0, "rows": 0, "processed_until": None}
+
+    _init_watermark(db)
+    while True:
+        watermark = db.query(RollupWatermark).filter(
+            RollupWatermark.name == WATERMARK_NAME
+        ).with_for_update().first()
+        if watermark is None:
+            break
+        start = _naive_utc(watermark.processed_until)
+        totals["processed_until"] = start
+        if start >= until:
+            db.rollback()
+            break
+
+        end = min(start + timedelta(days=ROLLUP_WINDOW_DAYS), until)
+        aggregated = aggregate_answers(db, start, end)
+        rows = apply_answer_rollups(db, aggregated)
+        # Only from the watermark this window was read at: SQLite has no row lock, so
+        # a concurrent run may have moved it first, and then this window is dropped
+        moved = db.query(RollupWatermark).filter(
+            RollupWatermark.name == WATERMARK_NAME,
+            RollupWatermark.processed_until == watermark.processed_until
+        ).update({RollupWatermark.processed_until: end}, synchronize_session=False)
+        if not moved:
+            db.rollback()
+            break
+        db.commit()
+        totals["rows"] += rows
+        totals["answers"] += sum(row.attempts for row in aggregated)
+
+        totals["windows"] += 1
+        totals["processed_until"] = end
+    return totals
+
+
+def reset_daily_rollups(db: Session):
+    """Empty both rollups and drop the watermark (the next run re-aggregates every answer). Does not commit."""
+    db.query(StudentTopicDaily).delete(synchronize_session=False)
+    db.query(TopicDaily).delete(synchronize_session=False)
+    db.query(RollupWatermark).filter(RollupWatermark.name == WATERMARK_NAME).delete(synchronize_session=False)
+
+
+def student_days_select(student_id: UUID, since: date) -> Select:
+    """SELECT of (day, counters...) of a student's answers per day since `since`: at most one row per day."""
+    return select(
+        StudentTopicDaily.day,
+        *[func.sum(getattr(StudentTopicDaily, column)).label(column) for column in COUNTER_COLUMNS]
+    ).where(
+        StudentTopicDaily.user_id == student_id,
+        StudentTopicDaily.day >= since
+    ).group_by(StudentTopicDaily.day)
+
+
+def load_topic_days(db: Session, topic_id: UUID, since: date) -> List:
+    """topic_daily rows of a topic since `since`: at most one row per day."""
+    return db.query(TopicDaily).filter(
+        TopicDaily.topic_id == topic_id,
+        TopicDaily.day >= since
+    ).all()
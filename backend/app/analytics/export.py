@@ -0,0 +1,145 @@
+"""
+Cohort Export
+
+GET /analytics/faculty/export streams one row per student and topic
+(capability level, streak and answer accuracy) for the whole cohort, or
+one subject's topics, as CSV or NDJSON.
+
+Rows come from a single query read through a server-side cursor
+(yield_per: PostgreSQL streams results instead of buffering them), and are
+encoded and sent EXPORT_BATCH_SIZE at a time, so memory stays flat however
+many students there are, and the header (CSV) goes out before the query
+has produced its first row. Rows are ordered by student, then topic.
+
+The export opens its own session: the response body is produced after the
+route has returned, when the request's session may already be closed.
+Accuracy comes from the daily rollups, so it trails live answers by a few
+minutes (see app/analytics/daily_rollups.py).
+"""
+
+import csv
+import io
+import json
+from typing import Iterator, Optional
+from uuid import UUID
+from sqlalchemy import func
+from app.db.database import SessionLocal
+from app.models.capability import CapabilityScore
+from app.models.daily_rollup import StudentTopicDaily
+from app.models.subject import Subject
+from app.models.topic import Topic
+from app.models.user import User, UserRole
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+EXPORT_COLUMNS = (
+    "student_id", "student_name", "student_email",
+    "subject_name", "topic_id", "topic_name",
+    "capability_level", "streak",
+    "attempts", "graded", "correct", "accuracy"
+)
+
+# Rows fetched from the cursor and written to the response at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_query(db, subject_id: Optional[UUID]):
+    answers = db.query(
+        StudentTopicDaily.user_id,
+        StudentTopicDaily.topic_id,
+        func.sum(StudentTopicDaily.attempts).label("attempts"),
+        func.sum(StudentTopicDaily.graded).label("graded"),
+        func.sum(StudentTopicDaily.correct).label("correct")
+    ).group_by(StudentTopicDaily.user_id, StudentTopicDaily.topic_id).subquery()
+
+    query = db.query(
+        User.id.label("student_id"),
+        User.name.label("student_name"),
+        User.email.label("student_email"),
+        Subject.name.label("subject_name"),
+        Topic.id.label("topic_id"),
+        Topic.name.label("topic_name"),
+        CapabilityScore.capability_level,
+        CapabilityScore.streak,
+        answers.c.attempts,
+        answers.c.graded,
+        answers.c.correct
+    ).select_from(CapabilityScore).join(
+        User, User.id == CapabilityScore.user_id
+    ).join(
+        Topic, Topic.id == CapabilityScore.topic_id
+    ).join(
+        Subject, Subject.id == Topic.subject_id
+    ).outerjoin(
+        answers, (answers.c.user_id == CapabilityScore.user_id) & (answers.c.topic_id == CapabilityScore.topic_id)
+    ).filter(User.role == UserRole.student)
+    if subject_id is not None:
+        query = query.filter(Topic.subject_id == subject_id)
+    return query.order_by(CapabilityScore.user_id, CapabilityScore.topic_id)
+
+
+def export_rows(subject_id: Optional[UUID] = None) -> Iterator[dict]:
+    """Export rows as dicts (EXPORT_COLUMNS), read through a server-side cursor in its own session."""
+    db = SessionLocal()
+    try:
+        for row in _export_query(db, subject_id).yield_per(EXPORT_BATCH_SIZE):
+            graded = row.graded or 0
+            yield {
+                "student_id": str(row.student_id),
+                "student_name": row.student_name,
+                "student_email": row.student_email,
+                "subject_name": row.subject_name,
+                "topic_id": str(row.topic_id),
+                "topic_name": row.topic_name,
+                "capability_level": row.capability_level,
+                "streak": row.streak,
+                "attempts": row.attempts or 0,
+                "graded": graded,
+                "correct": row.correct or 0,
+                "accuracy": round(float(row.correct or 0) / graded * 100, 2) if graded else None
+            }
+    finally:
+        db.close()
+
+
+def stream_csv(subject_id: Optional[UUID] = None) -> Iterator[str]:
+    """CSV export: the header line first, then EXPORT_BATCH_SIZE rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for row in export_rows(subject_id):
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(subject_id: Optional[UUID] = None) -> Iterator[str]:
+    """NDJSON export: one JSON object per line, EXPORT_BATCH_SIZE lines per chunk."""
+    lines = []
+    for row in export_rows(subject_id):
+        lines.append(json.dumps(row))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def stream_export(export_format: str, subject_id: Optional[UUID] = None) -> Iterator[str]:
+    """Chunks of the export in the given format (a key of EXPORT_FORMATS)."""
+    if export_format == "csv":
+        return stream_csv(subject_id)
+    return stream_ndjson(subject_id)
@@ -0,0 +1,194 @@
+"""
+Leaderboard Module
+
+Ranked student boards held in memory, so GET /analytics/leaderboard does
+not aggregate and sort every student's capability scores on each request.
+
+A board ranks the students of one scope (every topic, one subject or one
+topic) by combined score: average capability * CAPABILITY_WEIGHT + best
+streak * STREAK_WEIGHT. It is a sorted list of (-combined score, name,
+student id) keys plus the entry of each student, so:
+- a student's rank is one bisect: O(log n)
+- a page (limit/offset, or a window around a student) is a list slice
+- re-placing a student whose scores changed is a bisect and a list
+  insert/delete (a memmove, fast for any realistic number of students)
+
+The global board is built when the API starts; subject and topic boards
+when first requested (one grouped query each), at most MAX_BOARDS of them.
+Capability score writes go through
+capability_history.save_capability_changes, which calls refresh_students
+after its commit to re-place those students on every board held by this
+process.
+Boards are per process, so each one is also rebuilt once it is
+LEADERBOARD_REFRESH_SECONDS old, picking up changes made elsewhere (other
+API workers, python -m app.utils.seed_data).
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import LEADERBOARD_REFRESH_SECONDS
+from app.analytics.result_cache import bump_data_version
+from app.models.capability import CapabilityScore
+from app.models.topic import Topic
+from app.models.user import User, UserRole
+
+# Combined score weights: capability (70%) + streak contribution (30%)
+CAPABILITY_WEIGHT = 0.7
+STREAK_WEIGHT = 0.3
+
+# Subject and topic boards kept in memory at once (least recently used dropped first)
+MAX_BOARDS = 256
+
+GLOBAL_SCOPE = ("global", None)
+
+
+class RankedBoard:
+    """Students of one scope in rank order; entries are (student_name, capability_score, streak)."""
+
+    def __init__(self, entries: Dict[UUID, Tuple[str, float, int]]):
+        self.entries = dict(entries)
+        self.keys = sorted(self._key(student_id, entry) for student_id, entry in self.entries.items())
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _key(student_id: UUID, entry: Tuple[str, float, int]) -> Tuple[float, str, UUID]:
+        name, capability_score, streak = entry
+        return (-(capability_score * CAPABILITY_WEIGHT + streak * STREAK_WEIGHT), name, student_id)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def put(self, student_id: UUID, entry: Optional[Tuple[str, float, int]]):
+        """Insert, move or (entry None) remove a student."""
+        old = self.entries.pop(student_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, self._key(student_id, old))]
+        if entry is not None:
+            self.entries[student_id] = entry
+            insort(self.keys, self._key(student_id, entry))
+
+    def rank(self, student_id: UUID) -> Optional[int]:
+        """1-based rank of a student, or None if not on the board."""
+        entry = self.entries.get(student_id)
+        if entry is None:
+            return None
+        return bisect_left(self.keys, self._key(student_id, entry)) + 1
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, UUID, Tuple[str, float, int]]]:
+        """(rank, student_id, entry) of the students ranked offset + 1 to offset + limit."""
+        return [
+            (rank, key[2], self.entries[key[2]])
+            for rank, key in enumerate(self.keys[offset:offset + limit], start=offset + 1)
+        ]
+
+
+_lock = threading.Lock()
+_boards: "OrderedDict[Tuple[str, Optional[UUID]], RankedBoard]" = OrderedDict()
+
+
+def _entry(name: str, levels: Iterable[Optional[int]], streaks: Iterable[Optional[int]]) -> Tuple[str, float, int]:
+    levels = [level for level in levels if level is not None]
+    streaks = [streak for streak in streaks if streak is not None]
+    return (name, float(sum(levels)) / len(levels) if levels else 0.0, max(streaks, default=0))
+
+
+def load_board(db: Session, scope: Tuple[str, Optional[UUID]]) -> RankedBoard:
+    """Build a scope's board from capability_scores with one grouped query."""
+    kind, scope_id = scope
+    query = db.query(
+        User.id,
+        User.name,
+        func.avg(CapabilityScore.capability_level).label('capability_score'),
+        func.max(CapabilityScore.streak).label('streak')
+    ).join(
+        CapabilityScore, CapabilityScore.user_id == User.id
+    ).filter(User.role == UserRole.student)
+    if kind == "subject":
+        query = query.join(Topic, Topic.id == CapabilityScore.topic_id).filter(Topic.subject_id == scope_id)
+    elif kind == "topic":
+        query = query.filter(CapabilityScore.topic_id == scope_id)
+
+    return RankedBoard({
+        row.id: (row.name, float(row.capability_score or 0), row.streak or 0)
+        for row in query.group_by(User.id, User.name).all()
+    })
+
+
+def get_board(db: Session, scope: Tuple[str, Optional[UUID]] = GLOBAL_SCOPE) -> RankedBoard:
+    """The scope's board, built (or rebuilt, once stale) from the database when needed."""
+    with _lock:
+        board = _boards.get(scope)
+        if board is not None and time.monotonic() - board.built_at < LEADERBOARD_REFRESH_SECONDS:
+            _boards.move_to_end(scope)
+            return board
+
+    # Built outside the lock; a concurrent build of the same scope is harmless
+    board = load_board(db, scope)
+    with _lock:
+        _boards[scope] = board
+        _boards.move_to_end(scope)
+        while len(_boards) > MAX_BOARDS + 1:  # + the global board
+            oldest = next(scope for scope in _boards if scope != GLOBAL_SCOPE)
+            _boards.pop(oldest)
+    return board
+
+
+def rebuild_leaderboards(db: Session) -> int:
+    """Drop every board and build the global one (at startup). Returns the number of students ranked."""
+    board = load_board(db, GLOBAL_SCOPE)
+    with _lock:
+        _boards.clear()
+        _boards[GLOBAL_SCOPE] = board
+    return len(board)
+
+
+def refresh_students(db: Session, student_ids: Iterable[UUID]):
+    """
+    Re-place students on every board held by this process after their
+    capability scores changed (call after the commit), and invalidate the
+    cached analytics computed from capability scores. One query for all
+    the students' scores; each board update is O(log n) plus a list shift.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    rows = db.query(
+        User.id,
+        User.name,
+        CapabilityScore.topic_id,
+        Topic.subject_id,
+        CapabilityScore.capability_level,
+        CapabilityScore.streak
+    ).join(
+        CapabilityScore, CapabilityScore.user_id == User.id
+    ).join(
+        Topic, Topic.id == CapabilityScore.topic_id
+    ).filter(
+        User.id.in_(student_ids),
+        User.role == UserRole.student
+    ).all()
+
+    by_student: Dict[UUID, List] = {student_id: [] for student_id in student_ids}
+    for row in rows:
+        by_student[row.id].append(row)
+
+    with _lock:
+        for (kind, scope_id), board in _boards.items():
+            for student_id, student_rows in by_student.items():
+                if kind == "subject":
+                    student_rows = [row for row in student_rows if row.subject_id == scope_id]
+                elif kind == "topic":
+                    student_rows = [row for row in student_rows if row.topic_id == scope_id]
+                board.put(student_id, _entry(
+                    student_rows[0].name,
+                    [row.capability_level for row in student_rows],
+                    [row.streak for row in student_rows]
+                ) if student_rows else None)
+    # After the boards moved, so a page rebuilt for the new version reflects them
+    bump_data_version("capabilities")
@@ -0,0 +1,209 @@
+"""
+Analytics Result Cache
+
+In-process cache of analytics responses, keyed by endpoint and parameters,
+so dashboards polled by many faculty and students do not rerun the same
+aggregations on every request.
+
+Freshness:
+- Every entry records the data versions it was computed from. Writers bump
+  a domain's version after their commit (bump_data_version):
+  - "answers": assessment started, answer submitted
+  - "capabilities": capability scores changed (leaderboard.refresh_students,
+    called by capability_history.save_capability_changes)
+  - "feedback": NLP analysis saved, i.e. scores and feedback (inline,
+    batch and background analysis)
+  An entry whose versions no longer match is recomputed on its next read.
+- Versions are per process, so changes made by other API workers or by
+  python -m app.utils commands are picked up once an entry is
+  ANALYTICS_CACHE_TTL_SECONDS old.
+
+Stampede protection (single flight): when several requests miss the same
+key at once, the first computes the result and the others wait for it
+instead of running the same queries in parallel. Only requests that read
+the same data versions share a computation, so a reader never gets a
+result computed before a change it has already seen.
+
+Hit ratio and recompute durations per endpoint: GET /analytics/cache/stats.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Tuple, TypeVar
+from app.core.config import (
+    ANALYTICS_CACHE_ENABLED,
+    ANALYTICS_CACHE_MAX_ENTRIES,
+    ANALYTICS_CACHE_TTL_SECONDS
+)
+
+DATA_DOMAINS = ("answers", "capabilities", "feedback")
+
+# A request waiting on another's computation gives up and computes itself after this long
+SINGLE_FLIGHT_WAIT_SECONDS = 30
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """One computation in progress, shared by the requests that missed its key."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = dict.fromkeys(DATA_DOMAINS, 0)
+_entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Tuple[int, ...], object]]" = OrderedDict()
+_flights: Dict[Tuple[str, Hashable, Tuple[int, ...]], _Flight] = {}
+_stats: Dict[str, Dict[str, float]] = {}
+_evictions = {"size": 0, "ttl": 0, "version": 0}
+
+
+def _endpoint_stats(endpoint: str) -> Dict[str, float]:
+    stats = _stats.get(endpoint)
+    if stats is None:
+        stats = _stats[endpoint] = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "wait_timeouts": 0,
+            "errors": 0,
+            "recomputes": 0,
+            "recompute_ms_total": 0.0,
+            "recompute_ms_max": 0.0
+        }
+    return stats
+
+
+def bump_data_version(*domains: str):
+    """Invalidate every entry computed from these domains (call after the commit)."""
+    with _lock:
+        for domain in domains:
+            _versions[domain] += 1
+
+
+def _lookup(key: Tuple[str, Hashable], versions: Tuple[int, ...]):
+    """Fresh cached value for key, or None. Caller holds _lock."""
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    stored_at, entry_versions, value = entry
+    if entry_versions != versions:
+        del _entries[key]
+        _evictions["version"] += 1
+        return None
+    if time.monotonic() - stored_at >= ANALYTICS_CACHE_TTL_SECONDS:
+        del _entries[key]
+        _evictions["ttl"] += 1
+        return None
+    _entries.move_to_end(key)
+    return entry
+
+
+def cached(endpoint: str, params: Hashable, depends_on: Iterable[str], compute: Callable[[], T]) -> T:
+    """
+    Result of compute() for (endpoint, params), from the cache while none of
+    the depends_on domains changed and the entry is within its TTL.
+    Concurrent misses of the same key run compute() once. Exceptions are
+    not cached; requests waiting on a failed computation get its exception.
+    Cached values are shared between requests and must not be modified.
+    """
+    if not ANALYTICS_CACHE_ENABLED:
+        return compute()
+
+    key = (endpoint, params)
+    with _lock:
+        stats = _endpoint_stats(endpoint)
+        versions = tuple(_versions[domain] for domain in depends_on)
+        entry = _lookup(key, versions)
+        if entry is not None:
+            stats["hits"] += 1
+            return entry[2]
+
+        flight_key = (endpoint, params, versions)
+        flight = _flights.get(flight_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[flight_key] = _Flight()
+            stats["misses"] += 1
+        else:
+            stats["coalesced"] += 1
+
+    if not leader:
+        if flight.done.wait(SINGLE_FLIGHT_WAIT_SECONDS):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        with _lock:
+            stats["wait_timeouts"] += 1
+        return compute()
+
+    started = time.perf_counter()
+    try:
+        value = compute()
+    except BaseException as error:
+        flight.error = error
+        with _lock:
+            stats["errors"] += 1
+            _flights.pop(flight_key, None)
+        flight.done.set()
+        raise
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    flight.value = value
+    with _lock:
+        stats["recomputes"] += 1
+        stats["recompute_ms_total"] += elapsed_ms
+        stats["recompute_ms_max"] = max(stats["recompute_ms_max"], elapsed_ms)
+        # Not stored if a domain changed while computing: it is already stale
+        if versions == tuple(_versions[domain] for domain in depends_on):
+            _entries[key] = (time.monotonic(), versions, value)
+            _entries.move_to_end(key)
+            while len(_entries) > ANALYTICS_CACHE_MAX_ENTRIES:
+                _entries.popitem(last=False)
+                _evictions["size"] += 1
+        _flights.pop(flight_key, None)
+    flight.done.set()
+    return value
+
+
+def get_cache_stats() -> Dict[str, any]:
+    """Hit ratio and recompute durations per endpoint, eviction counters and data versions."""
+    with _lock:
+        endpoints = {}
+        for endpoint, stats in sorted(_stats.items()):
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            endpoints[endpoint] = {
+                "lookups": lookups,
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "coalesced": stats["coalesced"],
+                "wait_timeouts": stats["wait_timeouts"],
+                "errors": stats["errors"],
+                "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                "recomputes": stats["recomputes"],
+                "recompute_ms_avg": round(stats["recompute_ms_total"] / stats["recomputes"], 3)
+                if stats["recomputes"] else 0.0,
+                "recompute_ms_max": round(stats["recompute_ms_max"], 3)
+            }
+        lookups = sum(stats["lookups"] for stats in endpoints.values())
+        hits = sum(stats["hits"] for stats in endpoints.values())
+        return {
+            "enabled": ANALYTICS_CACHE_ENABLED,
+            "entries": len(_entries),
+            "max_entries": ANALYTICS_CACHE_MAX_ENTRIES,
+            "ttl_seconds": ANALYTICS_CACHE_TTL_SECONDS,
+            "in_flight": len(_flights),
+            "lookups": lookups,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "size_evictions": _evictions["size"],
+            "ttl_evictions": _evictions["ttl"],
+            "version_evictions": _evictions["version"],
+            "data_versions": dict(_versions),
+            "endpoints": endpoints
+        }
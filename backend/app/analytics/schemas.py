@@ -56,6 +56,8 @@ class StudentDetailResponse(BaseModel):
     detected_gaps: List[DetectedGap]
     originality_trend: List[TrendMetric]
     confidence_trend: List[TrendMetric]
+    accuracy_trend: List[TrendMetric]
+    progress_trend: List[TrendMetric]
 
 
 class TopicHeatmapItem(BaseModel):
@@ -71,6 +73,20 @@ class TopicHeatmapResponse(BaseModel):
     topics: List[TopicHeatmapItem]
 
 
+class TopicTrendWeek(BaseModel):
+    date: str
+    attempts: int
+    accuracy: float
+    partial_rate: float
+    average_progress: float
+
+
+class TopicTrendResponse(BaseModel):
+    topic_id: UUID
+    topic_name: str
+    weeks: List[TopicTrendWeek]
+
+
 class LeaderboardEntry(BaseModel):
     rank: int
     student_id: UUID
@@ -81,6 +97,9 @@ class LeaderboardEntry(BaseModel):
 
 class LeaderboardResponse(BaseModel):
     leaderboard: List[LeaderboardEntry]
+    total: int = 0  # students ranked on this board
+    offset: int = 0
+    my_rank: Optional[int] = None
 
 
 class LearningWheelMetric(BaseModel):
@@ -108,3 +127,31 @@ class StudentSelfInsightsResponse(BaseModel):
     strengths: List[str]
     weak_topics: List[WeakTopic]
     next_recommended_concepts: List[RecommendedConcept]
+
+
+class EndpointCacheStats(BaseModel):
+    lookups: int
+    hits: int
+    misses: int
+    coalesced: int
+    wait_timeouts: int
+    errors: int
+    hit_ratio: float
+    recomputes: int
+    recompute_ms_avg: float
+    recompute_ms_max: float
+
+
+class AnalyticsCacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int
+    max_entries: int
+    ttl_seconds: int
+    in_flight: int
+    lookups: int
+    hit_ratio: float
+    size_evictions: int
+    ttl_evictions: int
+    version_evictions: int
+    data_versions: Dict[str, int]
+    endpoints: Dict[str, EndpointCacheStats]
@@ -0,0 +1,182 @@
+"""
+Topic Stats Rollup
+
+Per-topic counters behind the faculty overview and the topic heatmap
+(topic_stats table): answer attempts and failures, the sum and count of
+capability levels, and feedback rows per gap type. Reading them is one
+query however many topics there are.
+
+Writers keep the rollup current in their own transaction, by adding
+counter deltas with one INSERT ... ON CONFLICT DO UPDATE SET x = x + delta
+(concurrent writers never lose an increment):
+- submit_answer: record_answer once the answer is graded
+- NLP feedback (single, batch and bulk re-analysis): gap type changes
+- capability scores: capability_change when a level is set, changed or removed
+Deltas are accumulated per topic in a plain dict ({topic_id: {column: delta}})
+so batch writers issue one statement.
+
+rebuild_topic_stats recomputes every row from the source tables
+(python -m app.utils.rebuild_topic_stats), e.g. once after deploying the
+table or to repair drift.
+"""
+
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import case, func, insert, text
+from sqlalchemy.orm import Session
+from app.db.upsert import dialect_insert
+from app.models.answer_attempt import AnswerAttempt
+from app.models.capability import CapabilityScore
+from app.models.feedback import Feedback, GapType
+from app.models.question import Question
+from app.models.topic import Topic
+from app.models.topic_stats import TopicStats
+
+GAP_COLUMNS = {
+    GapType.conceptual: "gap_conceptual",
+    GapType.procedural: "gap_procedural",
+    GapType.logic: "gap_logic"
+}
+COUNTER_COLUMNS = ("attempts", "failures", "capability_sum", "capability_count", *GAP_COLUMNS.values())
+
+
+def _add(deltas: Dict[UUID, Dict[str, int]], topic_id: UUID, column: str, delta: int):
+    topic_deltas = deltas.setdefault(topic_id, {})
+    topic_deltas[column] = topic_deltas.get(column, 0) + delta
+
+
+def answer_delta(deltas: Dict[UUID, Dict[str, int]], topic_id: UUID, is_correct: Optional[bool]):
+    """Count one new answer (a failure if graded incorrect)."""
+    _add(deltas, topic_id, "attempts", 1)
+    if is_correct is False:
+        _add(deltas, topic_id, "failures", 1)
+
+
+def gap_change(deltas: Dict[UUID, Dict[str, int]], topic_id: UUID,
+               old_gap: Optional[GapType], new_gap: Optional[GapType]):
+    """Move one feedback row between gap types (None: no feedback or no gap type)."""
+    if old_gap == new_gap:
+        return
+    if old_gap is not None:
+        _add(deltas, topic_id, GAP_COLUMNS[old_gap], -1)
+    if new_gap is not None:
+        _add(deltas, topic_id, GAP_COLUMNS[new_gap], 1)
+
+
+def capability_change(deltas: Dict[UUID, Dict[str, int]], topic_id: UUID,
+                      old_level: Optional[int], new_level: Optional[int]):
+    """Replace one capability level (None: no score, e.g. a new or deleted row)."""
+    if old_level == new_level:
+        return
+    if old_level is not None:
+        _add(deltas, topic_id, "capability_sum", -old_level)
+        _add(deltas, topic_id, "capability_count", -1)
+    if new_level is not None:
+        _add(deltas, topic_id, "capability_sum", new_level)
+        _add(deltas, topic_id, "capability_count", 1)
+
+
+def apply_topic_deltas(db: Session, deltas: Dict[UUID, Dict[str, int]]):
+    """
+    Add accumulated deltas to topic_stats in one upsert, in topic order (so
+    concurrent writers lock rows in the same order). Does not commit.
+    """
+    rows = [
+        {"topic_id": topic_id, **{column: topic_deltas.get(column, 0) for column in COUNTER_COLUMNS}}
+        for topic_id, topic_deltas in sorted(deltas.items(), key=lambda item: str(item[0]))
+        if topic_id is not None and any(topic_deltas.values())
+    ]
+    if not rows:
+        return
+
+    statement = dialect_insert(db, TopicStats)
+    if statement is None:
+        for row in rows:
+            stats = db.get(TopicStats, row["topic_id"])
+            if stats is None:
+                db.add(TopicStats(**row))
+            else:
+                for column in COUNTER_COLUMNS:
+                    setattr(stats, column, getattr(stats, column) + row[column])
+        return
+
+    statement = statement.values(rows)
+    set_ = {column: getattr(TopicStats, column) + getattr(statement.excluded, column) for column in COUNTER_COLUMNS}
+    set_["updated_at"] = func.now()
+    db.execute(statement.on_conflict_do_update(index_elements=[TopicStats.topic_id], set_=set_))
+
+
+def record_answer(db: Session, topic_id: UUID, is_correct: Optional[bool]):
+    """Count a newly submitted (and graded) answer to a question of the topic. Does not commit."""
+    deltas = {}
+    answer_delta(deltas, topic_id, is_correct)
+    apply_topic_deltas(db, deltas)
+
+
+def rebuild_topic_stats(db: Session) -> int:
+    """
+    Recompute every topic's row from answer_attempts, capability_scores and
+    feedback with three grouped queries, replacing the table's contents.
+    On PostgreSQL the table is locked first, so increments from concurrent
+    transactions are either counted by the rebuild or applied after it.
+    Returns the number of topics; does not commit.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE topic_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+    stats = {topic_id: dict.fromkeys(COUNTER_COLUMNS, 0) for (topic_id,) in db.query(Topic.id).all()}
+
+    for topic_id, attempts, failures in db.query(
+        Question.topic_id,
+        func.count(AnswerAttempt.id),
+        func.sum(case((AnswerAttempt.is_correct == False, 1), else_=0))
+    ).join(
+        Question, Question.id == AnswerAttempt.question_id
+    ).group_by(Question.topic_id).all():
+        stats[topic_id].update(attempts=attempts, failures=failures or 0)
+
+    for topic_id, capability_sum, capability_count in db.query(
+        CapabilityScore.topic_id,
+        func.sum(CapabilityScore.capability_level),
+        func.count(CapabilityScore.capability_level)
+    ).group_by(CapabilityScore.topic_id).all():
+        stats[topic_id].update(capability_sum=capability_sum or 0, capability_count=capability_count)
+
+    for topic_id, gap_type, count in db.query(
+        Question.topic_id,
+        Feedback.gap_type,
+        func.count(Feedback.id)
+    ).join(
+        AnswerAttempt, AnswerAttempt.id == Feedback.answer_attempt_id
+    ).join(
+        Question, Question.id == AnswerAttempt.question_id
+    ).filter(Feedback.gap_type.isnot(None)).group_by(Question.topic_id, Feedback.gap_type).all():
+        stats[topic_id][GAP_COLUMNS[gap_type]] = count
+
+    db.query(TopicStats).delete(synchronize_session=False)
+    if stats:
+        db.execute(insert(TopicStats), [{"topic_id": topic_id, **counters} for topic_id, counters in stats.items()])
+    return len(stats)
+
+
+def load_topic_stats(db: Session) -> List:
+    """
+    (topic_id, topic_name, TopicStats columns...) of every topic in one
+    query; topics without a rollup row read as zeros.
+    """
+    return db.query(
+        Topic.id.label("topic_id"),
+        Topic.name.label("topic_name"),
+        *[func.coalesce(getattr(TopicStats, column), 0).label(column) for column in COUNTER_COLUMNS]
+    ).outerjoin(TopicStats, TopicStats.topic_id == Topic.id).all()
+
+
+def most_common_gap(row) -> Optional[str]:
+    """Gap type with the most feedback rows in a load_topic_stats row (first in GapType order on ties)."""
+    best = None
+    best_count = 0
+    for gap_type, column in GAP_COLUMNS.items():
+        count = getattr(row, column)
+        if count > best_count:
+            best, best_count = gap_type.value, count
+    return best
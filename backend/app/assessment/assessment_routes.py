@@ -8,9 +8,12 @@ from app.assessment.schemas import (
     StartAssessmentRequest,
     AnswerSubmitRequest,
     AssessmentStatusResponse,
-    QuestionResponse
+    QuestionResponse,
+    TelemetryBatchRequest,
+    TelemetryBatchResponse
 )
 from app.assessment import assessment_service
+from app.nlp.telemetry import store_events
 
 
 router = APIRouter()
@@ -146,3 +149,44 @@ def get_assessment_status(
         current_question=None,
         next_question=None
     )
+
+
+@router.post("/telemetry", response_model=TelemetryBatchResponse)
+def ingest_telemetry(
+    request: TelemetryBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_student)
+):
+    """
+    Record a batch of edit and focus events for the answer being typed.
+    Events are stored delta-encoded, one row per batch; resending a batch is harmless.
+    Used by the NLP pause analysis once the answer is submitted.
+    """
+    # Verify assessment belongs to current user
+    from app.models.assessment import AssessmentAttempt
+    assessment = db.query(AssessmentAttempt.id).filter(
+        AssessmentAttempt.id == request.assessment_id,
+        AssessmentAttempt.user_id == current_user.id
+    ).first()
+    
+    if not assessment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found or access denied"
+        )
+    
+    try:
+        result = store_events(
+            db,
+            request.assessment_id,
+            request.question_id,
+            [(event.t, event.type, event.n) for event in request.events]
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    db.commit()
+    
+    return TelemetryBatchResponse(**result)
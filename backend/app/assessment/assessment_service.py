@@ -1,3 +1,5 @@
+import logging
+import time
 from sqlalchemy.orm import Session
 from uuid import UUID
 from typing import Optional, Tuple
@@ -8,6 +10,18 @@ from app.models.capability import CapabilityScore
 from app.models.question import Question
 from app.models.topic import Topic
 from app.assessment.schemas import QuestionResponse
+from app.core.config import NLP_ASYNC_MODE
+from app.nlp import nlp_pipeline
+from app.nlp.nlp_service import analyze_answer_attempt
+from app.nlp.style_profile import record_style_sample
+from app.nlp.collusion import record_answer_signature
+from app.nlp.originality import record_answer_vector
+from app.nlp.text_features import TextFeatures
+from app.assessment.grading import grade_answer
+from app.analytics.topic_stats import record_answer
+from app.analytics.result_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
 
 
 def get_initial_topics(db: Session, user_id: UUID, subject_id: UUID) -> list[UUID]:
@@ -40,6 +54,7 @@ def start_assessment(db: Session, user_id: UUID, subject_id: UUID) -> Tuple[Asse
     
     if not initial_topics:
         db.commit()
+        bump_data_version("answers")
         return assessment, None
     
     # Pick first question from first topic
@@ -48,6 +63,7 @@ def start_assessment(db: Session, user_id: UUID, subject_id: UUID) -> Tuple[Asse
     ).first()
     
     db.commit()
+    bump_data_version("answers")
     db.refresh(assessment)
     
     return assessment, first_question
@@ -76,9 +92,16 @@ def submit_answer(
     # Get current question and topic
     current_question = db.query(Question).filter(Question.id == question_id).first()
     if not current_question:
+        if not NLP_ASYNC_MODE:
+            record_answer_indexes(db, answer_attempt)
         db.commit()
+        bump_data_version("answers")
         return answer_attempt, None
     
+    # Auto-grade against the question's expected concepts (compiled matcher is cached)
+    grade_answer(db, answer_attempt, current_question)
+    record_answer(db, current_question.topic_id, answer_attempt.is_correct)
+    
     current_topic_id = current_question.topic_id
     
     # Determine if attempt is partial (thinking break)
@@ -96,12 +119,60 @@ def submit_answer(
         is_partial
     )
     
+    # In async mode the analysis job records them instead (see record_answer_indexes)
+    if not NLP_ASYNC_MODE:
+        record_answer_indexes(db, answer_attempt)
     db.commit()
+    bump_data_version("answers")
     db.refresh(answer_attempt)
     
+    if NLP_ASYNC_MODE:
+        schedule_answer_analysis(db, answer_attempt.id)
+    
     return answer_attempt, next_question
 
 
+def record_answer_indexes(db: Session, answer_attempt: AnswerAttempt) -> None:
+    """
+    Fold the answer into the student's style profile, index it for
+    cross-student near-duplicate search and add it to the question's
+    TF-IDF corpus (same transaction), from one shared tokenization.
+    Called last before the commit: the style profile and question corpus
+    rows stay locked from here until the commit, so nothing else runs
+    while other submissions for the same question wait on them.
+    Not called in async mode: analyze_answer_attempt records all three
+    (each one idempotently) in the background job, keeping the CPU-bound
+    work off the submit request.
+    """
+    features = TextFeatures(answer_attempt.answer_text or "")
+    record_style_sample(db, answer_attempt, features)
+    record_answer_signature(db, answer_attempt, features)
+    record_answer_vector(db, answer_attempt, features)
+
+
+def schedule_answer_analysis(db: Session, answer_attempt_id: UUID) -> None:
+    """
+    Queue NLP analysis of a submitted answer (async mode).
+    Falls back to inline analysis when the background queue is full.
+    Analysis errors are logged and never fail the answer submission.
+    """
+    if nlp_pipeline.enqueue_analysis(answer_attempt_id):
+        return
+    
+    started = time.perf_counter()
+    try:
+        result = analyze_answer_attempt(answer_attempt_id, db)
+        error = None
+    except Exception as e:
+        db.rollback()
+        result, error = None, str(e)
+        logger.error(f"Inline NLP analysis failed for {answer_attempt_id}: {error}")
+    
+    nlp_pipeline.record_inline_analysis(
+        answer_attempt_id, result, (time.perf_counter() - started) * 1000, error
+    )
+
+
 def select_next_question(
     db: Session,
     assessment_id: UUID,
@@ -0,0 +1,203 @@
+"""
+Grading Module
+
+Server-side auto-grading of submitted answers against Question.expected_concepts,
+which holds one of two shapes:
+- a concept list (coding questions), e.g. ["binary tree", "recursion"]:
+  the answer is graded by concept coverage - the share of concepts it
+  mentions - and is correct when coverage reaches GRADING_CONCEPT_PASS_RATIO.
+  Concepts match case-insensitively on word boundaries, with plural forms
+  and hyphen/space variants ("hash-maps" covers "hash map").
+- a multiple-choice dict (trivia questions) with correct_answer and
+  all_options / incorrect_answers: the answer is correct when it is the
+  correct option, or names it without naming any other option.
+
+Building the regexes of a question is the expensive part, so matchers are
+compiled once and kept in an LRU keyed by question id and a version derived
+from the expected_concepts content (an edited question gets a new matcher).
+Grading a cached question is a handful of C-level regex searches.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models.answer_attempt import AnswerAttempt
+from app.models.answer_grade import AnswerGrade
+from app.models.question import Question
+from app.core.config import GRADING_CONCEPT_PASS_RATIO, GRADING_MATCHER_CACHE_SIZE
+
+# Bump when matching rules change
+GRADER_VERSION = "1"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+_SEPARATOR = r"[\s\-_/]*"
+_EDGE_PUNCTUATION = " \t\r\n.,;:!?\"'()[]{}"
+
+
+def _normalize_option(text: str) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation."""
+    return " ".join((text or "").lower().split()).strip(_EDGE_PUNCTUATION)
+
+
+def _token_regex(token: str) -> str:
+    """Regex for one word of a concept, accepting its singular and plural forms."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    if token[-1].isalnum():
+        return re.escape(token) + r"(?:e?s)?"
+    return re.escape(token)
+
+
+def _phrase_regex(phrase: str) -> Optional[str]:
+    tokens = _TOKEN_PATTERN.findall(phrase.lower())
+    if not tokens:
+        return None
+    # Not preceded or followed by a letter or digit, so "tree" doesn't match "street"
+    body = _SEPARATOR.join(_token_regex(token) for token in tokens)
+    return r"(?<![a-z0-9])" + body + r"(?![a-z0-9])"
+
+
+class ConceptMatcher:
+    """Compiled concept-coverage grader for one question."""
+
+    __slots__ = ("concepts", "_patterns")
+
+    mode = "concepts"
+
+    def __init__(self, concepts: List[str]):
+        self.concepts = []
+        self._patterns = []
+        for concept in dict.fromkeys(str(c) for c in concepts if c and str(c).strip()):
+            regex = _phrase_regex(concept)
+            if regex is not None:
+                self.concepts.append(concept)
+                self._patterns.append(re.compile(regex))
+
+    def grade(self, answer_text: str) -> Optional[Dict[str, any]]:
+        if not self.concepts:
+            return None
+        text = (answer_text or "").lower()
+        matched = [
+            concept for concept, pattern in zip(self.concepts, self._patterns)
+            if pattern.search(text)
+        ]
+        coverage = len(matched) / len(self.concepts)
+        return {
+            "mode": self.mode,
+            "is_correct": coverage >= GRADING_CONCEPT_PASS_RATIO,
+            "coverage": coverage,
+            "matched_concepts": matched
+        }
+
+
+class ChoiceMatcher:
+    """Compiled multiple-choice grader for one question."""
+
+    __slots__ = ("correct_answer", "_correct", "_options", "_correct_pattern", "_other_patterns")
+
+    mode = "choice"
+
+    def __init__(self, correct_answer: str, options: List[str]):
+        self.correct_answer = correct_answer
+        self._correct = _normalize_option(correct_answer)
+        self._options = {_normalize_option(option) for option in options} | {self._correct}
+        regex = _phrase_regex(correct_answer)
+        self._correct_pattern = re.compile(regex) if regex else None
+        self._other_patterns = [
+            re.compile(regex) for regex in (
+                _phrase_regex(option) for option in options
+                if _normalize_option(option) != self._correct
+            ) if regex
+        ]
+
+    def grade(self, answer_text: str) -> Optional[Dict[str, any]]:
+        if not self._correct:
+            return None
+        answer = _normalize_option(answer_text)
+        if answer in self._options:
+            is_correct = answer == self._correct
+        else:
+            text = (answer_text or "").lower()
+            is_correct = (
+                self._correct_pattern is not None and
+                bool(self._correct_pattern.search(text)) and
+                not any(pattern.search(text) for pattern in self._other_patterns)
+            )
+        return {
+            "mode": self.mode,
+            "is_correct": is_correct,
+            "coverage": 1.0 if is_correct else 0.0,
+            "matched_concepts": [self.correct_answer] if is_correct else []
+        }
+
+
+def compile_matcher(expected_concepts) -> Optional[object]:
+    """Matcher for a question's expected_concepts, or None if it cannot be graded."""
+    if isinstance(expected_concepts, dict):
+        correct_answer = expected_concepts.get("correct_answer")
+        if not correct_answer:
+            return None
+        options = list(expected_concepts.get("all_options") or [])
+        options += list(expected_concepts.get("incorrect_answers") or [])
+        return ChoiceMatcher(str(correct_answer), [str(option) for option in options])
+    if isinstance(expected_concepts, list) and expected_concepts:
+        return ConceptMatcher(expected_concepts)
+    return None
+
+
+def matcher_version(expected_concepts) -> str:
+    """Identifies the grading rules and the question's expected concepts."""
+    raw = json.dumps(expected_concepts, sort_keys=True, default=str)
+    return f"{GRADER_VERSION}+{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+_lock = threading.Lock()
+_matchers: "OrderedDict[tuple, Optional[object]]" = OrderedDict()
+
+
+def get_matcher(question: Question) -> tuple:
+    """(version, matcher) of a question, compiled on first use and cached by (id, version)."""
+    version = matcher_version(question.expected_concepts)
+    key = (question.id, version)
+    with _lock:
+        if key in _matchers:
+            _matchers.move_to_end(key)
+            return version, _matchers[key]
+
+    # Compile outside the lock; a concurrent compile of the same question is harmless
+    matcher = compile_matcher(question.expected_concepts)
+    with _lock:
+        _matchers[key] = matcher
+        _matchers.move_to_end(key)
+        while len(_matchers) > GRADING_MATCHER_CACHE_SIZE:
+            _matchers.popitem(last=False)
+    return version, matcher
+
+
+def grade_answer(db: Session, answer_attempt: AnswerAttempt, question: Question) -> Optional[AnswerGrade]:
+    """
+    Grade a newly submitted answer against its question: sets
+    answer_attempt.is_correct and stages its AnswerGrade row. Questions
+    without usable expected_concepts leave is_correct unset.
+    Does not flush or commit.
+    """
+    version, matcher = get_matcher(question)
+    result = matcher.grade(answer_attempt.answer_text) if matcher is not None else None
+    if result is None:
+        return None
+
+    answer_attempt.is_correct = result["is_correct"]
+    grade = AnswerGrade(
+        answer_attempt_id=answer_attempt.id,
+        question_id=question.id,
+        grading_mode=result["mode"],
+        coverage=round(result["coverage"], 4),
+        matched_concepts=result["matched_concepts"],
+        grader_version=version
+    )
+    db.add(grade)
+    return grade
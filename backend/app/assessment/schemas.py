@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -37,3 +37,21 @@ class AssessmentStatusResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TelemetryEvent(BaseModel):
+    t: int  # client time, epoch milliseconds
+    type: str  # insert | delete | paste | focus | blur
+    n: int = 0  # characters inserted, deleted or pasted
+
+
+class TelemetryBatchRequest(BaseModel):
+    assessment_id: UUID
+    question_id: UUID
+    events: List[TelemetryEvent]
+
+
+class TelemetryBatchResponse(BaseModel):
+    accepted: int
+    stored_bytes: int
+    duplicate: bool
@@ -18,3 +18,59 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 
 # Demo mode configuration
 DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
+
+# Background NLP analysis configuration
+# When enabled, submitted answers are analyzed in a worker process pool
+NLP_ASYNC_MODE = os.getenv("NLP_ASYNC_MODE", "false").lower() == "true"
+NLP_WORKER_PROCESSES = int(os.getenv("NLP_WORKER_PROCESSES", "2"))
+NLP_QUEUE_MAX_DEPTH = int(os.getenv("NLP_QUEUE_MAX_DEPTH", "100"))
+
+# NLP result cache: in-process LRU bounds; database rows are deleted once this many days
+# old (or written by another analyzer version), checked by each API process this often
+# (0: not scheduled, run python -m app.utils.prune_nlp_cache instead)
+NLP_CACHE_ENABLED = os.getenv("NLP_CACHE_ENABLED", "true").lower() == "true"
+NLP_CACHE_MAX_ENTRIES = int(os.getenv("NLP_CACHE_MAX_ENTRIES", "2048"))
+NLP_CACHE_TTL_SECONDS = int(os.getenv("NLP_CACHE_TTL_SECONDS", "3600"))
+NLP_CACHE_DB_TTL_DAYS = int(os.getenv("NLP_CACHE_DB_TTL_DAYS", "30"))
+NLP_CACHE_PRUNE_INTERVAL_SECONDS = int(os.getenv("NLP_CACHE_PRUNE_INTERVAL_SECONDS", "3600"))
+
+# Quality-jump baseline: compare each answer against the student's style
+# profile for the answer's subject instead of across all subjects
+NLP_STYLE_BASELINE_PER_SUBJECT = os.getenv("NLP_STYLE_BASELINE_PER_SUBJECT", "false").lower() == "true"
+
+# Auto-grading: share of a question's expected concepts an answer must cover
+# to count as correct, and how many compiled question matchers stay cached
+GRADING_CONCEPT_PASS_RATIO = float(os.getenv("GRADING_CONCEPT_PASS_RATIO", "0.5"))
+GRADING_MATCHER_CACHE_SIZE = int(os.getenv("GRADING_MATCHER_CACHE_SIZE", "1024"))
+
+# Live draft analysis: in-process session bounds (per API worker)
+NLP_LIVE_MAX_SESSIONS = int(os.getenv("NLP_LIVE_MAX_SESSIONS", "10000"))
+NLP_LIVE_SESSION_TTL_SECONDS = int(os.getenv("NLP_LIVE_SESSION_TTL_SECONDS", "1800"))
+
+# Per-stage NLP analysis timing (Server-Timing header, details, /nlp/timing/stats)
+NLP_STAGE_TIMING_ENABLED = os.getenv("NLP_STAGE_TIMING_ENABLED", "false").lower() == "true"
+
+# Shadow scoring: a candidate risk-scoring module (import path) and the share of
+# /nlp/analyze requests also scored with it in the background (0 disables)
+NLP_SHADOW_CANDIDATE = os.getenv("NLP_SHADOW_CANDIDATE", "")
+NLP_SHADOW_SAMPLE_RATE = float(os.getenv("NLP_SHADOW_SAMPLE_RATE", "0"))
+
+# Leaderboard: in-memory boards are rebuilt from the database after this many seconds
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+
+# Capability history: points older than this are merged into one per student, topic and day
+# (python -m app.utils.capability_history downsample)
+CAPABILITY_HISTORY_RAW_DAYS = int(os.getenv("CAPABILITY_HISTORY_RAW_DAYS", "90"))
+
+# Daily rollups job: run by each API process this often (0: not scheduled, run it from cron);
+# answers are aggregated once this old (late commits are not missed), at most this many days
+# per transaction
+ROLLUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "300"))
+ROLLUP_LAG_SECONDS = int(os.getenv("ROLLUP_LAG_SECONDS", "300"))
+ROLLUP_WINDOW_DAYS = int(os.getenv("ROLLUP_WINDOW_DAYS", "7"))
+
+# Analytics result cache: entries are invalidated by writes in this process, and
+# expire after the TTL (picks up writes made by other workers and commands)
+ANALYTICS_CACHE_ENABLED = os.getenv("ANALYTICS_CACHE_ENABLED", "true").lower() == "true"
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1024"))
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "60"))
@@ -10,6 +10,16 @@ from app.models.assessment import AssessmentAttempt, Assessment
 from app.models.answer_attempt import AnswerAttempt
 from app.models.capability import CapabilityScore, Capability
 from app.models.feedback import Feedback, FeedbackLegacy
+from app.models.style_profile import StyleProfile, StyleSample
+from app.models.answer_signature import AnswerSignature, AnswerLSHBucket
+from app.models.nlp_result_cache import NLPResultCache
+from app.models.nlp_analysis import NLPAnalysis
+from app.models.answer_grade import AnswerGrade
+from app.models.answer_vector import QuestionCorpus, QuestionTerm, AnswerVector
+from app.models.telemetry import TelemetryChunk
+from app.models.topic_stats import TopicStats
+from app.models.capability_history import CapabilityHistory
+from app.models.daily_rollup import StudentTopicDaily, TopicDaily, RollupWatermark
 
 # Legacy models for backward compatibility
 from app.models.student import Student
@@ -26,6 +36,22 @@ __all__ = [
     "AnswerAttempt",
     "CapabilityScore",
     "Feedback",
+    "StyleProfile",
+    "StyleSample",
+    "AnswerSignature",
+    "AnswerLSHBucket",
+    "NLPResultCache",
+    "NLPAnalysis",
+    "AnswerGrade",
+    "QuestionCorpus",
+    "QuestionTerm",
+    "AnswerVector",
+    "TelemetryChunk",
+    "TopicStats",
+    "CapabilityHistory",
+    "StudentTopicDaily",
+    "TopicDaily",
+    "RollupWatermark",
     # Legacy models
     "Student",
     "Faculty",
@@ -0,0 +1,16 @@
+from typing import Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model) -> Optional[object]:
+    """
+    INSERT construct supporting ON CONFLICT for the session's database
+    (PostgreSQL or SQLite), or None for other databases.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return None
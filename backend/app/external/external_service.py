@@ -280,7 +280,7 @@ def get_external_api_status() -> Dict:
                 "Similarity detection (rapidfuzz)",
                 "Repetition detection (local)",
                 "Writing flow analysis (sentence variance)",
-                "Originality scoring (cosine similarity)"
+                "Originality scoring (TF-IDF cosine similarity per question)"
             ],
             "note": "NO paid AI APIs. NO OpenAI. Everything is explainable and local."
         }
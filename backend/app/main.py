@@ -1,7 +1,7 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.database import engine
+from app.db.database import SessionLocal, engine
 from app.db.base import Base
 from app.routes import students_router, subjects_router, topics_router, assessment_router, feedback_router, capability_router, faculty_router
 from app.auth import auth_router
@@ -10,14 +10,29 @@ from app.nlp import nlp_router
 from app.analytics import analytics_router
 from app.utils.health_check import router as health_router
 from app.external import external_router
+from app.nlp.nlp_pipeline import shutdown_pipeline
+from app.nlp.shadow import shutdown_shadow
+from app.analytics.leaderboard import rebuild_leaderboards
+from app.utils.background_jobs import start_background_jobs, stop_background_jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: create database tables
     Base.metadata.create_all(bind=engine)
+    # Build the in-memory leaderboard from the database
+    db = SessionLocal()
+    try:
+        rebuild_leaderboards(db)
+    finally:
+        db.close()
+    # Keep the daily rollups current and prune the NLP result cache (app/utils/background_jobs.py)
+    start_background_jobs()
     yield
-    # Shutdown: cleanup (if needed)
+    # Shutdown: let queued NLP analyses finish and stop worker processes
+    shutdown_pipeline()
+    shutdown_shadow()
+    stop_background_jobs()
 
 
 # Create FastAPI instance
@@ -1,7 +1,8 @@
 import uuid
-from sqlalchemy import Column, Text, Integer, Boolean, ForeignKey
+from sqlalchemy import Column, Text, Integer, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.db.database import Base
 
 
@@ -15,8 +16,16 @@ class AnswerAttempt(Base):
     progress_percentage = Column(Integer, nullable=True)
     stopped_at_step = Column(Integer, nullable=True)
     is_correct = Column(Boolean, nullable=True)
+    # Read by the daily rollups job; default as well as server_default so it is set on
+    # SQLite databases migrated by app.utils.migrate (no column default there)
+    submitted_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=True, index=True)
 
     # Relationships
     assessment_attempt = relationship("AssessmentAttempt", back_populates="answer_attempts")
     question = relationship("Question", back_populates="answer_attempts")
     feedback = relationship("Feedback", back_populates="answer_attempt", uselist=False)
+
+    __table_args__ = (
+        Index("ix_answer_attempts_assessment_question", "assessment_id", "question_id"),
+        Index("ix_answer_attempts_question_id", "question_id"),
+    )
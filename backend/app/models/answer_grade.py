@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Float, String, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSON
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class AnswerGrade(Base):
+    """
+    Auto-grading result of one answer attempt against its question's
+    expected_concepts. The pass/fail outcome is AnswerAttempt.is_correct;
+    this row keeps the coverage behind it.
+    """
+    __tablename__ = "answer_grades"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), nullable=False, index=True)
+    grading_mode = Column(String(10), nullable=False)  # concepts | choice
+    coverage = Column(Float, nullable=False)  # 0.0-1.0 share of expected concepts found
+    matched_concepts = Column(JSON, nullable=False)
+    grader_version = Column(String(64), nullable=False)
+    graded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class AnswerSignature(Base):
+    """
+    MinHash signature of one answer, used for cross-student near-duplicate
+    detection (see app/nlp/minhash.py). Packed as NUM_PERM little-endian uint32.
+    """
+    __tablename__ = "answer_signatures"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    answer_attempt = relationship("AnswerAttempt")
+    user = relationship("User")
+
+
+class AnswerLSHBucket(Base):
+    """
+    LSH bucket of one band of an answer's signature.
+    Answers to the same question sharing any (band, bucket) are near-duplicate candidates.
+    """
+    __tablename__ = "answer_lsh_buckets"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_answer_lsh_buckets_lookup", "question_id", "band", "bucket"),
+    )
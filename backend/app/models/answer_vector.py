@@ -0,0 +1,52 @@
+from sqlalchemy import Column, Integer, Float, LargeBinary, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID, JSON
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class QuestionCorpus(Base):
+    """
+    Running statistics of all answer vectors of one question:
+    how many there are and the squared norm of their sum (the centroid direction).
+    """
+    __tablename__ = "question_corpora"
+
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), primary_key=True)
+    doc_count = Column(Integer, nullable=False, default=0)
+    centroid_norm_sq = Column(Float, nullable=False, default=0.0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuestionTerm(Base):
+    """
+    Document frequency of one hashed term among a question's answers, and the
+    sum of its TF-IDF weights over those answers (the centroid component).
+    """
+    __tablename__ = "question_terms"
+
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), primary_key=True)
+    term = Column(Integer, primary_key=True)
+    doc_freq = Column(Integer, nullable=False, default=0)
+    weight_sum = Column(Float, nullable=False, default=0.0)
+
+
+class AnswerVector(Base):
+    """
+    Sparse TF-IDF vector of one answer (see app/nlp/tfidf.py), with its
+    similarity to the question's earlier answers measured when it arrived.
+    """
+    __tablename__ = "answer_vectors"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    corpus_size = Column(Integer, nullable=False)  # earlier answers to the question
+    centroid_similarity = Column(Float, nullable=False)  # 0.0-1.0
+    nearest_similarity = Column(Float, nullable=False)  # 0.0-1.0, other students only
+    top_similarities = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_answer_vectors_question_created", "question_id", "created_at"),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -31,6 +31,11 @@ class AssessmentAttempt(Base):
     subject = relationship("Subject", back_populates="assessment_attempts")
     answer_attempts = relationship("AnswerAttempt", back_populates="assessment_attempt")
 
+    __table_args__ = (
+        Index("ix_assessment_attempts_user_started", "user_id", "started_at"),
+        Index("ix_assessment_attempts_status", "status"),
+    )
+
 
 # Legacy Assessment model - kept for backward compatibility with existing routes
 class Assessment(Base):
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -24,6 +24,12 @@ class CapabilityScore(Base):
     user = relationship("User", back_populates="capability_scores")
     topic = relationship("Topic", back_populates="capability_scores")
 
+    __table_args__ = (
+        # One score per student and topic
+        Index("uq_capability_scores_user_topic", "user_id", "topic_id", unique=True),
+        Index("ix_capability_scores_topic_id", "topic_id"),
+    )
+
 
 # Legacy Capability model - kept for backward compatibility with existing routes
 class Capability(Base):
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class CapabilityHistory(Base):
+    """
+    Append-only log of capability score changes: one point per change, with
+    the level it replaced, so growth over a time range is read from the
+    points inside the range alone (app/analytics/capability_history.py).
+    Points older than CAPABILITY_HISTORY_RAW_DAYS are rolled into one point
+    per student, topic and day by python -m app.utils.capability_history downsample.
+    """
+    __tablename__ = "capability_history"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    topic_id = Column(UUID(as_uuid=True), ForeignKey("topics.id"), nullable=False)
+    capability_level = Column(SmallInteger, nullable=False)  # 0-100, after the change
+    previous_level = Column(SmallInteger, nullable=True)  # before the change; null for a new score
+    streak = Column(SmallInteger, nullable=False, default=0)
+    recorded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_capability_history_topic_recorded", "topic_id", "recorded_at"),
+        Index("ix_capability_history_user_recorded", "user_id", "recorded_at"),
+    )
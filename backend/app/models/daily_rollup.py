@@ -0,0 +1,46 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class StudentTopicDaily(Base):
+    """
+    One student's answers to one topic's questions on one (UTC) day. Filled
+    by the incremental rollup job (app/analytics/daily_rollups.py), so
+    student trends read at most one row per topic and day.
+    """
+    __tablename__ = "student_topic_daily"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    topic_id = Column(UUID(as_uuid=True), ForeignKey("topics.id"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    graded = Column(Integer, nullable=False, default=0)  # answers auto-graded (accuracy = correct / graded)
+    correct = Column(Integer, nullable=False, default=0)
+    partials = Column(Integer, nullable=False, default=0)  # progress < 40% or stopped at a step
+    progress_sum = Column(Integer, nullable=False, default=0)  # average progress = sum / count
+    progress_count = Column(Integer, nullable=False, default=0)
+
+
+class TopicDaily(Base):
+    """Every student's answers to one topic's questions on one (UTC) day; same counters as StudentTopicDaily."""
+    __tablename__ = "topic_daily"
+
+    topic_id = Column(UUID(as_uuid=True), ForeignKey("topics.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    graded = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    partials = Column(Integer, nullable=False, default=0)
+    progress_sum = Column(Integer, nullable=False, default=0)
+    progress_count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """How far an incremental rollup job has processed its source rows."""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    processed_until = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -31,6 +31,11 @@ class Feedback(Base):
     answer_attempt = relationship("AnswerAttempt", back_populates="feedback")
     suggested_topic = relationship("Topic")
 
+    __table_args__ = (
+        Index("ix_feedback_answer_attempt_id", "answer_attempt_id"),
+        Index("ix_feedback_gap_type", "gap_type"),
+    )
+
 
 # Legacy Feedback model - kept for backward compatibility with existing routes
 class FeedbackLegacy(Base):
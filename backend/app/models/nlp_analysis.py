@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class NLPAnalysis(Base):
+    """
+    Latest NLP scores of one answer attempt, written by every analysis.
+    user_id is denormalized from the assessment attempt so per-student
+    trends are read from this table alone.
+    """
+    __tablename__ = "nlp_analysis"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    originality_score = Column(Integer, nullable=False)  # 0-100
+    confidence_score = Column(Integer, nullable=False)  # 0-100
+    risk_flag = Column(String(10), nullable=False)  # none | low | medium | high
+    analyzer_version = Column(String(64), nullable=False)
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_nlp_analysis_user_analyzed_at", "user_id", "analyzed_at"),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class NLPResultCache(Base):
+    """
+    Persistent tier of the NLP result cache (see app/nlp/result_cache.py).
+    cache_key is the sha256 of (answer text hash, analyzer version, baseline fingerprint),
+    so a new analyzer version never reads rows written by an older one.
+    """
+    __tablename__ = "nlp_result_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    text_hash = Column(String(64), nullable=False)
+    analyzer_version = Column(String(64), nullable=False, index=True)
+    baseline_fingerprint = Column(String(64), nullable=False)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # pruning by age
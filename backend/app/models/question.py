@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -24,3 +24,7 @@ class Question(Base):
     # Relationships
     topic = relationship("Topic", back_populates="questions")
     answer_attempts = relationship("AnswerAttempt", back_populates="question")
+
+    __table_args__ = (
+        Index("ix_questions_topic_id", "topic_id"),
+    )
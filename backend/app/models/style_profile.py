@@ -0,0 +1,66 @@
+import uuid
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class StyleProfile(Base):
+    """
+    Per-student stylometric baseline used for quality-jump detection.
+    Holds running mean and M2 (sum of squared deviations) per metric,
+    updated in O(1) per answer with Welford's online algorithm.
+    subject_id NULL means the profile spans all of the student's subjects.
+    One profile per (user_id, subject_id): NULL subject_ids never conflict
+    in a unique index, so the overall profile has its own partial index.
+    """
+    __tablename__ = "style_profiles"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    subject_id = Column(UUID(as_uuid=True), ForeignKey("subjects.id"), nullable=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    complexity_mean = Column(Float, nullable=False, default=0.0)
+    complexity_m2 = Column(Float, nullable=False, default=0.0)
+    word_length_mean = Column(Float, nullable=False, default=0.0)
+    word_length_m2 = Column(Float, nullable=False, default=0.0)
+    unique_ratio_mean = Column(Float, nullable=False, default=0.0)
+    unique_ratio_m2 = Column(Float, nullable=False, default=0.0)
+    words_per_sentence_mean = Column(Float, nullable=False, default=0.0)
+    words_per_sentence_m2 = Column(Float, nullable=False, default=0.0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_style_profiles_user_subject", "user_id", "subject_id"),
+        Index(
+            "uq_style_profiles_user_subject", "user_id", "subject_id", unique=True,
+            postgresql_where=text("subject_id IS NOT NULL"), sqlite_where=text("subject_id IS NOT NULL")
+        ),
+        Index(
+            "uq_style_profiles_user_overall", "user_id", unique=True,
+            postgresql_where=text("subject_id IS NULL"), sqlite_where=text("subject_id IS NULL")
+        ),
+    )
+
+    # Relationships
+    user = relationship("User")
+    subject = relationship("Subject")
+
+
+class StyleSample(Base):
+    """
+    Style metrics of one answer that has been folded into its student's profiles.
+    Makes folding idempotent and lets an answer be compared against its
+    profile with its own contribution removed.
+    """
+    __tablename__ = "style_samples"
+
+    answer_attempt_id = Column(UUID(as_uuid=True), ForeignKey("answer_attempts.id"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    subject_id = Column(UUID(as_uuid=True), ForeignKey("subjects.id"), nullable=False)
+    complexity = Column(Float, nullable=False)
+    word_length = Column(Float, nullable=False)
+    unique_ratio = Column(Float, nullable=False)
+    words_per_sentence = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class TelemetryChunk(Base):
+    """
+    One batch of edit and focus events recorded while a student answers a
+    question, delta-encoded into a single binary value (see app/nlp/telemetry.py).
+    Keyed by the batch's first event time, so a retried batch is stored once
+    and an answer's chunks read back in order.
+    """
+    __tablename__ = "telemetry_chunks"
+
+    assessment_id = Column(UUID(as_uuid=True), ForeignKey("assessment_attempts.id"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), primary_key=True)
+    started_ms = Column(BigInteger, primary_key=True)  # client time of the first event, epoch ms
+    event_count = Column(Integer, nullable=False)
+    events = Column(LargeBinary, nullable=False)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db.database import Base
@@ -17,3 +17,7 @@ class Topic(Base):
     subject = relationship("Subject", back_populates="topics")
     questions = relationship("Question", back_populates="topic")
     capability_scores = relationship("CapabilityScore", back_populates="topic")
+
+    __table_args__ = (
+        Index("ix_topics_subject_id", "subject_id"),
+    )
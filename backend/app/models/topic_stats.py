@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class TopicStats(Base):
+    """
+    Rollup of one topic's answers, capability scores and feedback gap types,
+    so dashboards read every topic in one query. Counters are incremented in
+    the transaction that changes the underlying rows (app/analytics/topic_stats.py)
+    and can be rebuilt from scratch with python -m app.utils.rebuild_topic_stats.
+    """
+    __tablename__ = "topic_stats"
+
+    topic_id = Column(UUID(as_uuid=True), ForeignKey("topics.id"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)  # answers graded incorrect
+    capability_sum = Column(Integer, nullable=False, default=0)
+    capability_count = Column(Integer, nullable=False, default=0)
+    gap_conceptual = Column(Integer, nullable=False, default=0)  # feedback rows per gap type
+    gap_procedural = Column(Integer, nullable=False, default=0)
+    gap_logic = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,354 @@
+"""
+NLP Benchmarks
+
+Micro-benchmarks for the LOCAL NLP analyzers. Uses synthetic answers built
+from a fixed vocabulary so runs are reproducible; no database is needed.
+
+Usage:
+    python -m app.nlp.benchmarks repetition
+    python -m app.nlp.benchmarks features
+    python -m app.nlp.benchmarks phrases
+    python -m app.nlp.benchmarks quality_jump
+    python -m app.nlp.benchmarks collusion
+    python -m app.nlp.benchmarks originality
+    python -m app.nlp.benchmarks lazy_writing
+"""
+
+import random
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+from app.nlp.repetition import find_similar_pairs_indexed, find_similar_pairs_pairwise
+from app.nlp.text_features import TextFeatures
+from app.nlp.phrase_matcher import DEFAULT_GENERIC_PHRASES, PhraseMatcher
+from app.nlp.style_profile import fold_sample, new_profile, style_baseline, style_metrics
+from app.nlp.minhash import LSHIndex, compute_signature, token_shingles
+from app.nlp.collusion import COLLUSION_JACCARD_THRESHOLD, COLLUSION_SIMILARITY_THRESHOLD
+from app.nlp.originality import ORIGINALITY_NEIGHBOR_WINDOW
+from app.nlp import tfidf
+from app.nlp.nlp_service import combine_writing_analyses
+
+
+ANSWER_SIZES = [50, 300, 2000]
+
+VOCABULARY = (
+    "the a an of to in is it that for on with as this be by are we can use "
+    "array tree node list time complexity sort search hash map key value "
+    "pointer loop index binary heap stack queue graph edge vertex path cost "
+    "memory recursion function return call data structure algorithm insert "
+    "delete lookup balanced height left right child parent root leaf level "
+    "order traversal depth breadth first visit mark queue push pop front back "
+    "linear logarithmic constant quadratic worst average best case bound"
+).split()
+
+
+def make_answer(word_count: int, seed: int = 42) -> str:
+    """Build a reproducible synthetic answer with sentence punctuation."""
+    rng = random.Random(seed)
+    words = []
+    for i in range(word_count):
+        word = rng.choice(VOCABULARY)
+        if i % rng.randint(8, 20) == 0 and i > 0:
+            word += "."
+        words.append(word)
+    return " ".join(words)
+
+
+def trigram_phrases(answer_text: str) -> List[str]:
+    """Distinct 3-word phrases in first-seen order, as analyze_repetition builds them."""
+    words = answer_text.lower().split()
+    return list(dict.fromkeys(" ".join(words[i:i + 3]) for i in range(len(words) - 2)))
+
+
+def time_call(func: Callable, repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_repetition():
+    """Compare the pairwise and indexed near-duplicate engines."""
+    print(f"{'words':>6} {'phrases':>8} {'pairwise ms':>12} {'indexed ms':>11} {'speedup':>8}  same")
+    for size in ANSWER_SIZES:
+        phrases = trigram_phrases(make_answer(size))
+        repeat = 1 if size >= 2000 else 5
+
+        # The pre-index loop scored every pair before keeping the top 3
+        pairwise_ms = time_call(lambda: find_similar_pairs_pairwise(phrases, limit=sys.maxsize), repeat)
+        indexed_ms = time_call(lambda: find_similar_pairs_indexed(phrases, limit=3), repeat)
+
+        same = (
+            find_similar_pairs_pairwise(phrases, limit=3) ==
+            find_similar_pairs_indexed(phrases, limit=3)
+        )
+        speedup = pairwise_ms / indexed_ms if indexed_ms else float("inf")
+        print(f"{size:>6} {len(phrases):>8} {pairwise_ms:>12.2f} {indexed_ms:>11.2f} {speedup:>7.1f}x  {same}")
+
+
+def legacy_tokenization(answer_text: str, previous_answers: List[str]):
+    """
+    The tokenization each analyzer used to repeat on its own, one call per
+    analyzer: length, variety, repetition, generic phrasing, pause behavior
+    and quality-jump complexity of the answer and of every previous answer.
+    """
+    answer_text.split()                                    # analyze_answer_length
+    sentences = re.split(r'[.!?]+', answer_text)           # analyze_sentence_variety
+    sentences = [s.strip() for s in sentences if s.strip()]
+    [len(s.split()) for s in sentences]
+    len(answer_text.split())                               # analyze_repetition
+    answer_text.lower().split()
+    answer_text.lower()                                    # detect_generic_phrasing
+    answer_text.split()
+    answer_text.split()                                    # analyze_pause_behavior
+    for text in [answer_text] + previous_answers:          # calculate_complexity
+        words = text.split()
+        sum(len(w) for w in words)
+        set(words)
+        sentences = re.split(r'[.!?]+', text)
+        [s.strip() for s in sentences if s.strip()]
+
+
+def shared_tokenization(answer_text: str, profile):
+    """
+    What the pipeline does now: one TextFeatures for the answer, reading the
+    fields the analyzers read (counts and offsets, no token lists), and the
+    previous answers' style read from the student's persisted style profile
+    instead of re-tokenizing them.
+    """
+    features = TextFeatures(answer_text)
+    features.word_count
+    features.sentence_word_counts
+    features.token_starts
+    features.lower
+    features.total_word_length
+    features.unique_word_count
+    style_baseline(profile)
+
+
+def peak_allocation_kib(func: Callable) -> float:
+    """Peak memory allocated while func runs, in KiB."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_features():
+    """Compare per-analyzer tokenization with one shared TextFeatures and the persisted style profile."""
+    print(f"{'words':>6} {'previous':>8} {'legacy ms':>10} {'shared ms':>10} {'speedup':>8} "
+          f"{'legacy KiB':>11} {'shared KiB':>11}")
+    for size in ANSWER_SIZES:
+        answer_text = make_answer(size)
+        for previous_count in [0, 5]:
+            previous_answers = [make_answer(size, seed=seed) for seed in range(previous_count)]
+            profile = new_profile(None, None)
+            for text in previous_answers:
+                fold_sample(profile, style_metrics(text))
+            repeat = 20 if size >= 2000 else 200
+
+            legacy_ms = time_call(lambda: legacy_tokenization(answer_text, previous_answers), repeat)
+            shared_ms = time_call(lambda: shared_tokenization(answer_text, profile), repeat)
+            legacy_kib = peak_allocation_kib(lambda: legacy_tokenization(answer_text, previous_answers))
+            shared_kib = peak_allocation_kib(lambda: shared_tokenization(answer_text, profile))
+
+            speedup = legacy_ms / shared_ms if shared_ms else float("inf")
+            print(f"{size:>6} {previous_count:>8} {legacy_ms:>10.3f} {shared_ms:>10.3f} {speedup:>7.1f}x "
+                  f"{legacy_kib:>11.1f} {shared_kib:>11.1f}")
+
+
+def make_lexicon(size: int, seed: int = 7) -> List[str]:
+    """The default generic phrases padded with reproducible 2-4 word phrases."""
+    rng = random.Random(seed)
+    phrases = list(DEFAULT_GENERIC_PHRASES)
+    while len(phrases) < size:
+        phrases.append(" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 4))))
+    return list(dict.fromkeys(phrases))[:size]
+
+
+def bench_phrases():
+    """Per-phrase re.search loop vs the single-scan phrase matcher as the lexicon grows."""
+    print(f"{'words':>6} {'lexicon':>8} {'re.search ms':>13} {'matcher ms':>11} {'speedup':>8}  same")
+    for size in [300, 2000]:
+        text_lower = make_answer(size).lower()
+        for lexicon_size in [20, 200, 2000]:
+            lexicon = make_lexicon(lexicon_size)
+            matcher = PhraseMatcher(lexicon)
+            patterns = [re.escape(phrase) for phrase in lexicon]
+
+            def search_each():
+                return [p for p, pattern in zip(lexicon, patterns) if re.search(pattern, text_lower)]
+
+            search_ms = time_call(search_each, 5)
+            matcher_ms = time_call(lambda: matcher.find_all(text_lower), 5)
+            same = search_each() == list(matcher.find_all(text_lower))
+            speedup = search_ms / matcher_ms if matcher_ms else float("inf")
+            print(f"{size:>6} {lexicon_size:>8} {search_ms:>13.3f} {matcher_ms:>11.3f} {speedup:>7.1f}x  {same}")
+
+
+def bench_quality_jump():
+    """Re-deriving the quality-jump baseline from previous texts vs reading the style profile."""
+    print(f"{'history':>8} {'rederive ms':>12} {'profile ms':>11} {'speedup':>8} {'mean diff':>10}")
+    for history in [5, 50, 500]:
+        previous_answers = [make_answer(300, seed=seed) for seed in range(history)]
+        profile = new_profile(None, None)
+        for text in previous_answers:
+            fold_sample(profile, style_metrics(text))
+        repeat = 5 if history >= 500 else 50
+
+        def rederive():
+            complexities = [style_metrics(text)["complexity"] for text in previous_answers]
+            return sum(complexities) / len(complexities)
+
+        rederive_ms = time_call(rederive, repeat)
+        profile_ms = time_call(lambda: style_baseline(profile), repeat)
+        mean_diff = abs(rederive() - style_baseline(profile)["complexity"]["mean"])
+        speedup = rederive_ms / profile_ms if profile_ms else float("inf")
+        print(f"{history:>8} {rederive_ms:>12.3f} {profile_ms:>11.4f} {speedup:>7.0f}x {mean_diff:>10.2e}")
+
+
+def make_near_duplicate(answer_text: str, edits: int, seed: int) -> str:
+    """Copy of an answer with a few words replaced, as a lightly disguised copy would be."""
+    rng = random.Random(seed)
+    words = answer_text.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def bench_collusion(answer_count: int = 10000, copy_every: int = 100, brute_force_queries: int = 20):
+    """Cross-student near-duplicate search for one question: brute-force rapidfuzz vs MinHash/LSH."""
+    from rapidfuzz import fuzz
+
+    answers = [make_answer(80, seed=seed) for seed in range(answer_count)]
+    planted = {}
+    for i in range(copy_every, answer_count, copy_every):
+        answers[i] = make_near_duplicate(answers[i - copy_every // 2], edits=3, seed=i)
+        planted[i] = i - copy_every // 2
+
+    start = time.perf_counter()
+    signatures = [compute_signature(token_shingles(text.lower().split())) for text in answers]
+    signature_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index = LSHIndex()
+    for i, signature in enumerate(signatures):
+        index.add(i, signature)
+    index_ms = (time.perf_counter() - start) * 1000
+
+    # Each answer checked against the index, as analyze_collusion does
+    candidate_total = 0
+    found = 0
+    start = time.perf_counter()
+    for i, signature in enumerate(signatures):
+        matches = index.query(signature, COLLUSION_JACCARD_THRESHOLD)
+        candidate_total += len(index.candidates(signature))
+        if i in planted and any(key == planted[i] for key, _ in matches):
+            found += 1
+    lsh_query_ms = (time.perf_counter() - start) * 1000 / answer_count
+
+    # Brute force: one rapidfuzz call per other answer
+    start = time.perf_counter()
+    for i in range(brute_force_queries):
+        [j for j in range(answer_count)
+         if j != i and fuzz.token_sort_ratio(answers[i], answers[j]) >= COLLUSION_SIMILARITY_THRESHOLD]
+    brute_query_ms = (time.perf_counter() - start) * 1000 / brute_force_queries
+
+    print(f"answers per question:        {answer_count}")
+    print(f"signatures:                  {signature_ms:.0f} ms total, {signature_ms / answer_count:.3f} ms each")
+    print(f"LSH index build:             {index_ms:.0f} ms")
+    print(f"avg LSH candidates / answer: {candidate_total / answer_count:.2f}")
+    print(f"LSH check per answer:        {lsh_query_ms:.3f} ms")
+    print(f"brute-force per answer:      {brute_query_ms:.1f} ms ({brute_query_ms / lsh_query_ms:.0f}x slower)")
+    print(f"planted copies found:        {found}/{len(planted)}")
+
+
+def bench_originality(answer_count: int = 20000, report_every: int = 5000):
+    """
+    TF-IDF originality for one question, with the corpus statistics kept in
+    memory as record_vector_counts keeps them in question_terms: cost per
+    answer should stay flat as the corpus grows.
+    """
+    doc_freqs, centroid, vectors = {}, {}, []
+    norm_sq = 0.0
+    timings = []
+    for i in range(answer_count):
+        counts = tfidf.term_counts(make_answer(80, seed=i).lower())
+        start = time.perf_counter()
+        vector = tfidf.tfidf_vector(counts, doc_freqs, len(vectors))
+        terms, weights = vector
+        centroid_dot = sum(w * centroid.get(t, 0.0) for t, w in zip(terms, weights))
+        centroid_similarity = centroid_dot / norm_sq ** 0.5 if norm_sq else 0.0
+        max(tfidf.similarities(vector, vectors[-ORIGINALITY_NEIGHBOR_WINDOW:]), default=0.0)
+        norm_sq += 2 * centroid_dot + sum(w * w for w in weights)
+        for t, w in zip(terms, weights):
+            doc_freqs[t] = doc_freqs.get(t, 0) + 1
+            centroid[t] = centroid.get(t, 0.0) + w
+        vectors.append(tfidf.vector_to_bytes(vector))
+        timings.append(time.perf_counter() - start)
+        if (i + 1) % report_every == 0:
+            recent = timings[-report_every:]
+            print(f"answers {i + 1 - report_every:>6}-{i + 1:<6} {sum(recent) / len(recent) * 1000:.3f} ms/answer "
+                  f"(centroid similarity {centroid_similarity:.2f})")
+
+    query = tfidf.vector_from_bytes(vectors[-1])
+    start = time.perf_counter()
+    brute = tfidf.similarities(query, vectors)
+    brute_ms = (time.perf_counter() - start) * 1000
+    print(f"all {answer_count} answers (unbounded): {brute_ms:.1f} ms per answer, max similarity {sorted(brute)[-2]:.2f}")
+
+
+def bench_lazy_writing(answers_per_size: int = 20):
+    """combine_writing_analyses in full vs lazy mode; the writing flags must agree."""
+    no_jump = {"quality_jump_detected": False}
+    print(f"{'words':>6} {'full ms':>8} {'lazy ms':>8} {'speedup':>8} {'fuzzy skipped':>14}  same flags")
+    for size in ANSWER_SIZES:
+        texts = [make_answer(size, seed=seed) for seed in range(answers_per_size)]
+        features = [TextFeatures(text) for text in texts]
+        repeat = 1 if size >= 2000 else 3
+
+        full_ms = time_call(lambda: [
+            combine_writing_analyses(text, no_jump, f, full=True) for text, f in zip(texts, features)
+        ], repeat) / len(texts)
+        lazy_ms = time_call(lambda: [
+            combine_writing_analyses(text, no_jump, f) for text, f in zip(texts, features)
+        ], repeat) / len(texts)
+
+        lazy = [combine_writing_analyses(text, no_jump, f) for text, f in zip(texts, features)]
+        full = [combine_writing_analyses(text, no_jump, f, full=True) for text, f in zip(texts, features)]
+        skipped = sum(not result["repetition_analysis"]["similar_phrases_checked"] for result in lazy)
+        same = all(
+            (a["looks_ai_generated"], a["low_originality"], a["repetition_analysis"]["is_repetitive"]) ==
+            (b["looks_ai_generated"], b["low_originality"], b["repetition_analysis"]["is_repetitive"])
+            for a, b in zip(lazy, full)
+        )
+        speedup = full_ms / lazy_ms if lazy_ms else float("inf")
+        print(f"{size:>6} {full_ms:>8.2f} {lazy_ms:>8.2f} {speedup:>7.1f}x {skipped:>8}/{len(texts):<5}  {same}")
+
+
+BENCHMARKS = {
+    "repetition": bench_repetition,
+    "features": bench_features,
+    "phrases": bench_phrases,
+    "quality_jump": bench_quality_jump,
+    "collusion": bench_collusion,
+    "originality": bench_originality,
+    "lazy_writing": bench_lazy_writing,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
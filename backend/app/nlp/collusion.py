@@ -0,0 +1,225 @@
+"""
+Collusion Detection Module
+
+Cross-student near-duplicate detection for answers to the same Question.
+
+Comparing a new answer with every other student's answer using rapidfuzz
+would cost one call per previous answer, O(students^2) per question.
+Instead, each answer gets a MinHash signature and its LSH band buckets are
+stored in answer_lsh_buckets, indexed by (question_id, band, bucket):
+1. one indexed query returns only the answers sharing a bucket with the new
+   one - a handful of candidates, whatever the number of answers
+2. candidates are ranked by estimated Jaccard similarity of signatures
+3. the closest few are verified with rapidfuzz token_sort_ratio
+Answers from the same student and answers shorter than
+MIN_COLLUSION_WORDS (e.g. multiple-choice picks) are never flagged.
+"""
+
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models.answer_attempt import AnswerAttempt
+from app.models.answer_signature import AnswerSignature, AnswerLSHBucket
+from app.models.user import User
+from app.nlp.minhash import (
+    band_keys, cluster_signatures, compute_signature, estimate_jaccard, feature_shingles,
+    signature_from_bytes, signature_to_bytes
+)
+from app.nlp.text_features import TextFeatures
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+# Shorter answers are too likely to coincide honestly
+MIN_COLLUSION_WORDS = 20
+
+# Candidates must have at least this estimated Jaccard similarity
+COLLUSION_JACCARD_THRESHOLD = 0.7
+
+# Verified answers must be at least this similar (rapidfuzz token_sort_ratio)
+COLLUSION_SIMILARITY_THRESHOLD = 85
+
+# Closest candidates verified with rapidfuzz per answer
+MAX_VERIFIED_CANDIDATES = 5
+
+
+def record_answer_signature(db: Session, answer_attempt: AnswerAttempt,
+                            features: Optional[TextFeatures] = None) -> Optional[AnswerSignature]:
+    """
+    Store the answer's MinHash signature and LSH buckets, once.
+    Returns the signature row (existing or new), or None for answers too
+    short to compare. Does not flush or commit.
+    """
+    if not answer_attempt.answer_text:
+        return None
+
+    existing = db.get(AnswerSignature, answer_attempt.id)
+    if existing is not None:
+        return existing
+
+    features = features or TextFeatures(answer_attempt.answer_text)
+    if features.word_count < MIN_COLLUSION_WORDS:
+        return None
+
+    signature = compute_signature(feature_shingles(features))
+    signature_row = AnswerSignature(
+        answer_attempt_id=answer_attempt.id,
+        question_id=answer_attempt.question_id,
+        user_id=answer_attempt.assessment_attempt.user_id,
+        signature=signature_to_bytes(signature)
+    )
+    db.add(signature_row)
+    db.add_all([
+        AnswerLSHBucket(
+            answer_attempt_id=answer_attempt.id,
+            band=band,
+            question_id=answer_attempt.question_id,
+            bucket=bucket
+        )
+        for band, bucket in enumerate(band_keys(signature))
+    ])
+    return signature_row
+
+
+def rank_candidates(signature: List[int], candidates: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """
+    Candidates (dicts with answer_attempt_id, answer_text and packed signature)
+    reaching COLLUSION_JACCARD_THRESHOLD, most similar first.
+    """
+    matches = []
+    for candidate in candidates:
+        similarity = estimate_jaccard(signature, signature_from_bytes(candidate["signature"]))
+        if similarity >= COLLUSION_JACCARD_THRESHOLD:
+            matches.append({
+                "answer_attempt_id": candidate["answer_attempt_id"],
+                "answer_text": candidate["answer_text"],
+                "estimated_jaccard": similarity
+            })
+    matches.sort(key=lambda match: -match["estimated_jaccard"])
+    return matches
+
+
+def verify_near_duplicates(answer_text: str, matches: List[Dict[str, any]]) -> Dict[str, any]:
+    """
+    Collusion result from ranked matches: the closest MAX_VERIFIED_CANDIDATES
+    are compared with rapidfuzz. Needs no database, so bulk jobs run it in workers.
+    """
+    matching_answer_ids = []
+    max_similarity = 0.0
+    for match in matches[:MAX_VERIFIED_CANDIDATES]:
+        if RAPIDFUZZ_AVAILABLE:
+            similarity = fuzz.token_sort_ratio(answer_text, match["answer_text"] or "")
+        else:
+            similarity = match["estimated_jaccard"] * 100
+        max_similarity = max(max_similarity, similarity)
+        if similarity >= COLLUSION_SIMILARITY_THRESHOLD:
+            matching_answer_ids.append(str(match["answer_attempt_id"]))
+
+    return {
+        "collusion_detected": bool(matching_answer_ids),
+        "max_similarity": round(max_similarity, 2),
+        "matching_answer_ids": matching_answer_ids,
+        "candidates_checked": min(len(matches), MAX_VERIFIED_CANDIDATES)
+    }
+
+
+def find_near_duplicates(db: Session, signature_row: AnswerSignature) -> List[Dict[str, any]]:
+    """
+    Other students' answers to the same question that share an LSH bucket
+    with this one and reach COLLUSION_JACCARD_THRESHOLD, most similar first.
+    """
+    signature = signature_from_bytes(signature_row.signature)
+    bucket_filters = [
+        and_(AnswerLSHBucket.band == band, AnswerLSHBucket.bucket == bucket)
+        for band, bucket in enumerate(band_keys(signature))
+    ]
+
+    candidate_ids = db.query(AnswerLSHBucket.answer_attempt_id).filter(
+        AnswerLSHBucket.question_id == signature_row.question_id,
+        or_(*bucket_filters)
+    )
+    candidates = db.query(AnswerSignature, AnswerAttempt.answer_text).join(
+        AnswerAttempt, AnswerAttempt.id == AnswerSignature.answer_attempt_id
+    ).filter(
+        AnswerSignature.answer_attempt_id.in_(candidate_ids),
+        AnswerSignature.user_id != signature_row.user_id
+    ).all()
+
+    return rank_candidates(signature, [
+        {
+            "answer_attempt_id": candidate.answer_attempt_id,
+            "answer_text": answer_text,
+            "signature": candidate.signature
+        }
+        for candidate, answer_text in candidates
+    ])
+
+
+def analyze_collusion(db: Session, answer_attempt: AnswerAttempt,
+                      features: Optional[TextFeatures] = None) -> Dict[str, any]:
+    """
+    Collusion signal for one answer: near-identical answers to the same
+    question submitted by other students.
+    Records the answer's signature if needed; the caller commits.
+    """
+    signature_row = record_answer_signature(db, answer_attempt, features)
+    if signature_row is None:
+        return {
+            "collusion_detected": False,
+            "max_similarity": 0,
+            "matching_answer_ids": [],
+            "candidates_checked": 0
+        }
+
+    # Sessions don't autoflush; make answers recorded earlier in this transaction visible
+    db.flush()
+    matches = find_near_duplicates(db, signature_row)
+    return verify_near_duplicates(answer_attempt.answer_text, matches)
+
+
+def get_question_clusters(db: Session, question_id: UUID) -> Dict[str, any]:
+    """
+    Clusters of near-identical answers to a question from two or more students.
+    Loads the question's signatures in one query and groups them in memory.
+    """
+    rows = db.query(AnswerSignature, User.name).join(
+        User, User.id == AnswerSignature.user_id
+    ).filter(AnswerSignature.question_id == question_id).all()
+
+    answers = {
+        signature_row.answer_attempt_id: {
+            "answer_attempt_id": signature_row.answer_attempt_id,
+            "user_id": signature_row.user_id,
+            "student_name": student_name,
+            "submitted_at": signature_row.created_at
+        }
+        for signature_row, student_name in rows
+    }
+    signatures = {
+        signature_row.answer_attempt_id: signature_from_bytes(signature_row.signature)
+        for signature_row, _ in rows
+    }
+
+    clusters = []
+    for cluster in cluster_signatures(signatures, COLLUSION_JACCARD_THRESHOLD):
+        members = [answers[answer_id] for answer_id in cluster["members"]]
+        student_count = len({member["user_id"] for member in members})
+        if student_count < 2:
+            continue
+        clusters.append({
+            "size": len(members),
+            "student_count": student_count,
+            "avg_similarity": round(cluster["avg_similarity"] * 100, 2),
+            "answers": members
+        })
+
+    return {
+        "question_id": question_id,
+        "answers_indexed": len(rows),
+        "clusters": clusters
+    }
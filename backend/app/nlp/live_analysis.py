@@ -0,0 +1,313 @@
+"""
+Live Analysis Module
+
+Incremental analysis of a draft answer while the student types
+(POST /nlp/live/{session_id}).
+
+Re-running the analyzers on the whole draft after every keystroke batch
+costs O(answer length) each time. Instead, each live session keeps the
+draft split into sentence segments that tile the text (a sentence plus the
+'.', '!' or '?' run after it, the same boundaries as TextFeatures), with
+per-segment results:
+- words in the sentence (for analyze_sentence_variety)
+- lowercase whitespace tokens (for the 3-word phrases of analyze_repetition)
+- generic-phrase counts (for detect_generic_phrasing)
+and aggregate counters over all segments: sentence count, sum and sum of
+squares of sentence lengths, token count, 3-word phrase counts and
+generic-phrase counts.
+
+A delta (replace characters [start, end) with text) only re-tiles and
+re-analyzes the segments it touches plus one neighbour on each side (an
+inserted or deleted delimiter can split or merge them); the aggregates are
+updated by subtracting the old segments and adding the new ones, and only
+the phrases within two tokens of the edit are recounted. Server cost per
+request is proportional to the edit, not the draft.
+
+Live results are feedback for the student, not scores: a delimiter glued
+to the next word ("end.next") splits tokens here but not in TextFeatures,
+and fuzzy near-duplicate phrases are left to the analysis of the
+submitted answer. Sessions live in process memory, bounded by
+NLP_LIVE_MAX_SESSIONS and NLP_LIVE_SESSION_TTL_SECONDS; a request for an
+unknown session or a stale version gets LiveSessionConflict and the client
+resends the full draft.
+"""
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from app.nlp.phrase_matcher import get_generic_phrase_matcher
+from app.core.config import NLP_LIVE_MAX_SESSIONS, NLP_LIVE_SESSION_TTL_SECONDS
+
+# Drafts longer than this are rejected
+MAX_LIVE_DRAFT_CHARS = 50000
+
+# A sentence and the delimiter run after it; consecutive matches tile the text
+SEGMENT_PATTERN = re.compile(r"[^.!?]*[.!?]*")
+SENTENCE_PART_PATTERN = re.compile(r"[^.!?]*")
+
+
+class LiveSessionConflict(Exception):
+    """The session is unknown or at another version; the client must resend the full draft."""
+
+
+class _Segment:
+    __slots__ = ("length", "sentence_words", "tokens", "generic")
+
+    def __init__(self, text: str, matcher):
+        lower = text.lower()
+        self.length = len(text)
+        self.sentence_words = len(SENTENCE_PART_PATTERN.match(text).group().split())
+        self.tokens = lower.split()
+        self.generic = {phrase: match["count"] for phrase, match in matcher.find_all(lower).items()}
+
+
+def _tile(text: str, matcher) -> List[_Segment]:
+    return [_Segment(match.group(), matcher) for match in SEGMENT_PATTERN.finditer(text) if match.group()]
+
+
+def _trigrams(tokens: List[str]) -> List[str]:
+    return [" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)]
+
+
+class LiveDraft:
+    """Segmented draft with incrementally maintained analyzer counters."""
+
+    def __init__(self, text: str = ""):
+        self.lock = threading.Lock()
+        self.touched_at = time.monotonic()
+        self.version = -1
+        self.reset(text)
+
+    def reset(self, text: str):
+        """Replace the whole draft (start of a session, or a client resync)."""
+        matcher = get_generic_phrase_matcher()
+        self.text = text
+        self.fingerprint = matcher.fingerprint
+        self.segments: List[_Segment] = []
+        self.starts: List[int] = []
+        self.sentence_count = 0
+        self.length_sum = 0
+        self.length_sq_sum = 0
+        self.token_count = 0
+        self.phrase_counts: Counter = Counter()
+        self.repeated: Dict[str, int] = {}  # phrases seen more than once
+        self.repeat_excess = 0  # sum of (count - 1) over repeated phrases
+        self.generic_counts: Counter = Counter()
+
+        segments = _tile(text, matcher)
+        self._replace(0, 0, 0, segments)
+        self._count_phrases([], [], [token for segment in segments for token in segment.tokens], [])
+        self.version += 1
+        return len(segments)
+
+    def _replace(self, lo: int, hi: int, region_start: int, new_segments: List[_Segment]):
+        """Swap segments[lo:hi] (starting at region_start) for new_segments, updating offsets and aggregates."""
+        for segment, sign in [(s, -1) for s in self.segments[lo:hi]] + [(s, 1) for s in new_segments]:
+            if segment.sentence_words:
+                self.sentence_count += sign
+                self.length_sum += sign * segment.sentence_words
+                self.length_sq_sum += sign * segment.sentence_words ** 2
+            self.token_count += sign * len(segment.tokens)
+            for phrase, count in segment.generic.items():
+                self.generic_counts[phrase] += sign * count
+                if not self.generic_counts[phrase]:
+                    del self.generic_counts[phrase]
+
+        new_starts = []
+        offset = region_start
+        for segment in new_segments:
+            new_starts.append(offset)
+            offset += segment.length
+        old_end = self.starts[hi] if hi < len(self.starts) else None
+        shift = offset - old_end if old_end is not None else 0
+
+        self.segments[lo:hi] = new_segments
+        self.starts[lo:hi] = new_starts
+        if shift:
+            tail = lo + len(new_segments)
+            self.starts[tail:] = [start + shift for start in self.starts[tail:]]
+
+    def _context(self, index: int, step: int) -> List[str]:
+        """Up to two tokens next to segment `index`, walking backwards (step -1) or forwards (+1)."""
+        tokens: List[str] = []
+        index += step
+        while 0 <= index < len(self.segments) and len(tokens) < 2:
+            segment_tokens = self.segments[index].tokens
+            tokens = (segment_tokens + tokens)[-2:] if step < 0 else (tokens + segment_tokens)[:2]
+            index += step
+        return tokens
+
+    def _count_phrases(self, before: List[str], old_tokens: List[str],
+                       new_tokens: List[str], after: List[str]):
+        """Recount the 3-word phrases that include any changed token."""
+        changes: Counter = Counter()
+        if old_tokens or before or after:
+            changes.subtract(_trigrams(before + old_tokens + after))
+        changes.update(_trigrams(before + new_tokens + after))
+        for phrase, change in changes.items():
+            if not change:
+                continue
+            previous = self.phrase_counts[phrase]
+            current = previous + change
+            self.repeat_excess += max(current - 1, 0) - max(previous - 1, 0)
+            if current > 1:
+                self.repeated[phrase] = current
+            else:
+                self.repeated.pop(phrase, None)
+            if current:
+                self.phrase_counts[phrase] = current
+            else:
+                del self.phrase_counts[phrase]
+
+    def apply_delta(self, start: int, end: int, text: str) -> int:
+        """
+        Replace characters [start, end) of the draft with text.
+        Returns the number of segments re-analyzed.
+        """
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"Delta range [{start}, {end}) is outside the draft (length {len(self.text)})")
+        if len(self.text) - (end - start) + len(text) > MAX_LIVE_DRAFT_CHARS:
+            raise ValueError(f"Draft exceeds {MAX_LIVE_DRAFT_CHARS} characters")
+
+        matcher = get_generic_phrase_matcher()
+        if matcher.fingerprint != self.fingerprint or not self.segments:
+            # Lexicon reloaded (or empty draft): nothing to reuse
+            return self.reset(self.text[:start] + text + self.text[end:])
+
+        # Touched segments plus one neighbour each side; their outer edges
+        # are segment boundaries in both the old and the new text
+        first = max(bisect_right(self.starts, start) - 1, 0)
+        last = max(bisect_right(self.starts, max(start, end - 1)) - 1, 0)
+        lo = max(first - 1, 0)
+        hi = min(last + 2, len(self.segments))
+        region_start = self.starts[lo]
+        region_end = self.starts[hi] if hi < len(self.segments) else len(self.text)
+
+        self.text = self.text[:start] + text + self.text[end:]
+        new_region_end = region_end + len(text) - (end - start)
+        new_segments = _tile(self.text[region_start:new_region_end], matcher)
+
+        before = self._context(lo, -1)
+        after = self._context(hi - 1, 1)
+        old_tokens = [token for segment in self.segments[lo:hi] for token in segment.tokens]
+        new_tokens = [token for segment in new_segments for token in segment.tokens]
+        self._count_phrases(before, old_tokens, new_tokens, after)
+        self._replace(lo, hi, region_start, new_segments)
+        self.version += 1
+        return len(new_segments)
+
+    def summary(self) -> Dict[str, any]:
+        """Analyzer results for the current draft, shaped like the full analyzers' output."""
+        if self.sentence_count:
+            avg_length = self.length_sum / self.sentence_count
+            # Integer numerator: exact, however many edits the sums went through
+            count = self.sentence_count
+            variance = (count * self.length_sq_sum - self.length_sum ** 2) / (count * count)
+            variety_score = variance ** 0.5 if self.sentence_count > 1 else 0
+        else:
+            avg_length, variety_score = 0, 0
+
+        if self.token_count >= 10:
+            repetition_score = min(100, int(self.repeat_excess / (self.token_count - 2) * 200))
+            repeated_phrases = [
+                {"phrase": phrase, "count": count}
+                for phrase, count in heapq.nsmallest(5, self.repeated.items(), key=lambda item: (-item[1], item[0]))
+            ]
+        else:
+            repetition_score, repeated_phrases = 0, []
+
+        matcher = get_generic_phrase_matcher()
+        found_phrases = [phrase for phrase in matcher.phrases if self.generic_counts.get(phrase)]
+        generic_score = min(100, len(found_phrases) * 15) if self.token_count else 0
+
+        return {
+            "version": self.version,
+            "word_count": self.token_count,
+            "char_count": len(self.text),
+            "variety_analysis": {
+                "sentence_count": self.sentence_count,
+                "avg_sentence_length": round(avg_length, 2),
+                "variety_score": round(variety_score, 2),
+                "has_variety": variety_score > 3.0 and self.sentence_count > 2
+            },
+            "repetition_analysis": {
+                "repetition_score": repetition_score,
+                "repeated_phrases": repeated_phrases,
+                "is_repetitive": repetition_score > 30
+            },
+            "generic_analysis": {
+                "generic_score": generic_score,
+                "generic_phrases_found": found_phrases,
+                "is_generic": generic_score > 30 or len(found_phrases) >= 3
+            }
+        }
+
+
+_lock = threading.Lock()
+# Keyed by (user id, client session id): session ids are only meaningful to their owner
+_sessions: "OrderedDict[Tuple[UUID, str], LiveDraft]" = OrderedDict()
+
+
+def _evict_expired():
+    """Drop idle sessions, least recently used first. Caller holds _lock."""
+    now = time.monotonic()
+    while _sessions:
+        key, draft = next(iter(_sessions.items()))
+        if now - draft.touched_at <= NLP_LIVE_SESSION_TTL_SECONDS and len(_sessions) <= NLP_LIVE_MAX_SESSIONS:
+            break
+        del _sessions[key]
+
+
+def update_live_session(session_id: str, user_id: UUID, text: Optional[str] = None,
+                        deltas: Optional[List[Tuple[int, int, str]]] = None,
+                        base_version: Optional[int] = None) -> Dict[str, any]:
+    """
+    Apply a full draft (text) or edits (deltas, each applied to the result of
+    the previous one) to a live session and return the updated analysis.
+    Raises LiveSessionConflict if deltas target an unknown session or a
+    version other than base_version, ValueError for invalid edits.
+    """
+    started = time.perf_counter()
+    if text is not None and len(text) > MAX_LIVE_DRAFT_CHARS:
+        raise ValueError(f"Draft exceeds {MAX_LIVE_DRAFT_CHARS} characters")
+
+    key = (user_id, session_id)
+    with _lock:
+        draft = _sessions.get(key)
+        if draft is None:
+            if text is None:
+                raise LiveSessionConflict("Unknown live session; send the full draft")
+            draft = LiveDraft()
+            _sessions[key] = draft
+        _sessions.move_to_end(key)
+        draft.touched_at = time.monotonic()
+        _evict_expired()
+
+    with draft.lock:
+        if text is not None:
+            segments_analyzed = draft.reset(text)
+        else:
+            if base_version is not None and base_version != draft.version:
+                raise LiveSessionConflict(
+                    f"Draft is at version {draft.version}, not {base_version}; send the full draft"
+                )
+            segments_analyzed = 0
+            for start, end, delta_text in deltas or []:
+                segments_analyzed += draft.apply_delta(start, end, delta_text)
+        result = draft.summary()
+
+    result["session_id"] = session_id
+    result["segments_analyzed"] = segments_analyzed
+    result["analysis_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def end_live_session(session_id: str, user_id: UUID) -> bool:
+    """Forget a session (e.g. once the answer is submitted). Returns False if it did not exist."""
+    with _lock:
+        return _sessions.pop((user_id, session_id), None) is not None
@@ -0,0 +1,191 @@
+"""
+MinHash / LSH Module
+
+Near-duplicate detection between answers without comparing every pair.
+
+How it works (all LOCAL, no external APIs):
+1. Shingling - an answer is reduced to its set of lowercase 3-word shingles,
+   each hashed to 32 bits with CRC32 (stable across processes and restarts,
+   unlike Python's hash()).
+2. MinHash - NUM_PERM seeded hash permutations are applied to the shingle
+   hashes and the minimum of each is kept. The fraction of equal positions
+   in two signatures estimates the Jaccard similarity of their shingle sets.
+3. LSH banding - the signature is cut into LSH_BANDS bands of LSH_ROWS
+   values and each band is hashed to a bucket key. Two answers become
+   candidates only if they share a bucket in at least one band; with 16
+   bands of 8 rows, pairs with Jaccard 0.8 are found ~95% of the time and
+   pairs below 0.5 almost never.
+"""
+
+import random
+import struct
+import zlib
+from hashlib import blake2b
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+from app.nlp.text_features import TextFeatures
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+
+# Smallest prime above 2^32; with 32-bit a, b and x, a * x + b fits in uint64
+_PRIME = 4294967311
+_MAX_HASH = 0xFFFFFFFF
+
+# Fixed seed: signatures must be comparable across processes and restarts
+_rng = random.Random(20240101)
+_PERM_A = [_rng.randint(1, _MAX_HASH) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randint(0, _MAX_HASH) for _ in range(NUM_PERM)]
+
+if NUMPY_AVAILABLE:
+    _PERM_A_ARRAY = np.array(_PERM_A, dtype=np.uint64)
+    _PERM_B_ARRAY = np.array(_PERM_B, dtype=np.uint64)
+
+_SIGNATURE_FORMAT = f"<{NUM_PERM}I"
+_BAND_FORMAT = f"<{LSH_ROWS}I"
+
+
+def token_shingles(lower_tokens: List[str]) -> List[str]:
+    """The word shingles of a lowercased, tokenized text (the whole text if it is shorter than a shingle)."""
+    if not lower_tokens:
+        return []
+    if len(lower_tokens) < SHINGLE_SIZE:
+        return [" ".join(lower_tokens)]
+    return [" ".join(lower_tokens[i:i + SHINGLE_SIZE]) for i in range(len(lower_tokens) - SHINGLE_SIZE + 1)]
+
+
+def feature_shingles(features: TextFeatures) -> List[str]:
+    """token_shingles of a text's lowercase tokens, sliced from its TextFeatures without tokenizing."""
+    return features.lower_ngrams(min(SHINGLE_SIZE, features.word_count))
+
+
+def shingle_hashes(shingles: Iterable[str]) -> List[int]:
+    """CRC32 hashes of the distinct shingles."""
+    return [zlib.crc32(shingle.encode("utf-8")) for shingle in set(shingles)]
+
+
+def compute_signature(shingles: Iterable[str]) -> Optional[List[int]]:
+    """MinHash signature (NUM_PERM 32-bit values) of a text's shingles, or None if there are none."""
+    hashes = shingle_hashes(shingles)
+    if not hashes:
+        return None
+
+    if NUMPY_AVAILABLE:
+        values = np.array(hashes, dtype=np.uint64)[:, None]
+        permuted = (values * _PERM_A_ARRAY + _PERM_B_ARRAY) % _PRIME
+        return (permuted.min(axis=0) & _MAX_HASH).tolist()
+
+    return [
+        min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+        for a, b in zip(_PERM_A, _PERM_B)
+    ]
+
+
+def signature_to_bytes(signature: List[int]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def signature_from_bytes(data: bytes) -> List[int]:
+    return list(struct.unpack(_SIGNATURE_FORMAT, data))
+
+
+def band_keys(signature: List[int]) -> List[int]:
+    """One signed 64-bit bucket key per LSH band."""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = blake2b(struct.pack(_BAND_FORMAT, *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def estimate_jaccard(signature1: List[int], signature2: List[int]) -> float:
+    """Fraction of equal MinHash positions, an estimate of shingle-set Jaccard similarity."""
+    return sum(1 for a, b in zip(signature1, signature2) if a == b) / NUM_PERM
+
+
+class LSHIndex:
+    """In-memory LSH bucket index over MinHash signatures."""
+
+    def __init__(self):
+        self._buckets: List[Dict[int, List[Hashable]]] = [{} for _ in range(LSH_BANDS)]
+        self.signatures: Dict[Hashable, List[int]] = {}
+
+    def add(self, key: Hashable, signature: List[int]):
+        self.signatures[key] = signature
+        for band, bucket in enumerate(band_keys(signature)):
+            self._buckets[band].setdefault(bucket, []).append(key)
+
+    def candidates(self, signature: List[int]) -> Set[Hashable]:
+        """Keys sharing at least one band bucket with the signature."""
+        found = set()
+        for band, bucket in enumerate(band_keys(signature)):
+            found.update(self._buckets[band].get(bucket, ()))
+        return found
+
+    def query(self, signature: List[int], threshold: float) -> List[tuple]:
+        """(key, estimated Jaccard) of candidates at or above threshold, most similar first."""
+        matches = []
+        for key in self.candidates(signature):
+            similarity = estimate_jaccard(signature, self.signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+def cluster_signatures(signatures: Dict[Hashable, List[int]], threshold: float) -> List[Dict[str, any]]:
+    """
+    Group keys whose signatures are near-identical (estimated Jaccard >= threshold),
+    transitively, using the LSH index for candidates and union-find for grouping.
+    Returns clusters of two or more keys, largest first.
+    """
+    index = LSHIndex()
+    for key, signature in signatures.items():
+        index.add(key, signature)
+
+    parent = {key: key for key in signatures}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    edge_similarities: Dict[Hashable, List[float]] = {}
+    for key, signature in signatures.items():
+        for other, similarity in index.query(signature, threshold):
+            if other == key:
+                continue
+            root, other_root = find(key), find(other)
+            if root != other_root:
+                parent[other_root] = root
+            edge_similarities.setdefault(key, []).append(similarity)
+
+    groups: Dict[Hashable, List[Hashable]] = {}
+    for key in signatures:
+        groups.setdefault(find(key), []).append(key)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        similarities = [s for key in members for s in edge_similarities.get(key, [])]
+        clusters.append({
+            "members": members,
+            "avg_similarity": sum(similarities) / len(similarities) if similarities else 0.0
+        })
+    clusters.sort(key=lambda cluster: -len(cluster["members"]))
+    return clusters
+
@@ -0,0 +1,204 @@
+"""
+NLP Background Pipeline
+
+Optional asynchronous mode for NLP analysis (NLP_ASYNC_MODE=true).
+
+The analyzers are CPU-bound pure Python, so running them inside request
+handlers ties up the threadpool shared with every DB-bound route. In async
+mode, submitted answers are queued to a bounded ProcessPoolExecutor; each
+worker process opens its own database session, runs analyze_answer_attempt
+and writes the feedback. Clients poll GET /nlp/analysis/{id} for the result.
+
+When the queue is full, enqueue_analysis returns False and the caller runs
+the analysis inline instead, so no answer is ever left unanalyzed.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from uuid import UUID
+
+from app.core.config import NLP_QUEUE_MAX_DEPTH, NLP_WORKER_PROCESSES
+from app.analytics.result_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status polling before the oldest are dropped
+MAX_TRACKED_JOBS = 10000
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_jobs: "OrderedDict[UUID, Dict[str, any]]" = OrderedDict()
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "inline_fallbacks": 0,
+    "queue_depth": 0,
+    "max_queue_depth": 0,
+    "latency_ms_total": 0.0,
+    "latency_ms_max": 0.0
+}
+
+
+def run_analysis_job(answer_attempt_id: str) -> Dict[str, any]:
+    """
+    Worker-process entry point: analyze one answer with a private DB session.
+    Runs in a child process, so it imports the service lazily.
+    """
+    from app.db.database import SessionLocal
+    from app.nlp.nlp_service import analyze_answer_attempt
+
+    db = SessionLocal()
+    try:
+        return analyze_answer_attempt(UUID(answer_attempt_id), db)
+    finally:
+        db.close()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: children must not inherit the parent's DB connections or threads
+        _executor = ProcessPoolExecutor(
+            max_workers=NLP_WORKER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _forget_old_jobs():
+    """Drop the oldest finished jobs once MAX_TRACKED_JOBS is exceeded. Caller holds _lock."""
+    while len(_jobs) > MAX_TRACKED_JOBS:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if oldest["status"] == "queued":
+            break
+        _jobs.pop(oldest_id)
+
+
+def _on_job_done(answer_attempt_id: UUID, enqueued: float, future: Future):
+    latency_ms = (time.perf_counter() - enqueued) * 1000
+    error = future.exception()
+    if error is None:
+        # The worker process committed the analysis; invalidate this process's analytics
+        bump_data_version("feedback")
+
+    with _lock:
+        _stats["queue_depth"] -= 1
+        _stats["latency_ms_total"] += latency_ms
+        _stats["latency_ms_max"] = max(_stats["latency_ms_max"], latency_ms)
+
+        job = _jobs.get(answer_attempt_id)
+        if job is None:
+            return
+        job["completed_at"] = datetime.now(timezone.utc)
+        job["latency_ms"] = round(latency_ms, 2)
+        if error is None:
+            _stats["completed"] += 1
+            job["status"] = "completed"
+            job["result"] = future.result()
+        else:
+            _stats["failed"] += 1
+            job["status"] = "failed"
+            job["error"] = str(error)
+
+    if error is not None:
+        logger.error(f"Background NLP analysis failed for {answer_attempt_id}: {error}")
+
+
+def enqueue_analysis(answer_attempt_id: UUID) -> bool:
+    """
+    Queue an answer for background analysis.
+    Returns False without queueing when the queue is full; the caller
+    should then analyze inline.
+    """
+    with _lock:
+        if _stats["queue_depth"] >= NLP_QUEUE_MAX_DEPTH:
+            _stats["inline_fallbacks"] += 1
+            return False
+
+        _stats["submitted"] += 1
+        _stats["queue_depth"] += 1
+        _stats["max_queue_depth"] = max(_stats["max_queue_depth"], _stats["queue_depth"])
+        _jobs[answer_attempt_id] = {
+            "status": "queued",
+            "queued_at": datetime.now(timezone.utc),
+            "completed_at": None,
+            "latency_ms": None,
+            "result": None,
+            "error": None
+        }
+        _jobs.move_to_end(answer_attempt_id)
+        _forget_old_jobs()
+
+    enqueued = time.perf_counter()
+    try:
+        future = _get_executor().submit(run_analysis_job, str(answer_attempt_id))
+    except Exception as e:
+        logger.error(f"Could not queue NLP analysis for {answer_attempt_id}: {str(e)}")
+        with _lock:
+            _stats["submitted"] -= 1
+            _stats["queue_depth"] -= 1
+            _stats["inline_fallbacks"] += 1
+            _jobs.pop(answer_attempt_id, None)
+        return False
+
+    future.add_done_callback(
+        lambda done: _on_job_done(answer_attempt_id, enqueued, done)
+    )
+    return True
+
+
+def record_inline_analysis(answer_attempt_id: UUID, result: Optional[Dict[str, any]],
+                           latency_ms: float, error: Optional[str] = None):
+    """Track an analysis the caller ran inline, so polling works for it too."""
+    now = datetime.now(timezone.utc)
+    with _lock:
+        _jobs[answer_attempt_id] = {
+            "status": "completed" if error is None else "failed",
+            "queued_at": now,
+            "completed_at": now,
+            "latency_ms": round(latency_ms, 2),
+            "result": result,
+            "error": error
+        }
+        _jobs.move_to_end(answer_attempt_id)
+        _forget_old_jobs()
+
+
+def get_analysis_status(answer_attempt_id: UUID) -> Optional[Dict[str, any]]:
+    """Return a copy of the job record for an answer, or None if it was never queued."""
+    with _lock:
+        job = _jobs.get(answer_attempt_id)
+        return dict(job) if job is not None else None
+
+
+def get_pipeline_stats() -> Dict[str, any]:
+    """Queue-depth and latency counters for the background pipeline."""
+    with _lock:
+        finished = _stats["completed"] + _stats["failed"]
+        return {
+            "workers": NLP_WORKER_PROCESSES,
+            "max_queue_size": NLP_QUEUE_MAX_DEPTH,
+            "queue_depth": _stats["queue_depth"],
+            "max_queue_depth": _stats["max_queue_depth"],
+            "submitted": _stats["submitted"],
+            "completed": _stats["completed"],
+            "failed": _stats["failed"],
+            "inline_fallbacks": _stats["inline_fallbacks"],
+            "avg_latency_ms": round(_stats["latency_ms_total"] / finished, 2) if finished else 0.0,
+            "max_latency_ms": round(_stats["latency_ms_max"], 2)
+        }
+
+
+def shutdown_pipeline():
+    """Wait for queued analyses to finish and stop the worker processes."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
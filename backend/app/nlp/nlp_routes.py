@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from datetime import datetime
 from app.dependencies import get_db
-from app.auth.dependencies import require_student
-from app.models.user import User
+from app.auth.dependencies import require_student, require_faculty, get_current_user
+from app.models.user import User, UserRole
 from app.models.answer_attempt import AnswerAttempt
-from app.nlp.nlp_service import analyze_answer_attempt
+from app.models.question import Question
+from app.nlp.nlp_service import analyze_answer_attempt, analyze_answer_attempts_batch
+from app.nlp.collusion import get_question_clusters
+from app.nlp.result_cache import get_cache_stats
+from app.nlp.nlp_pipeline import get_analysis_status, get_pipeline_stats
+from app.nlp.live_analysis import LiveSessionConflict, update_live_session, end_live_session
+from app.nlp.stage_timing import get_timing_stats, record as record_stage_timings
+from app.nlp.shadow import get_shadow_stats, submit_shadow
 
 
 router = APIRouter()
 
+# Upper bound on answer ids accepted by one batch request
+MAX_BATCH_ANSWERS = 100
+
 
 class NLPAnalysisResponse(BaseModel):
     """Response schema for NLP analysis endpoint"""
@@ -25,9 +36,270 @@ class NLPAnalysisResponse(BaseModel):
         from_attributes = True
 
 
+class BatchAnalysisRequest(BaseModel):
+    """Request schema for batch NLP analysis: an assessment OR a list of answer attempts"""
+    assessment_id: Optional[UUID] = None
+    answer_attempt_ids: Optional[List[UUID]] = None
+    full: bool = False
+
+
+class BatchAnalysisItem(NLPAnalysisResponse):
+    """Per-answer result of a batch NLP analysis"""
+    answer_attempt_id: UUID
+
+
+class BatchAnalysisTiming(BaseModel):
+    """Aggregate timing of a batch NLP analysis, in milliseconds"""
+    answers_analyzed: int
+    load_ms: float
+    analysis_ms: float
+    write_ms: float
+    total_ms: float
+
+
+class BatchAnalysisResponse(BaseModel):
+    """Response schema for batch NLP analysis endpoint"""
+    results: List[BatchAnalysisItem]
+    not_found: List[UUID]
+    timing: BatchAnalysisTiming
+
+
+class AnalysisStatusResponse(BaseModel):
+    """Response schema for polling a background NLP analysis"""
+    answer_attempt_id: UUID
+    status: str
+    queued_at: datetime
+    completed_at: Optional[datetime] = None
+    latency_ms: Optional[float] = None
+    result: Optional[NLPAnalysisResponse] = None
+    error: Optional[str] = None
+
+
+class PipelineStatsResponse(BaseModel):
+    """Queue-depth and latency counters of the background NLP pipeline"""
+    workers: int
+    max_queue_size: int
+    queue_depth: int
+    max_queue_depth: int
+    submitted: int
+    completed: int
+    failed: int
+    inline_fallbacks: int
+    avg_latency_ms: float
+    max_latency_ms: float
+
+
+class ClusterAnswer(BaseModel):
+    """One answer in a cluster of near-identical answers"""
+    answer_attempt_id: UUID
+    user_id: UUID
+    student_name: str
+    submitted_at: Optional[datetime] = None
+
+
+class AnswerCluster(BaseModel):
+    """Near-identical answers to one question from two or more students"""
+    size: int
+    student_count: int
+    avg_similarity: float
+    answers: List[ClusterAnswer]
+
+
+class QuestionClustersResponse(BaseModel):
+    """Response schema for the near-duplicate clusters of a question"""
+    question_id: UUID
+    answers_indexed: int
+    clusters: List[AnswerCluster]
+
+
+class LiveDelta(BaseModel):
+    """One edit of a live draft: replace characters [start, end) with text"""
+    start: int
+    end: int
+    text: str = ""
+
+
+class LiveAnalysisRequest(BaseModel):
+    """Request schema for live draft analysis: the full draft OR edits to base_version"""
+    text: Optional[str] = None
+    deltas: Optional[List[LiveDelta]] = None
+    base_version: Optional[int] = None
+
+
+class LiveAnalysisResponse(BaseModel):
+    """Response schema for live draft analysis endpoint"""
+    session_id: str
+    version: int
+    word_count: int
+    char_count: int
+    variety_analysis: Dict[str, Any]
+    repetition_analysis: Dict[str, Any]
+    generic_analysis: Dict[str, Any]
+    segments_analyzed: int
+    analysis_ms: float
+
+
+class TimingStatsResponse(BaseModel):
+    """Per-stage wall/CPU time histograms of NLP analyses"""
+    enabled: bool
+    stages: Dict[str, Any]
+
+
+class ShadowStatsResponse(BaseModel):
+    """Sampling counters and current-versus-candidate comparison of live shadow scoring"""
+    enabled: bool
+    candidate: Optional[str] = None
+    candidate_error: Optional[str] = None
+    sample_rate: float
+    sampled: int
+    completed: int
+    dropped: int
+    failed: int
+    pending: int
+    avg_shadow_ms: float
+    comparison: Dict[str, Any]
+
+
+class CacheStatsResponse(BaseModel):
+    """Counters of the NLP result cache"""
+    enabled: bool
+    entries: int
+    db_entries: Optional[int] = None
+    max_entries: int
+    ttl_seconds: int
+    lookups: int
+    memory_hits: int
+    db_hits: int
+    misses: int
+    hit_ratio: float
+    stores: int
+    size_evictions: int
+    ttl_evictions: int
+
+
+def build_analysis_details(analysis_result: Dict[str, Any], timings: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Condense a full analysis result into the `details` payload, with stage timings if recorded."""
+    details = {
+        "writing_analysis": {
+            "looks_ai_generated": analysis_result["writing_analysis"]["looks_ai_generated"],
+            "low_originality": analysis_result["writing_analysis"]["low_originality"],
+            "word_count": analysis_result["writing_analysis"]["length_analysis"]["word_count"],
+            "sentence_count": analysis_result["writing_analysis"]["variety_analysis"]["sentence_count"],
+            "repetition_score": analysis_result["writing_analysis"]["repetition_analysis"]["repetition_score"],
+            "similar_phrases_checked": analysis_result["writing_analysis"]["repetition_analysis"].get(
+                "similar_phrases_checked", True
+            ),
+            "generic_score": analysis_result["writing_analysis"]["generic_analysis"]["generic_score"]
+        },
+        "behavior_analysis": {
+            "suspicious_pause": analysis_result["behavior_analysis"]["suspicious_pause"],
+            "low_knowledge_signal": analysis_result["behavior_analysis"]["low_knowledge_signal"],
+            "possible_copy_behavior": analysis_result["behavior_analysis"]["possible_copy_behavior"],
+            "telemetry_available": analysis_result["behavior_analysis"].get("telemetry") is not None
+        },
+        "collusion_analysis": {
+            "collusion_detected": analysis_result["collusion_analysis"]["collusion_detected"],
+            "max_similarity": analysis_result["collusion_analysis"]["max_similarity"],
+            "matching_answer_count": len(analysis_result["collusion_analysis"]["matching_answer_ids"])
+        },
+        "originality_analysis": {
+            "tfidf_originality": analysis_result["originality_analysis"]["tfidf_originality"],
+            "nearest_similarity": analysis_result["originality_analysis"]["nearest_similarity"],
+            "centroid_similarity": analysis_result["originality_analysis"]["centroid_similarity"],
+            "corpus_size": analysis_result["originality_analysis"]["corpus_size"],
+            "is_derivative": analysis_result["originality_analysis"]["is_derivative"]
+        }
+    }
+    if timings:
+        details["timings"] = timings
+    return details
+
+
+@router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+def analyze_answers_batch(
+    request: BatchAnalysisRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_faculty)
+):
+    """
+    POST /nlp/analyze/batch
+    
+    Analyzes every answer of an assessment, or up to MAX_BATCH_ANSWERS answer attempts, in one request.
+    
+    - Requires faculty authentication
+    - Provide exactly one of `assessment_id` or `answer_attempt_ids`
+    - `full`: compute every analyzer's details, not only what the risk scores need
+      (by default the fuzzy repetition search is skipped when exact repeats decide it,
+      so repetition_score and repeated_phrases may cover exact repeats only)
+    - Loads all answers in one query and stores all feedback in one transaction
+    
+    Returns:
+    - results: per-answer scores, risk flag and details (same fields as /nlp/analyze/{id})
+    - not_found: requested answer ids that do not exist
+    - timing: aggregate load / analysis / write timings in milliseconds
+    """
+    if (request.assessment_id is None) == (request.answer_attempt_ids is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of assessment_id or answer_attempt_ids"
+        )
+    
+    if request.answer_attempt_ids is not None and not 0 < len(request.answer_attempt_ids) <= MAX_BATCH_ANSWERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"answer_attempt_ids must contain between 1 and {MAX_BATCH_ANSWERS} ids"
+        )
+    
+    try:
+        with record_stage_timings() as timer:
+            batch_result = analyze_answer_attempts_batch(
+                db,
+                assessment_id=request.assessment_id,
+                answer_attempt_ids=request.answer_attempt_ids,
+                full=request.full
+            )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error analyzing answers: {str(e)}"
+        )
+    
+    if request.assessment_id is not None and not batch_result["results"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No answer attempts found for this assessment"
+        )
+    
+    if timer.stages:
+        response.headers["Server-Timing"] = timer.server_timing()
+    
+    for result in batch_result["results"]:
+        submit_shadow(result["answer_attempt_id"], result)
+    
+    return BatchAnalysisResponse(
+        results=[
+            BatchAnalysisItem(
+                answer_attempt_id=result["answer_attempt_id"],
+                originality_score=result["originality_score"],
+                confidence_score=result["confidence_score"],
+                risk_flag=result["risk_flag"],
+                feedback_created=result["feedback_created"],
+                details=build_analysis_details(result)
+            )
+            for result in batch_result["results"]
+        ],
+        not_found=batch_result["not_found"],
+        timing=BatchAnalysisTiming(**batch_result["timing"])
+    )
+
+
 @router.post("/analyze/{answer_attempt_id}", response_model=NLPAnalysisResponse)
 def analyze_answer(
     answer_attempt_id: UUID,
+    response: Response,
+    full: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_student)
 ):
@@ -39,15 +311,23 @@ def analyze_answer(
     - Requires student authentication
     - Performs writing pattern analysis (length, variety, repetition, quality jumps, generic phrasing)
     - Performs pause and behavior analysis (suspicious pauses, low knowledge signals, copy behavior)
+    - Checks other students' answers to the same question for near-duplicates (collusion)
     - Calculates risk scores (originality_score, confidence_score, risk_flag)
     - Stores feedback for medium/high risk cases
+    - Computes every analyzer's details; `full=false` skips work that cannot change the
+      risk scores (the fuzzy repetition search when exact repeats decide it), so
+      details.writing_analysis.repetition_score and repeated_phrases may then cover
+      exact repeats only (similar_phrases_checked=false)
+    - A NLP_SHADOW_SAMPLE_RATE share of analyses is also scored with the
+      NLP_SHADOW_CANDIDATE configuration in the background (GET /nlp/shadow/stats)
     
     Returns:
     - originality_score: 0-100, higher means more original
     - confidence_score: 0-100, higher means more confident the answer is authentic
     - risk_flag: "none" | "low" | "medium" | "high"
     - feedback_created: whether feedback was stored
-    - details: detailed analysis results (optional)
+    - details: detailed analysis results (optional); with NLP_STAGE_TIMING_ENABLED, also
+      per-stage wall/CPU times, which are sent as a Server-Timing header too
     """
     # Verify answer attempt exists and belongs to the student
     answer_attempt = db.query(AnswerAttempt).filter(
@@ -76,29 +356,21 @@ def analyze_answer(
     
     # Perform NLP analysis
     try:
-        analysis_result = analyze_answer_attempt(answer_attempt_id, db)
+        with record_stage_timings() as timer:
+            analysis_result = analyze_answer_attempt(answer_attempt_id, db, full)
         
-        return NLPAnalysisResponse(
+        if timer.stages:
+            response.headers["Server-Timing"] = timer.server_timing()
+        
+        analysis_response = NLPAnalysisResponse(
             originality_score=analysis_result["originality_score"],
             confidence_score=analysis_result["confidence_score"],
             risk_flag=analysis_result["risk_flag"],
             feedback_created=analysis_result["feedback_created"],
-            details={
-                "writing_analysis": {
-                    "looks_ai_generated": analysis_result["writing_analysis"]["looks_ai_generated"],
-                    "low_originality": analysis_result["writing_analysis"]["low_originality"],
-                    "word_count": analysis_result["writing_analysis"]["length_analysis"]["word_count"],
-                    "sentence_count": analysis_result["writing_analysis"]["variety_analysis"]["sentence_count"],
-                    "repetition_score": analysis_result["writing_analysis"]["repetition_analysis"]["repetition_score"],
-                    "generic_score": analysis_result["writing_analysis"]["generic_analysis"]["generic_score"]
-                },
-                "behavior_analysis": {
-                    "suspicious_pause": analysis_result["behavior_analysis"]["suspicious_pause"],
-                    "low_knowledge_signal": analysis_result["behavior_analysis"]["low_knowledge_signal"],
-                    "possible_copy_behavior": analysis_result["behavior_analysis"]["possible_copy_behavior"]
-                }
-            }
+            details=build_analysis_details(analysis_result, timer.as_details())
         )
+        submit_shadow(answer_attempt_id, analysis_result)
+        return analysis_response
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -109,3 +381,223 @@ def analyze_answer(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error analyzing answer: {str(e)}"
         )
+
+
+@router.get("/analysis/{answer_attempt_id}", response_model=AnalysisStatusResponse)
+def get_background_analysis(
+    answer_attempt_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    GET /nlp/analysis/{answer_attempt_id}
+    
+    Polls the background NLP analysis of a submitted answer (NLP_ASYNC_MODE=true).
+    
+    - Students can poll their own answers; faculty can poll any answer
+    - status: "queued" | "completed" | "failed"
+    - result: same fields as /nlp/analyze/{id} once completed
+    """
+    answer_attempt = db.query(AnswerAttempt).filter(
+        AnswerAttempt.id == answer_attempt_id
+    ).first()
+    
+    if not answer_attempt:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Answer attempt not found"
+        )
+    
+    if (current_user.role != UserRole.faculty and
+            answer_attempt.assessment_attempt.user_id != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view analysis of your own answers"
+        )
+    
+    job = get_analysis_status(answer_attempt_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No background analysis found for this answer"
+        )
+    
+    result = None
+    if job["result"] is not None:
+        result = NLPAnalysisResponse(
+            originality_score=job["result"]["originality_score"],
+            confidence_score=job["result"]["confidence_score"],
+            risk_flag=job["result"]["risk_flag"],
+            feedback_created=job["result"]["feedback_created"],
+            details=build_analysis_details(job["result"])
+        )
+    
+    return AnalysisStatusResponse(
+        answer_attempt_id=answer_attempt_id,
+        status=job["status"],
+        queued_at=job["queued_at"],
+        completed_at=job["completed_at"],
+        latency_ms=job["latency_ms"],
+        result=result,
+        error=job["error"]
+    )
+
+
+@router.get("/questions/{question_id}/clusters", response_model=QuestionClustersResponse)
+def question_answer_clusters(
+    question_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_faculty)
+):
+    """
+    GET /nlp/questions/{question_id}/clusters
+    
+    Lists clusters of near-identical answers to a question submitted by different students.
+    
+    - Requires faculty authentication
+    - Uses the stored MinHash signatures and LSH buckets; answers shorter than 20 words are not indexed
+    - avg_similarity: estimated Jaccard similarity (0-100) of the answers' word shingles
+    """
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Question not found"
+        )
+    
+    return QuestionClustersResponse(**get_question_clusters(db, question_id))
+
+
+@router.get("/pipeline/stats", response_model=PipelineStatsResponse)
+def background_pipeline_stats(
+    current_user: User = Depends(require_faculty)
+):
+    """
+    GET /nlp/pipeline/stats
+    
+    Queue-depth and latency counters of the background NLP pipeline.
+    
+    - Requires faculty authentication
+    - inline_fallbacks counts answers analyzed on the request path because the queue was full
+    """
+    return PipelineStatsResponse(**get_pipeline_stats())
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+def result_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_faculty)
+):
+    """
+    GET /nlp/cache/stats
+    
+    Hit/miss/eviction counters of the NLP result cache, for sizing it.
+    
+    - Requires faculty authentication
+    - memory_hits / db_hits: served by the in-process LRU / the nlp_result_cache table
+    - entries, evictions: in-process tier of this worker only
+    - db_entries: rows in the nlp_result_cache table (pruned by age and analyzer version)
+    """
+    return CacheStatsResponse(**get_cache_stats(db))
+
+
+@router.get("/timing/stats", response_model=TimingStatsResponse)
+def stage_timing_stats(
+    current_user: User = Depends(require_faculty)
+):
+    """
+    GET /nlp/timing/stats
+    
+    Per-stage wall and CPU time histograms of NLP analyses, to find which stage makes analyses slow.
+    
+    - Requires faculty authentication
+    - Empty unless NLP_STAGE_TIMING_ENABLED=true
+    - Stages: load, features, writing (style_profile, cache_lookup, quality_jump, each
+      *_analysis analyzer, cache_store), behavior, collusion, originality, feedback, save_scores, commit
+    - Counters of this worker process only
+    """
+    return TimingStatsResponse(**get_timing_stats())
+
+
+@router.post("/live/{session_id}", response_model=LiveAnalysisResponse)
+def analyze_live_draft(
+    session_id: str,
+    request: LiveAnalysisRequest,
+    current_user: User = Depends(require_student)
+):
+    """
+    POST /nlp/live/{session_id}
+    
+    Incremental sentence variety, repetition and generic-phrasing analysis of a draft while it is typed.
+    
+    - Requires student authentication
+    - session_id is chosen by the client (e.g. one per question being answered)
+    - Send `text` to start or resync a session, then `deltas` with the `base_version` they apply to;
+      only the sentences an edit touches are re-analyzed
+    - 409 Conflict: unknown session or stale base_version - resend the full `text`
+    
+    Returns the analyzer results, the new version and how many sentences were re-analyzed.
+    """
+    if (request.text is None) == (request.deltas is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide exactly one of text or deltas"
+        )
+    
+    try:
+        result = update_live_session(
+            session_id,
+            current_user.id,
+            text=request.text,
+            deltas=[(delta.start, delta.end, delta.text) for delta in request.deltas or []],
+            base_version=request.base_version
+        )
+    except LiveSessionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return LiveAnalysisResponse(**result)
+
+
+@router.delete("/live/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def end_live_draft(
+    session_id: str,
+    current_user: User = Depends(require_student)
+):
+    """
+    DELETE /nlp/live/{session_id}
+    
+    Discards a live draft session, e.g. once the answer is submitted.
+    
+    - Requires student authentication
+    """
+    if not end_live_session(session_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Live session not found"
+        )
+
+
+@router.get("/shadow/stats", response_model=ShadowStatsResponse)
+def shadow_scoring_stats(
+    current_user: User = Depends(require_faculty)
+):
+    """
+    GET /nlp/shadow/stats
+    
+    How the candidate risk scoring (NLP_SHADOW_CANDIDATE) compares with the current one
+    on the sampled live analyses.
+    
+    - Requires faculty authentication
+    - comparison: flag transition matrix (current -> candidate), score delta
+      distributions, feedback changes and example flipped answers
+    - Counters are per API worker process; nothing is written
+    """
+    return ShadowStatsResponse(**get_shadow_stats())
@@ -14,18 +14,40 @@ IMPORTANT: NO PAID AI APIs ARE USED
 
 All analysis is based on:
 - rapidfuzz library for string similarity
-- Basic cosine similarity for originality
+- TF-IDF cosine similarity against each question's earlier answers (originality)
 - Sentence length variance for writing flow
+- Edit/focus event telemetry (pauses, idle gaps, paste bursts) for behavior
 - Pattern matching for generic phrasing
+- MinHash/LSH near-duplicate search across students' answers (collusion)
 """
 
-import re
-from typing import Dict, Tuple, Optional
+import time
+from functools import partial
+from typing import Callable, Dict, NamedTuple, Tuple, Optional, List
+from uuid import UUID
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 from app.models.answer_attempt import AnswerAttempt
 from app.models.assessment import AssessmentAttempt
 from app.models.feedback import Feedback, GapType
+from app.models.nlp_analysis import NLPAnalysis
+from app.db.upsert import dialect_insert
+from app.nlp.repetition import find_similar_pairs
+from app.nlp.text_features import TextFeatures
+from app.nlp.phrase_matcher import get_generic_phrase_matcher
+from app.nlp.collusion import analyze_collusion, record_answer_signature
+from app.nlp.originality import analyze_originality, record_answer_vector
+from app.nlp.telemetry import load_telemetry_features, telemetry_behavior
+from app.nlp.stage_timing import stage
+from app.nlp.style_profile import (
+    style_metrics, record_style_sample, get_answer_baseline, load_profiles, load_samples,
+    baseline_fingerprint
+)
+from app.nlp import result_cache
+from app.analytics.topic_stats import apply_topic_deltas, gap_change
+from app.analytics.result_cache import bump_data_version
+from app.core.config import NLP_STYLE_BASELINE_PER_SUBJECT
 
 # Import rapidfuzz for better similarity detection
 try:
@@ -36,6 +58,21 @@ except ImportError:
     import logging
     logging.warning("rapidfuzz not available, using basic similarity")
 
+# Bump whenever an analyzer's logic changes: cached results of other versions are never read
+ANALYZER_VERSION = "1"
+
+
+def analyzer_version() -> str:
+    """ANALYZER_VERSION combined with the loaded generic-phrase lexicon."""
+    return f"{ANALYZER_VERSION}+{get_generic_phrase_matcher().fingerprint}"
+
+
+def writing_analysis_cache_key(answer_text: str, style_baseline: Optional[Dict],
+                               full: bool = False) -> Dict[str, str]:
+    """Result-cache key of a writing analysis: text, analyzer version (and mode) and quality-jump baseline."""
+    version = analyzer_version() + ("+full" if full else "")
+    return result_cache.make_key(answer_text, version, baseline_fingerprint(style_baseline))
+
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
     """
@@ -62,7 +99,7 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
         return (intersection / union * 100) if union > 0 else 0.0
 
 
-def analyze_answer_length(answer_text: str) -> Dict[str, any]:
+def analyze_answer_length(answer_text: str, features: Optional[TextFeatures] = None) -> Dict[str, any]:
     """
     Analyze answer length and structure.
     Returns word count, character count, and length category.
@@ -74,10 +111,11 @@ def analyze_answer_length(answer_text: str) -> Dict[str, any]:
             "length_category": "empty"
         }
     
+    features = features or TextFeatures(answer_text)
+    
     # Count words (split by whitespace)
-    words = answer_text.split()
-    word_count = len(words)
-    char_count = len(answer_text)
+    word_count = features.word_count
+    char_count = features.char_count
     
     # Categorize length
     if word_count == 0:
@@ -100,7 +138,7 @@ def analyze_answer_length(answer_text: str) -> Dict[str, any]:
     }
 
 
-def analyze_sentence_variety(answer_text: str) -> Dict[str, any]:
+def analyze_sentence_variety(answer_text: str, features: Optional[TextFeatures] = None) -> Dict[str, any]:
     """
     Analyze sentence structure variety and complexity.
     Measures sentence count, average length, and variety score.
@@ -113,11 +151,10 @@ def analyze_sentence_variety(answer_text: str) -> Dict[str, any]:
             "has_variety": False
         }
     
-    # Split into sentences (basic split on .!?)
-    sentences = re.split(r'[.!?]+', answer_text)
-    sentences = [s.strip() for s in sentences if s.strip()]
+    features = features or TextFeatures(answer_text)
     
-    sentence_count = len(sentences)
+    # Sentences (basic split on .!?), tokenized once in TextFeatures
+    sentence_count = features.sentence_count
     if sentence_count == 0:
         return {
             "sentence_count": 0,
@@ -127,7 +164,7 @@ def analyze_sentence_variety(answer_text: str) -> Dict[str, any]:
         }
     
     # Calculate sentence lengths
-    sentence_lengths = [len(s.split()) for s in sentences]
+    sentence_lengths = features.sentence_word_counts
     avg_length = sum(sentence_lengths) / sentence_count
     
     # Calculate variety: standard deviation of sentence lengths
@@ -149,31 +186,41 @@ def analyze_sentence_variety(answer_text: str) -> Dict[str, any]:
     }
 
 
-def analyze_repetition(answer_text: str) -> Dict[str, any]:
+def analyze_repetition(answer_text: str, features: Optional[TextFeatures] = None,
+                       full: bool = True) -> Dict[str, any]:
     """
     Detect repetitive patterns in text using LOCAL algorithms.
     Uses rapidfuzz for fuzzy similarity detection.
     High repetition may indicate low originality or AI generation.
     
+    With full=False the fuzzy search (the expensive part) is skipped when the
+    exact repeats alone already decide is_repetitive; repetition_score and
+    repeated_phrases then cover exact repeats only (similar_phrases_checked=False).
+    
     This is LOCAL processing only - no external AI APIs.
     """
-    if not answer_text or len(answer_text.split()) < 10:
+    if not answer_text:
         return {
             "repetition_score": 0,
             "repeated_phrases": [],
-            "is_repetitive": False
+            "is_repetitive": False,
+            "similar_phrases_checked": True
         }
     
-    # Convert to lowercase for analysis
-    text_lower = answer_text.lower()
-    words = text_lower.split()
+    features = features or TextFeatures(answer_text)
+    if features.word_count < 10:
+        return {
+            "repetition_score": 0,
+            "repeated_phrases": [],
+            "is_repetitive": False,
+            "similar_phrases_checked": True
+        }
     
-    # Look for repeated 3-gram phrases
+    # Look for repeated 3-gram phrases (lowercase, sliced from the shared token offsets)
     repeated_phrases = []
     phrase_counts = {}
     
-    for i in range(len(words) - 2):
-        phrase = " ".join(words[i:i+3])
+    for phrase in features.lower_ngrams(3):
         phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
     
     # Find phrases that appear more than once
@@ -181,31 +228,25 @@ def analyze_repetition(answer_text: str) -> Dict[str, any]:
         if count > 1:
             repeated_phrases.append({"phrase": phrase, "count": count})
     
+    total_phrases = features.word_count - 2
+    similar_phrases_checked = full or not repetition_decided(
+        sum(p["count"] - 1 for p in repeated_phrases), total_phrases
+    )
+    
     # If rapidfuzz is available, also check for similar phrases
-    if RAPIDFUZZ_AVAILABLE and len(phrase_counts) > 1:
-        phrases_list = list(phrase_counts.keys())
-        similar_pairs = []
-        
-        for i in range(len(phrases_list)):
-            for j in range(i + 1, len(phrases_list)):
-                similarity = fuzz.ratio(phrases_list[i], phrases_list[j])
-                if similarity > 80:  # 80% similar
-                    similar_pairs.append({
-                        "phrase1": phrases_list[i],
-                        "phrase2": phrases_list[j],
-                        "similarity": similarity
-                    })
+    # (indexed engine - see app/nlp/repetition.py)
+    if similar_phrases_checked and RAPIDFUZZ_AVAILABLE and len(phrase_counts) > 1:
+        similar_pairs = find_similar_pairs(list(phrase_counts.keys()), limit=MAX_SIMILAR_PAIRS)
         
         # Add similar phrases to repeated phrases
         if similar_pairs:
             repeated_phrases.extend([
                 {"phrase": f"{p['phrase1']} (similar to: {p['phrase2']})", "count": 2}
-                for p in similar_pairs[:3]  # Top 3
+                for p in similar_pairs[:MAX_SIMILAR_PAIRS]
             ])
     
     # Calculate repetition score (0-100)
     # Higher score means more repetition
-    total_phrases = len(words) - 2
     if total_phrases > 0:
         repetition_ratio = sum(p["count"] - 1 for p in repeated_phrases) / total_phrases
         repetition_score = min(100, int(repetition_ratio * 200))
@@ -217,63 +258,62 @@ def analyze_repetition(answer_text: str) -> Dict[str, any]:
     return {
         "repetition_score": repetition_score,
         "repeated_phrases": repeated_phrases[:5],  # Top 5 repeated phrases
-        "is_repetitive": is_repetitive
+        "is_repetitive": is_repetitive,
+        "similar_phrases_checked": similar_phrases_checked
     }
 
 
-def detect_quality_jump(answer_text: str, previous_answers: list) -> Dict[str, any]:
+# Similar-phrase pairs analyze_repetition can add, each counting as one extra repeat
+MAX_SIMILAR_PAIRS = 3
+
+
+def repetition_decided(exact_repeats: int, total_phrases: int) -> bool:
     """
-    Detect sudden jumps in writing quality compared to previous answers.
-    Analyzes complexity, vocabulary, and structure changes.
+    True if is_repetitive is the same whatever the fuzzy search finds: the
+    exact repeats already exceed the threshold, or stay under it even with
+    MAX_SIMILAR_PAIRS more.
     """
-    if not answer_text or not previous_answers:
-        return {
-            "quality_jump_detected": False,
-            "current_complexity": 0,
-            "avg_previous_complexity": 0,
-            "jump_magnitude": 0
-        }
-    
-    # Calculate complexity score based on:
-    # - Average word length
-    # - Sentence complexity
-    # - Vocabulary diversity
-    
-    def calculate_complexity(text: str) -> float:
-        if not text:
-            return 0
-        
-        words = text.split()
-        if not words:
-            return 0
-        
-        # Average word length
-        avg_word_len = sum(len(w) for w in words) / len(words)
-        
-        # Unique word ratio (vocabulary diversity)
-        unique_ratio = len(set(words)) / len(words) if len(words) > 0 else 0
-        
-        # Sentence count
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        words_per_sentence = len(words) / len(sentences) if len(sentences) > 0 else len(words)
-        
-        # Combine metrics (normalized to 0-100)
-        complexity = (avg_word_len * 10) + (unique_ratio * 30) + (words_per_sentence * 2)
-        return min(100, complexity)
+    if total_phrases <= 0:
+        return True
+    lower = min(100, int(exact_repeats / total_phrases * 200))
+    upper = min(100, int((exact_repeats + MAX_SIMILAR_PAIRS) / total_phrases * 200))
+    return lower > 30 or upper <= 30
+
+
+def calculate_complexity(text: str, features: Optional[TextFeatures] = None) -> float:
+    """
+    Writing complexity score (0-100) used for quality-jump detection.
     
-    current_complexity = calculate_complexity(answer_text)
-    previous_complexities = [calculate_complexity(ans) for ans in previous_answers if ans]
+    Based on:
+    - Average word length
+    - Sentence complexity
+    - Vocabulary diversity
+    """
+    if not text:
+        return 0
     
-    if not previous_complexities:
+    return style_metrics(text, features)["complexity"]
+
+
+def detect_quality_jump(answer_text: str, style_baseline: Optional[Dict],
+                        features: Optional[TextFeatures] = None) -> Dict[str, any]:
+    """
+    Detect sudden jumps in writing quality compared to the student's previous answers.
+    style_baseline is the student's style profile without this answer
+    (see app/nlp/style_profile.py), so the cost does not grow with their history.
+    """
+    baseline_count = style_baseline["count"] if style_baseline else 0
+    if not answer_text or not baseline_count:
         return {
             "quality_jump_detected": False,
-            "current_complexity": round(current_complexity, 2),
+            "current_complexity": 0,
             "avg_previous_complexity": 0,
-            "jump_magnitude": 0
+            "jump_magnitude": 0,
+            "baseline_answer_count": 0
         }
     
-    avg_previous_complexity = sum(previous_complexities) / len(previous_complexities)
+    current_complexity = calculate_complexity(answer_text, features)
+    avg_previous_complexity = style_baseline["complexity"]["mean"]
     jump_magnitude = current_complexity - avg_previous_complexity
     
     # Quality jump detected if current is 25+ points higher than average
@@ -283,55 +323,37 @@ def detect_quality_jump(answer_text: str, previous_answers: list) -> Dict[str, a
         "quality_jump_detected": quality_jump_detected,
         "current_complexity": round(current_complexity, 2),
         "avg_previous_complexity": round(avg_previous_complexity, 2),
-        "jump_magnitude": round(jump_magnitude, 2)
+        "jump_magnitude": round(jump_magnitude, 2),
+        "complexity_std": round(style_baseline["complexity"]["std"], 2),
+        "baseline_answer_count": baseline_count,
+        "baseline_scope": style_baseline.get("scope", "overall")
     }
 
 
-def detect_generic_phrasing(answer_text: str) -> Dict[str, any]:
+def detect_generic_phrasing(answer_text: str, features: Optional[TextFeatures] = None) -> Dict[str, any]:
     """
     Detect generic or template-like phrases commonly found in AI-generated text.
     Subject-agnostic patterns that indicate low originality.
+    generic_phrase_matches maps each phrase found to its count and start offsets.
     """
     if not answer_text:
         return {
             "generic_score": 0,
             "generic_phrases_found": [],
+            "generic_phrase_matches": {},
             "is_generic": False
         }
     
-    text_lower = answer_text.lower()
-    
-    # Common generic patterns (subject-agnostic)
-    generic_patterns = [
-        r"in conclusion",
-        r"to sum up",
-        r"in summary",
-        r"it is important to note",
-        r"it should be noted",
-        r"as mentioned earlier",
-        r"furthermore",
-        r"moreover",
-        r"additionally",
-        r"on the other hand",
-        r"in other words",
-        r"that being said",
-        r"first and foremost",
-        r"last but not least",
-        r"it goes without saying",
-        r"needless to say",
-        r"at the end of the day",
-        r"when all is said and done",
-        r"the bottom line is",
-        r"to put it simply"
-    ]
-    
-    found_phrases = []
-    for pattern in generic_patterns:
-        if re.search(pattern, text_lower):
-            found_phrases.append(pattern)
+    features = features or TextFeatures(answer_text)
+    text_lower = features.lower
+    
+    # Common generic patterns (subject-agnostic), loaded from app/data/generic_phrases.json
+    # and matched in a single scan of the text
+    phrase_matches = get_generic_phrase_matcher().find_all(text_lower)
+    found_phrases = list(phrase_matches.keys())
     
     # Calculate generic score (0-100)
-    word_count = len(answer_text.split())
+    word_count = features.word_count
     if word_count > 0:
         # Each generic phrase adds to the score
         generic_score = min(100, len(found_phrases) * 15)
@@ -343,30 +365,97 @@ def detect_generic_phrasing(answer_text: str) -> Dict[str, any]:
     return {
         "generic_score": generic_score,
         "generic_phrases_found": found_phrases,
+        "generic_phrase_matches": phrase_matches,
         "is_generic": is_generic
     }
 
 
-def analyze_writing_pattern(answer_attempt: AnswerAttempt, db: Session) -> Dict[str, any]:
+class WritingAnalyzer(NamedTuple):
+    """
+    A text analyzer run by combine_writing_analyses.
+    - lazy: cheaper call that computes the fields the writing flags and
+      calculate_risk_score read exactly, but may leave the other
+      (details-only) fields partial; None if it always runs in full
+    """
+    key: str
+    run: Callable[..., Dict[str, any]]
+    lazy: Optional[Callable[..., Dict[str, any]]] = None
+
+
+# calculate_risk_score reads a field of every analyzer's result directly (not
+# only through the combined flags), so every analyzer runs; what can be skipped
+# is repetition's fuzzy search once exact repeats decide is_repetitive. Lazy
+# forms only run in batch analysis and bulk re-analysis (unless full=True);
+# per-answer analysis returns and caches complete details.
+WRITING_ANALYZERS: Tuple[WritingAnalyzer, ...] = (
+    WritingAnalyzer("length_analysis", analyze_answer_length),
+    WritingAnalyzer("variety_analysis", analyze_sentence_variety),
+    WritingAnalyzer("generic_analysis", detect_generic_phrasing),
+    WritingAnalyzer(
+        "repetition_analysis", analyze_repetition,
+        lazy=partial(analyze_repetition, full=False)
+    ),
+)
+
+
+def analyze_writing_pattern(answer_attempt: AnswerAttempt, db: Session,
+                            features: Optional[TextFeatures] = None, full: bool = True) -> Dict[str, any]:
     """
     STEP 1: Comprehensive writing pattern analysis.
     Combines all pattern detection methods and flags AI generation or low originality.
+    Records the answer in the student's style profile if needed; the caller commits.
+    Results are cached by answer text, analyzer version and baseline (app/nlp/result_cache.py).
+    full=False only computes what the risk scores need (see WRITING_ANALYZERS).
     """
     answer_text = answer_attempt.answer_text or ""
+    features = features or TextFeatures(answer_text)
+    
+    # Compare against the student's persistent style profile, folding this
+    # answer in first if it was never recorded (O(1), no previous texts re-read)
+    style_baseline = None
+    if answer_text:
+        with stage("style_profile"):
+            # Shared so a profile created by the fold is found unflushed by the lookup
+            profiles = {}
+            sample = record_style_sample(db, answer_attempt, features, profiles)
+            style_baseline = get_answer_baseline(
+                db, answer_attempt, sample, NLP_STYLE_BASELINE_PER_SUBJECT, profiles
+            )
     
-    # Get previous answers from the same student in the same assessment
-    previous_answer_attempts = db.query(AnswerAttempt).filter(
-        AnswerAttempt.assessment_id == answer_attempt.assessment_id,
-        AnswerAttempt.id != answer_attempt.id
-    ).all()
-    previous_answers = [ans.answer_text for ans in previous_answer_attempts if ans.answer_text]
+    with stage("cache_lookup"):
+        cache_key = writing_analysis_cache_key(answer_text, style_baseline, full)
+        cached = result_cache.get(db, cache_key)
+    if cached is not None:
+        return cached
+    
+    with stage("quality_jump"):
+        quality_jump_analysis = detect_quality_jump(answer_text, style_baseline, features)
+    writing_analysis = combine_writing_analyses(answer_text, quality_jump_analysis, features, full)
+    with stage("cache_store"):
+        result_cache.put(db, cache_key, writing_analysis)
+    return writing_analysis
+
+
+def combine_writing_analyses(answer_text: str, quality_jump_analysis: Dict,
+                             features: Optional[TextFeatures] = None, full: bool = False) -> Dict[str, any]:
+    """
+    Run the text-only analyzers (WRITING_ANALYZERS) and derive the AI-generation / low-originality flags.
+    The quality-jump result is passed in because it depends on the student's other answers.
+    Unless full=True, analyzers with a lazy form only compute what the risk scores read.
+    """
+    # Tokenize once, shared by every analyzer
+    features = features or TextFeatures(answer_text)
     
     # Run all analyses
-    length_analysis = analyze_answer_length(answer_text)
-    variety_analysis = analyze_sentence_variety(answer_text)
-    repetition_analysis = analyze_repetition(answer_text)
-    quality_jump_analysis = detect_quality_jump(answer_text, previous_answers)
-    generic_analysis = detect_generic_phrasing(answer_text)
+    analyses = {}
+    for analyzer in WRITING_ANALYZERS:
+        with stage(analyzer.key):
+            run = analyzer.run if full or analyzer.lazy is None else analyzer.lazy
+            analyses[analyzer.key] = run(answer_text, features)
+    length_analysis = analyses["length_analysis"]
+    variety_analysis = analyses["variety_analysis"]
+    repetition_analysis = analyses["repetition_analysis"]
+    generic_analysis = analyses["generic_analysis"]
     
     # Determine flags
     # AI generation indicators:
@@ -401,20 +490,25 @@ def analyze_writing_pattern(answer_attempt: AnswerAttempt, db: Session) -> Dict[
     }
 
 
-def analyze_pause_behavior(answer_attempt: AnswerAttempt, assessment_attempt: AssessmentAttempt) -> Dict[str, any]:
+def analyze_pause_behavior(answer_attempt: AnswerAttempt, assessment_attempt: AssessmentAttempt,
+                           features: Optional[TextFeatures] = None,
+                           telemetry: Optional[Dict] = None) -> Dict[str, any]:
     """
     STEP 2: Pause and behavior analysis.
     Analyzes timing patterns to detect suspicious behaviors.
+    telemetry holds the answer's edit-event features (app/nlp/telemetry.py); when
+    present, pauses and copy behavior come from real timestamps instead of the
+    progress-based estimate.
     """
-    # Note: We need submission timestamp to be added to AnswerAttempt model
-    # For now, we'll work with available data: started_at, stopped_at_step, progress_percentage
+    # Without telemetry we work with available data: started_at, stopped_at_step, progress_percentage
     
-    if not assessment_attempt.started_at:
+    if not assessment_attempt.started_at and telemetry is None:
         return {
             "suspicious_pause": False,
             "low_knowledge_signal": False,
             "possible_copy_behavior": False,
-            "analysis_details": "Insufficient timing data"
+            "analysis_details": "Insufficient timing data",
+            "telemetry": None
         }
     
     # Check progress and stopped_at_step for low knowledge signals
@@ -426,7 +520,8 @@ def analyze_pause_behavior(answer_attempt: AnswerAttempt, assessment_attempt: As
     
     # Check answer quality vs progress
     answer_text = answer_attempt.answer_text or ""
-    word_count = len(answer_text.split())
+    features = features or TextFeatures(answer_text)
+    word_count = features.word_count
     
     # Possible copy behavior: low progress but suddenly high-quality answer
     # This suggests they may have copied from elsewhere
@@ -436,25 +531,40 @@ def analyze_pause_behavior(answer_attempt: AnswerAttempt, assessment_attempt: As
         stopped_at > 0
     )
     
-    # Suspicious pause detection would require actual timestamps
-    # We'll flag if progress is inconsistent with answer quality
+    # Without timestamps, flag a pause if progress is inconsistent with answer quality
     suspicious_pause = possible_copy_behavior
     
+    # With telemetry: text arriving in bursts rather than typed, right after an absence
+    if telemetry is not None:
+        telemetry_flags = telemetry_behavior(telemetry)
+        suspicious_pause = telemetry_flags["suspicious_pause"]
+        possible_copy_behavior = telemetry_flags["possible_copy_behavior"]
+    
     return {
         "suspicious_pause": suspicious_pause,
         "low_knowledge_signal": low_knowledge_signal,
         "possible_copy_behavior": possible_copy_behavior,
         "progress_percentage": progress,
         "stopped_at_step": stopped_at,
-        "answer_word_count": word_count
+        "answer_word_count": word_count,
+        "telemetry": telemetry
     }
 
 
-def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict) -> Dict[str, any]:
+def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict,
+                         collusion_analysis: Optional[Dict] = None,
+                         originality_analysis: Optional[Dict] = None) -> Dict[str, any]:
     """
     STEP 3: Risk scoring.
     Generates explainable scores and risk flags based on all analyses.
+    collusion_analysis (optional) flags near-identical answers from other students.
+    originality_analysis (optional) flags answers whose TF-IDF vector is very close
+    to an earlier answer to the same question (reworded copies collusion misses).
     """
+    collusion_detected = bool(collusion_analysis and collusion_analysis["collusion_detected"])
+    # Near-identical answers are already penalized as collusion
+    derivative = bool(originality_analysis and originality_analysis["is_derivative"]) and not collusion_detected
+    
     # Calculate originality score (0-100, higher is better)
     originality_score = 100
     
@@ -468,6 +578,12 @@ def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict) -> Dic
     if writing_analysis["generic_analysis"]["is_generic"]:
         originality_score -= 15
     
+    if collusion_detected:
+        originality_score -= 40
+    
+    if derivative:
+        originality_score -= 25
+    
     # Ensure score stays in valid range
     originality_score = max(0, min(100, originality_score))
     
@@ -487,6 +603,9 @@ def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict) -> Dic
     if behavior_analysis["suspicious_pause"]:
         confidence_score -= 15
     
+    if collusion_detected:
+        confidence_score -= 30
+    
     # Ensure score stays in valid range
     confidence_score = max(0, min(100, confidence_score))
     
@@ -500,7 +619,9 @@ def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict) -> Dic
         writing_analysis["looks_ai_generated"],
         writing_analysis["low_originality"],
         behavior_analysis["possible_copy_behavior"],
-        behavior_analysis["low_knowledge_signal"]
+        behavior_analysis["low_knowledge_signal"],
+        collusion_detected,
+        derivative
     ])
     
     if confidence_score < 40 or red_flag_count >= 3:
@@ -520,7 +641,9 @@ def calculate_risk_score(writing_analysis: Dict, behavior_analysis: Dict) -> Dic
     }
 
 
-def generate_feedback_text(risk_score: Dict, writing_analysis: Dict, behavior_analysis: Dict) -> Optional[str]:
+def generate_feedback_text(risk_score: Dict, writing_analysis: Dict, behavior_analysis: Dict,
+                           collusion_analysis: Optional[Dict] = None,
+                           originality_analysis: Optional[Dict] = None) -> Optional[str]:
     """
     STEP 4: Feedback integration.
     Generates appropriate feedback text based on risk level and specific issues found.
@@ -564,6 +687,17 @@ def generate_feedback_text(risk_score: Dict, writing_analysis: Dict, behavior_an
             "For better learning, try to answer in your own words without external help."
         )
     
+    if collusion_analysis and collusion_analysis["collusion_detected"]:
+        feedback_messages.append(
+            "Your answer is nearly identical to another submitted answer. "
+            "Answers should be written independently to reflect your own understanding."
+        )
+    elif originality_analysis and originality_analysis["is_derivative"]:
+        feedback_messages.append(
+            "Your answer closely follows the wording and terms of an earlier answer to this question. "
+            "Explain the concepts in your own words and with your own examples."
+        )
+    
     if behavior_analysis["low_knowledge_signal"]:
         feedback_messages.append(
             "Your progress pattern indicates difficulty with the material. "
@@ -588,7 +722,8 @@ def generate_feedback_text(risk_score: Dict, writing_analysis: Dict, behavior_an
 
 def create_nlp_feedback(answer_attempt: AnswerAttempt, risk_score: Dict, 
                         writing_analysis: Dict, behavior_analysis: Dict, 
-                        db: Session) -> Optional[Feedback]:
+                        db: Session, collusion_analysis: Optional[Dict] = None,
+                        originality_analysis: Optional[Dict] = None) -> Optional[Feedback]:
     """
     Create or update feedback entry with NLP analysis results.
     Only creates feedback for medium or high risk cases.
@@ -599,7 +734,9 @@ def create_nlp_feedback(answer_attempt: AnswerAttempt, risk_score: Dict,
     if risk_flag not in ["medium", "high"]:
         return None
     
-    feedback_text = generate_feedback_text(risk_score, writing_analysis, behavior_analysis)
+    feedback_text = generate_feedback_text(
+        risk_score, writing_analysis, behavior_analysis, collusion_analysis, originality_analysis
+    )
     
     if not feedback_text:
         return None
@@ -609,62 +746,151 @@ def create_nlp_feedback(answer_attempt: AnswerAttempt, risk_score: Dict,
         Feedback.answer_attempt_id == answer_attempt.id
     ).first()
     
+    feedback = upsert_nlp_feedback(answer_attempt, feedback_text, existing_feedback, db)
+    db.flush()
+    return feedback
+
+
+def upsert_nlp_feedback(answer_attempt: AnswerAttempt, feedback_text: str,
+                        existing_feedback: Optional[Feedback], db: Session,
+                        topic_deltas: Optional[Dict] = None) -> Feedback:
+    """
+    Update the existing feedback row or stage a new one.
+    Does not flush, so batch callers can write many rows in one round trip.
+    Unchanged feedback (e.g. a re-analysis of the same answer) is not rewritten.
+    A gap type change is counted in the topic_stats rollup: added to
+    topic_deltas when given (the caller applies them), otherwise applied at once.
+    """
+    old_gap = existing_feedback.gap_type if existing_feedback else None
+    if old_gap != GapType.logic:
+        deltas = topic_deltas if topic_deltas is not None else {}
+        gap_change(deltas, answer_attempt.question.topic_id, old_gap, GapType.logic)
+        if topic_deltas is None:
+            apply_topic_deltas(db, deltas)
+    
     if existing_feedback:
+        if existing_feedback.feedback_text == feedback_text and existing_feedback.gap_type == GapType.logic:
+            return existing_feedback
+        
         # Update existing feedback
         existing_feedback.feedback_text = feedback_text
         existing_feedback.gap_type = GapType.logic  # NLP-detected issues are primarily logic/approach issues
-        db.flush()
         return existing_feedback
-    else:
-        # Create new feedback
-        new_feedback = Feedback(
-            answer_attempt_id=answer_attempt.id,
-            gap_type=GapType.logic,
-            feedback_text=feedback_text,
-            suggested_next_topic=None  # NLP analysis doesn't suggest specific topics
-        )
-        db.add(new_feedback)
-        db.flush()
-        return new_feedback
+    
+    # Create new feedback
+    new_feedback = Feedback(
+        answer_attempt_id=answer_attempt.id,
+        gap_type=GapType.logic,
+        feedback_text=feedback_text,
+        suggested_next_topic=None  # NLP analysis doesn't suggest specific topics
+    )
+    db.add(new_feedback)
+    return new_feedback
 
 
-def analyze_answer_attempt(answer_attempt_id, db: Session) -> Dict[str, any]:
+def save_nlp_analyses(db: Session, rows: List[Dict[str, any]]):
+    """
+    Insert or replace the nlp_analysis rows of analyzed answers in one statement.
+    Each row holds answer_attempt_id, user_id, the scores and risk_flag.
+    Executed in the caller's transaction.
+    """
+    if not rows:
+        return
+    version = analyzer_version()
+    
+    statement = dialect_insert(db, NLPAnalysis)
+    if statement is None:
+        for row in rows:
+            db.merge(NLPAnalysis(analyzer_version=version, analyzed_at=datetime.utcnow(), **row))
+        return
+    
+    statement = statement.values([dict(row, analyzer_version=version) for row in rows])
+    statement = statement.on_conflict_do_update(
+        index_elements=[NLPAnalysis.answer_attempt_id],
+        set_={
+            "originality_score": statement.excluded.originality_score,
+            "confidence_score": statement.excluded.confidence_score,
+            "risk_flag": statement.excluded.risk_flag,
+            "analyzer_version": statement.excluded.analyzer_version,
+            "analyzed_at": func.now()
+        }
+    )
+    db.execute(statement)
+
+
+def nlp_analysis_row(answer_attempt: AnswerAttempt, user_id: UUID, risk_score: Dict) -> Dict[str, any]:
+    """The nlp_analysis values of one analyzed answer."""
+    return {
+        "answer_attempt_id": answer_attempt.id,
+        "user_id": user_id,
+        "originality_score": risk_score["originality_score"],
+        "confidence_score": risk_score["confidence_score"],
+        "risk_flag": risk_score["risk_flag"]
+    }
+
+
+def analyze_answer_attempt(answer_attempt_id, db: Session, full: bool = True) -> Dict[str, any]:
     """
     Main entry point for NLP analysis.
     Performs complete analysis and returns results.
+    full=False only computes what the risk scores need (see WRITING_ANALYZERS);
+    batch analysis and bulk re-analysis run that way.
+    Each stage is timed when NLP_STAGE_TIMING_ENABLED is set (app/nlp/stage_timing.py).
     """
-    # Fetch answer attempt
-    answer_attempt = db.query(AnswerAttempt).filter(
-        AnswerAttempt.id == answer_attempt_id
-    ).first()
-    
-    if not answer_attempt:
-        raise ValueError("Answer attempt not found")
-    
-    # Fetch assessment attempt for timing data
-    assessment_attempt = db.query(AssessmentAttempt).filter(
-        AssessmentAttempt.id == answer_attempt.assessment_id
-    ).first()
-    
-    if not assessment_attempt:
-        raise ValueError("Assessment attempt not found")
-    
-    # Perform all analyses
-    writing_analysis = analyze_writing_pattern(answer_attempt, db)
-    behavior_analysis = analyze_pause_behavior(answer_attempt, assessment_attempt)
-    risk_score = calculate_risk_score(writing_analysis, behavior_analysis)
+    with stage("load"):
+        # Fetch answer attempt
+        answer_attempt = db.query(AnswerAttempt).filter(
+            AnswerAttempt.id == answer_attempt_id
+        ).first()
+        
+        if not answer_attempt:
+            raise ValueError("Answer attempt not found")
+        
+        # Fetch assessment attempt for timing data
+        assessment_attempt = db.query(AssessmentAttempt).filter(
+            AssessmentAttempt.id == answer_attempt.assessment_id
+        ).first()
+        
+        if not assessment_attempt:
+            raise ValueError("Assessment attempt not found")
+    
+    # Perform all analyses on a single tokenization of the answer
+    with stage("features"):
+        features = TextFeatures(answer_attempt.answer_text or "")
+    with stage("writing"):
+        writing_analysis = analyze_writing_pattern(answer_attempt, db, features, full)
+    with stage("behavior"):
+        telemetry = load_telemetry_features(db, [(answer_attempt.assessment_id, answer_attempt.question_id)])
+        behavior_analysis = analyze_pause_behavior(
+            answer_attempt, assessment_attempt, features,
+            telemetry.get((answer_attempt.assessment_id, answer_attempt.question_id))
+        )
+    with stage("collusion"):
+        collusion_analysis = analyze_collusion(db, answer_attempt, features)
+    with stage("originality"):
+        originality_analysis = analyze_originality(db, answer_attempt, features)
+    risk_score = calculate_risk_score(writing_analysis, behavior_analysis, collusion_analysis, originality_analysis)
     
     # Create feedback if needed
-    feedback = create_nlp_feedback(
-        answer_attempt, 
-        risk_score, 
-        writing_analysis, 
-        behavior_analysis, 
-        db
-    )
+    with stage("feedback"):
+        feedback = create_nlp_feedback(
+            answer_attempt, 
+            risk_score, 
+            writing_analysis, 
+            behavior_analysis, 
+            db,
+            collusion_analysis,
+            originality_analysis
+        )
+    
+    # Persist the scores for analytics trends
+    with stage("save_scores"):
+        save_nlp_analyses(db, [nlp_analysis_row(answer_attempt, assessment_attempt.user_id, risk_score)])
     
     # Commit changes
-    db.commit()
+    with stage("commit"):
+        db.commit()
+    bump_data_version("feedback")
     
     return {
         "originality_score": risk_score["originality_score"],
@@ -672,5 +898,158 @@ def analyze_answer_attempt(answer_attempt_id, db: Session) -> Dict[str, any]:
         "risk_flag": risk_score["risk_flag"],
         "writing_analysis": writing_analysis,
         "behavior_analysis": behavior_analysis,
+        "collusion_analysis": collusion_analysis,
+        "originality_analysis": originality_analysis,
         "feedback_created": feedback is not None
     }
+
+
+
+def analyze_answer_attempts_batch(
+    db: Session,
+    assessment_id: Optional[UUID] = None,
+    answer_attempt_ids: Optional[List[UUID]] = None,
+    full: bool = False
+) -> Dict[str, any]:
+    """
+    Batch entry point for NLP analysis.
+    Analyzes every answer of an assessment, or a list of answer attempts, with:
+    - one query for the answers, their assessments and feedback
+    - one query each for the students' style profiles, the answers' style samples
+      and their edit telemetry
+    - one result-cache lookup; only uncached answers run the text analyzers
+      (lazily, unless full=True)
+    - one indexed LSH candidate query per answer for the collusion check
+    - TF-IDF originality measured once per answer, when its vector is first recorded
+    - one transaction for all style-profile, signature and feedback writes,
+      with every answer's scores saved to nlp_analysis in one statement
+      and the topic_stats gap counters updated in one more
+    """
+    started = time.perf_counter()
+    
+    query = db.query(AnswerAttempt).options(
+        joinedload(AnswerAttempt.assessment_attempt),
+        joinedload(AnswerAttempt.feedback),
+        joinedload(AnswerAttempt.question)
+    )
+    if assessment_id is not None:
+        query = query.filter(AnswerAttempt.assessment_id == assessment_id)
+    else:
+        query = query.filter(AnswerAttempt.id.in_(answer_attempt_ids or []))
+    loaded = query.all()
+    
+    if assessment_id is not None:
+        targets = loaded
+        not_found = []
+    else:
+        by_id = {answer.id: answer for answer in loaded}
+        requested = list(dict.fromkeys(answer_attempt_ids or []))
+        targets = [by_id[answer_id] for answer_id in requested if answer_id in by_id]
+        not_found = [answer_id for answer_id in requested if answer_id not in by_id]
+    
+    with stage("load"):
+        profiles = load_profiles(db, [answer.assessment_attempt.user_id for answer in targets])
+        samples = load_samples(db, [answer.id for answer in targets])
+        telemetry = load_telemetry_features(db, [(answer.assessment_id, answer.question_id) for answer in targets])
+    
+    # Tokenize every answer once, and fold answers never recorded in their
+    # student's style profile before any baseline is read
+    features_by_answer = {}
+    for answer in targets:
+        with stage("features"):
+            features = TextFeatures(answer.answer_text or "")
+        features_by_answer[answer.id] = features
+        with stage("style_profile"):
+            record_style_sample(db, answer, features, profiles, samples)
+        # Index every answer first, so answers in the same batch see each other
+        with stage("collusion"):
+            record_answer_signature(db, answer, features)
+        with stage("originality"):
+            record_answer_vector(db, answer, features)
+    loaded_at = time.perf_counter()
+    
+    # Baselines and result-cache keys for every answer, then one cache lookup
+    baselines = {}
+    cache_keys = {}
+    for answer in targets:
+        style_baseline = None
+        if answer.answer_text:
+            with stage("style_profile"):
+                style_baseline = get_answer_baseline(
+                    db, answer, samples.get(answer.id), NLP_STYLE_BASELINE_PER_SUBJECT, profiles
+                )
+        baselines[answer.id] = style_baseline
+        cache_keys[answer.id] = writing_analysis_cache_key(answer.answer_text or "", style_baseline, full)
+    with stage("cache_lookup"):
+        cached_results = result_cache.get_many(db, list(cache_keys.values()))
+    
+    results = []
+    analysis_rows = []
+    topic_deltas = {}
+    for answer in targets:
+        answer_text = answer.answer_text or ""
+        features = features_by_answer[answer.id]
+        cache_key = cache_keys[answer.id]
+        
+        writing_analysis = cached_results.get(cache_key["cache_key"])
+        if writing_analysis is None:
+            with stage("quality_jump"):
+                quality_jump_analysis = detect_quality_jump(answer_text, baselines[answer.id], features)
+            writing_analysis = combine_writing_analyses(answer_text, quality_jump_analysis, features, full)
+            with stage("cache_store"):
+                result_cache.put(db, cache_key, writing_analysis)
+            cached_results[cache_key["cache_key"]] = writing_analysis
+        
+        with stage("behavior"):
+            behavior_analysis = analyze_pause_behavior(
+                answer, answer.assessment_attempt, features, telemetry.get((answer.assessment_id, answer.question_id))
+            )
+        with stage("collusion"):
+            collusion_analysis = analyze_collusion(db, answer, features)
+        with stage("originality"):
+            originality_analysis = analyze_originality(db, answer, features)
+        risk_score = calculate_risk_score(writing_analysis, behavior_analysis, collusion_analysis, originality_analysis)
+        
+        feedback = None
+        if risk_score["risk_flag"] in ["medium", "high"]:
+            with stage("feedback"):
+                feedback_text = generate_feedback_text(
+                    risk_score, writing_analysis, behavior_analysis, collusion_analysis, originality_analysis
+                )
+                if feedback_text:
+                    feedback = upsert_nlp_feedback(answer, feedback_text, answer.feedback, db, topic_deltas)
+        analysis_rows.append(nlp_analysis_row(answer, answer.assessment_attempt.user_id, risk_score))
+        
+        results.append({
+            "answer_attempt_id": answer.id,
+            "originality_score": risk_score["originality_score"],
+            "confidence_score": risk_score["confidence_score"],
+            "risk_flag": risk_score["risk_flag"],
+            "writing_analysis": writing_analysis,
+            "behavior_analysis": behavior_analysis,
+            "collusion_analysis": collusion_analysis,
+            "originality_analysis": originality_analysis,
+            "feedback_created": feedback is not None
+        })
+    analyzed_at = time.perf_counter()
+    
+    # Single transaction for all style-profile, signature, feedback and score rows
+    with stage("save_scores"):
+        save_nlp_analyses(db, analysis_rows)
+        apply_topic_deltas(db, topic_deltas)
+    with stage("commit"):
+        db.commit()
+    bump_data_version("feedback")
+    finished = time.perf_counter()
+    
+    return {
+        "results": results,
+        "not_found": not_found,
+        "timing": {
+            "answers_analyzed": len(results),
+            "load_ms": round((loaded_at - started) * 1000, 2),
+            "analysis_ms": round((analyzed_at - loaded_at) * 1000, 2),
+            "write_ms": round((finished - analyzed_at) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2)
+        }
+    }
@@ -0,0 +1,254 @@
+"""
+Originality Module
+
+TF-IDF cosine originality of an answer against the earlier answers to the
+same question.
+
+Each question keeps incremental corpus statistics, updated once per answer
+in O(terms in the answer):
+- question_terms: document frequency and summed TF-IDF weight per term
+  (the summed weights are the unnormalized centroid of all answer vectors)
+- question_corpora: answer count and the squared norm of that centroid,
+  maintained with |S + v|^2 = |S|^2 + 2 S.v + |v|^2
+
+When an answer arrives (record_answer_vector), its sparse TF-IDF vector is
+built from the current document frequencies and compared with:
+1. the centroid - cosine S.v / |S|, read from the term rows of the answer
+   only, so it costs the same with 10 or 50,000 earlier answers
+2. other students' answers, in one vectorized pass, keeping the top
+   ORIGINALITY_TOP_K similarities. The candidates are the answers sharing
+   an LSH bucket with this one (its near-duplicate candidates, see
+   app/nlp/collusion.py, however old) plus the ORIGINALITY_NEIGHBOR_WINDOW
+   most recent ones (which covers answers too short for a signature)
+The results are stored on the answer's AnswerVector row, so re-analysis
+reads them instead of re-measuring against answers that came later.
+
+Both comparisons read the corpus without locking it. Only the update of
+the corpus counters and term statistics runs under the question_corpora
+row lock, so concurrent answers to one question wait for O(terms in the
+answer) work, not for the neighbour scan.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, aliased
+from app.db.upsert import dialect_insert
+from app.models.answer_attempt import AnswerAttempt
+from app.models.answer_signature import AnswerLSHBucket
+from app.models.answer_vector import AnswerVector, QuestionCorpus, QuestionTerm
+from app.nlp.text_features import TextFeatures
+from app.nlp.tfidf import similarities, term_counts, tfidf_vector, vector_to_bytes
+
+
+# Most recent answers of other students compared term by term with a new answer,
+# besides its LSH candidates
+ORIGINALITY_NEIGHBOR_WINDOW = 500
+
+# Nearest-answer similarities kept per answer
+ORIGINALITY_TOP_K = 5
+
+# Similarity to the corpus means little until the question has this many answers
+MIN_ORIGINALITY_CORPUS = 5
+
+# An answer this close (cosine) to an earlier answer is derivative
+DERIVATIVE_SIMILARITY_THRESHOLD = 0.8
+
+
+def _locked_corpus(db: Session, question_id: UUID) -> QuestionCorpus:
+    """The question's corpus row, created if needed and locked against concurrent answers."""
+    statement = dialect_insert(db, QuestionCorpus)
+    if statement is not None:
+        db.execute(statement.values(
+            question_id=question_id, doc_count=0, centroid_norm_sq=0.0
+        ).on_conflict_do_nothing())
+
+    corpus = db.query(QuestionCorpus).filter(
+        QuestionCorpus.question_id == question_id
+    ).with_for_update().first()
+    if corpus is None:
+        corpus = QuestionCorpus(question_id=question_id, doc_count=0, centroid_norm_sq=0.0)
+        db.add(corpus)
+    return corpus
+
+
+def _add_term_stats(db: Session, question_id: UUID, terms, weights):
+    """Increment document frequency and weight sum of each term in one statement."""
+    statement = dialect_insert(db, QuestionTerm)
+    if statement is None:
+        for term, weight in zip(terms, weights):
+            row = db.get(QuestionTerm, (question_id, term))
+            if row is None:
+                db.add(QuestionTerm(question_id=question_id, term=term, doc_freq=1, weight_sum=weight))
+            else:
+                row.doc_freq += 1
+                row.weight_sum += weight
+        return
+
+    statement = statement.values([
+        {"question_id": question_id, "term": term, "doc_freq": 1, "weight_sum": weight}
+        for term, weight in zip(terms, weights)
+    ])
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[QuestionTerm.question_id, QuestionTerm.term],
+        set_={
+            "doc_freq": QuestionTerm.doc_freq + statement.excluded.doc_freq,
+            "weight_sum": QuestionTerm.weight_sum + statement.excluded.weight_sum
+        }
+    ))
+
+
+def _term_stats(db: Session, question_id: UUID, terms) -> Dict[int, Tuple[int, float]]:
+    """(doc_freq, weight_sum) of the given terms in the question's corpus."""
+    rows = db.query(QuestionTerm.term, QuestionTerm.doc_freq, QuestionTerm.weight_sum).filter(
+        QuestionTerm.question_id == question_id,
+        QuestionTerm.term.in_(list(terms))
+    ).all()
+    return {term: (doc_freq, weight_sum) for term, doc_freq, weight_sum in rows}
+
+
+def _neighbor_vectors(db: Session, answer_attempt_id: UUID, question_id: UUID, user_id: UUID) -> List[bytes]:
+    """
+    Vectors of the other students' answers compared with this one: those
+    sharing an LSH bucket with it and the most recent ones.
+    """
+    own = aliased(AnswerLSHBucket)
+    other = aliased(AnswerLSHBucket)
+    lsh_candidate_ids = db.query(other.answer_attempt_id).join(
+        own, and_(
+            own.question_id == other.question_id,
+            own.band == other.band,
+            own.bucket == other.bucket
+        )
+    ).filter(
+        own.answer_attempt_id == answer_attempt_id,
+        other.answer_attempt_id != answer_attempt_id
+    )
+    lsh_neighbors = db.query(AnswerVector.answer_attempt_id, AnswerVector.vector).filter(
+        AnswerVector.answer_attempt_id.in_(lsh_candidate_ids),
+        AnswerVector.question_id == question_id,
+        AnswerVector.user_id != user_id
+    ).all()
+    recent_neighbors = db.query(AnswerVector.answer_attempt_id, AnswerVector.vector).filter(
+        AnswerVector.question_id == question_id,
+        AnswerVector.user_id != user_id
+    ).order_by(AnswerVector.created_at.desc()).limit(ORIGINALITY_NEIGHBOR_WINDOW).all()
+
+    vectors = {row.answer_attempt_id: row.vector for row in lsh_neighbors}
+    vectors.update((row.answer_attempt_id, row.vector) for row in recent_neighbors)
+    return list(vectors.values())
+
+
+def record_vector_counts(db: Session, answer_attempt_id: UUID, question_id: UUID,
+                         user_id: UUID, counts: Dict[int, int]) -> Optional[AnswerVector]:
+    """
+    Vectorize an answer from its term counts, measure it against the
+    question's earlier answers and add it to the question's statistics.
+    Record the answer's signature first, so its LSH candidates are compared.
+    Does not check for an existing vector; does not commit.
+    """
+    if not counts:
+        return None
+
+    # Sessions don't autoflush; make answers recorded earlier in this transaction visible
+    db.flush()
+
+    # Measure against the corpus as it is now, without locking it
+    corpus = db.query(QuestionCorpus.doc_count, QuestionCorpus.centroid_norm_sq).filter(
+        QuestionCorpus.question_id == question_id
+    ).first()
+    doc_count, centroid_norm_sq = corpus if corpus is not None else (0, 0.0)
+    term_stats = _term_stats(db, question_id, counts)
+    doc_freqs = {term: doc_freq for term, (doc_freq, _) in term_stats.items()}
+
+    vector = tfidf_vector(counts, doc_freqs, doc_count)
+    terms, weights = vector
+
+    # Centroid cosine from this answer's terms only
+    centroid_dot = sum(weight * term_stats.get(term, (0, 0.0))[1] for term, weight in zip(terms, weights))
+    centroid_similarity = centroid_dot / math.sqrt(centroid_norm_sq) if centroid_norm_sq > 0 else 0.0
+
+    top_similarities = sorted(
+        similarities(vector, _neighbor_vectors(db, answer_attempt_id, question_id, user_id)), reverse=True
+    )[:ORIGINALITY_TOP_K]
+
+    vector_row = AnswerVector(
+        answer_attempt_id=answer_attempt_id,
+        question_id=question_id,
+        user_id=user_id,
+        vector=vector_to_bytes(vector),
+        corpus_size=doc_count,
+        centroid_similarity=round(min(1.0, max(0.0, centroid_similarity)), 4),
+        nearest_similarity=round(min(1.0, top_similarities[0]), 4) if top_similarities else 0.0,
+        top_similarities=[round(min(1.0, similarity), 4) for similarity in top_similarities]
+    )
+    db.add(vector_row)
+
+    # Add the answer under the lock; the centroid may have moved since it was
+    # read, so the norm update re-reads the answer's term weight sums
+    corpus = _locked_corpus(db, question_id)
+    centroid = _term_stats(db, question_id, terms)
+    locked_dot = sum(weight * centroid.get(term, (0, 0.0))[1] for term, weight in zip(terms, weights))
+    corpus.centroid_norm_sq += 2 * locked_dot + sum(weight * weight for weight in weights)
+    corpus.doc_count += 1
+    _add_term_stats(db, question_id, terms, weights)
+    return vector_row
+
+
+def record_answer_vector(db: Session, answer_attempt: AnswerAttempt,
+                         features: Optional[TextFeatures] = None) -> Optional[AnswerVector]:
+    """
+    Vectorize the answer and add it to its question's corpus, once.
+    Returns the vector row (existing or new), or None for an empty answer.
+    Does not commit.
+    """
+    if not answer_attempt.answer_text:
+        return None
+
+    existing = db.get(AnswerVector, answer_attempt.id)
+    if existing is not None:
+        return existing
+
+    features = features or TextFeatures(answer_attempt.answer_text)
+    return record_vector_counts(
+        db,
+        answer_attempt.id,
+        answer_attempt.question_id,
+        answer_attempt.assessment_attempt.user_id,
+        term_counts(features.lower)
+    )
+
+
+def originality_from_vector(vector_row: Optional[AnswerVector]) -> Dict[str, any]:
+    """Originality result of a recorded answer vector (or of an unscorable answer)."""
+    if vector_row is None:
+        return {
+            "corpus_size": 0,
+            "centroid_similarity": 0.0,
+            "nearest_similarity": 0.0,
+            "top_similarities": [],
+            "tfidf_originality": 100,
+            "is_derivative": False
+        }
+
+    return {
+        "corpus_size": vector_row.corpus_size,
+        "centroid_similarity": vector_row.centroid_similarity,
+        "nearest_similarity": vector_row.nearest_similarity,
+        "top_similarities": list(vector_row.top_similarities or []),
+        "tfidf_originality": round(100 * (1 - vector_row.nearest_similarity)),
+        "is_derivative": (
+            vector_row.corpus_size >= MIN_ORIGINALITY_CORPUS and
+            vector_row.nearest_similarity >= DERIVATIVE_SIMILARITY_THRESHOLD
+        )
+    }
+
+
+def analyze_originality(db: Session, answer_attempt: AnswerAttempt,
+                        features: Optional[TextFeatures] = None) -> Dict[str, any]:
+    """
+    TF-IDF originality of one answer against earlier answers to its question.
+    Records the answer's vector if needed; the caller commits.
+    """
+    return originality_from_vector(record_answer_vector(db, answer_attempt, features))
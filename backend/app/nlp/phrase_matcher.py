@@ -0,0 +1,185 @@
+"""
+Phrase Matcher Module
+
+Single-pass multi-phrase matching for detect_generic_phrasing.
+
+The generic-phrase lexicon lives in app/data/generic_phrases.json so it can
+grow to thousands of institution-specific boilerplate and AI-tell phrases.
+Instead of one re.search per phrase, the whole lexicon is compiled into ONE
+trie-shaped regex wrapped in a lookahead, which the C regex engine runs
+over the text once:
+- at each position, at most one trie branch can match the next character,
+  so the cost per position depends on phrase length, not lexicon size
+- the lookahead returns the longest phrase starting at each position; every
+  shorter phrase starting there is a prefix of it and is looked up from a
+  precomputed table, so overlapping matches are all reported
+
+The lexicon file is re-read automatically when its modification time
+changes (checked at most every LEXICON_RELOAD_CHECK_SECONDS).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LEXICON_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "generic_phrases.json"
+))
+
+LEXICON_RELOAD_CHECK_SECONDS = 5.0
+
+# Used only if the lexicon file is missing or invalid at startup
+DEFAULT_GENERIC_PHRASES = [
+    "in conclusion",
+    "to sum up",
+    "in summary",
+    "it is important to note",
+    "it should be noted",
+    "as mentioned earlier",
+    "furthermore",
+    "moreover",
+    "additionally",
+    "on the other hand",
+    "in other words",
+    "that being said",
+    "first and foremost",
+    "last but not least",
+    "it goes without saying",
+    "needless to say",
+    "at the end of the day",
+    "when all is said and done",
+    "the bottom line is",
+    "to put it simply"
+]
+
+
+class PhraseMatcher:
+    """Compiled single-scan matcher for a fixed list of lowercase phrases."""
+
+    __slots__ = ("phrases", "fingerprint", "_pattern", "_prefix_phrases")
+
+    def __init__(self, phrases: List[str]):
+        # Lowercase, drop blanks and duplicates, keep lexicon order
+        self.phrases = list(dict.fromkeys(p.lower() for p in phrases if p and p.strip()))
+        # Identifies the lexicon content, e.g. for invalidating cached results
+        self.fingerprint = hashlib.sha256("\n".join(self.phrases).encode("utf-8")).hexdigest()[:16]
+
+        trie: Dict = {}
+        for phrase in self.phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[""] = phrase  # terminal marker
+
+        # For each phrase, the lexicon phrases that are prefixes of it (itself included)
+        self._prefix_phrases: Dict[str, List[str]] = {}
+        for phrase in self.phrases:
+            node, found = trie, []
+            for char in phrase:
+                node = node[char]
+                if "" in node:
+                    found.append(node[""])
+            self._prefix_phrases[phrase] = found
+
+        self._pattern = re.compile("(?=(" + self._trie_regex(trie) + "))") if self.phrases else None
+
+    @classmethod
+    def _trie_regex(cls, node: Dict) -> str:
+        branches = [
+            re.escape(char) + cls._trie_regex(child)
+            for char, child in node.items() if char != ""
+        ]
+        if not branches:
+            return ""
+
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Phrase may end here; greedily prefer a longer phrase
+            return "(?:" + body + ")?"
+        return body
+
+    def find_all(self, text_lower: str) -> Dict[str, Dict[str, any]]:
+        """
+        Every lexicon phrase occurring in the (already lowercased) text, with
+        its count and start offsets, in lexicon order.
+        """
+        if self._pattern is None:
+            return {}
+
+        matches: Dict[str, Dict[str, any]] = {}
+        for match in self._pattern.finditer(text_lower):
+            start = match.start()
+            for phrase in self._prefix_phrases[match.group(1)]:
+                entry = matches.get(phrase)
+                if entry is None:
+                    matches[phrase] = {"count": 1, "offsets": [start]}
+                else:
+                    entry["count"] += 1
+                    entry["offsets"].append(start)
+
+        return {phrase: matches[phrase] for phrase in self.phrases if phrase in matches}
+
+
+def load_lexicon(path: str = LEXICON_PATH) -> List[str]:
+    """Read the generic-phrase list from the lexicon JSON file."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    phrases = data.get("generic_phrases", [])
+    if not isinstance(phrases, list):
+        raise ValueError("generic_phrases must be a list of strings")
+    return [str(p) for p in phrases]
+
+
+_lock = threading.Lock()
+_matcher: Optional[PhraseMatcher] = None
+_lexicon_mtime: Optional[float] = None
+_last_check = 0.0
+
+
+def _reload_if_changed(force: bool = False):
+    global _matcher, _lexicon_mtime, _last_check
+    _last_check = time.monotonic()
+
+    try:
+        mtime = os.path.getmtime(LEXICON_PATH)
+    except OSError:
+        mtime = None
+
+    if not force and mtime == _lexicon_mtime and _matcher is not None:
+        return
+
+    try:
+        matcher = PhraseMatcher(load_lexicon())
+        logger.info(f"Loaded {len(matcher.phrases)} generic phrases from {LEXICON_PATH}")
+    except (OSError, ValueError) as e:
+        if _matcher is not None:
+            logger.error(f"Could not reload generic phrase lexicon, keeping previous one: {str(e)}")
+            _lexicon_mtime = mtime
+            return
+        logger.warning(f"Generic phrase lexicon unavailable, using defaults: {str(e)}")
+        matcher = PhraseMatcher(DEFAULT_GENERIC_PHRASES)
+
+    # Swap in the new matcher in one assignment; readers never see a partial build
+    _matcher = matcher
+    _lexicon_mtime = mtime
+
+
+def get_generic_phrase_matcher() -> PhraseMatcher:
+    """Current matcher, rebuilt if the lexicon file changed since the last check."""
+    if _matcher is None or time.monotonic() - _last_check >= LEXICON_RELOAD_CHECK_SECONDS:
+        with _lock:
+            if _matcher is None or time.monotonic() - _last_check >= LEXICON_RELOAD_CHECK_SECONDS:
+                _reload_if_changed()
+    return _matcher
+
+
+# Compile once at import
+with _lock:
+    _reload_if_changed(force=True)
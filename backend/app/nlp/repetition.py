@@ -0,0 +1,169 @@
+"""
+Repetition Engine Module
+
+Finds near-duplicate 3-word phrases for analyze_repetition without scoring
+every pair of phrases in Python.
+
+How it works (all LOCAL, no external APIs):
+1. Blocking - every phrase is indexed by its character bigrams. Two phrases
+   can only reach a fuzz.ratio of 80 if their lengths are within 2:3 of each
+   other and they share at least (len1 + len2 - 5) / 5 bigrams (q-gram
+   lemma for insert/delete edits), so every other pair is skipped without
+   being scored. The filter is exact: it never drops a pair the old
+   pairwise loop would have reported.
+2. Scoring - the surviving candidate pairs are scored in a single vectorized
+   rapidfuzz call with score_cutoff=80.
+3. Work cap - at most MAX_FUZZY_PHRASES distinct phrases take part in fuzzy
+   matching, and rows are processed in blocks so the search stops as soon
+   as enough similar pairs have been found.
+"""
+
+from typing import Dict, List, Tuple
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Phrases must be MORE than this similar to count as near-duplicates
+SIMILARITY_THRESHOLD = 80
+
+# Upper bound on distinct phrases compared per answer (~4000 words)
+MAX_FUZZY_PHRASES = 4000
+
+# Rows of the candidate matrix processed per block
+BLOCK_SIZE = 256
+
+# Below this many phrases the plain loop beats building the index
+PAIRWISE_MAX_PHRASES = 64
+
+
+def find_similar_pairs_pairwise(phrases: List[str], limit: int) -> List[Dict[str, any]]:
+    """
+    Reference engine: score every pair of phrases with fuzz.ratio.
+    O(n^2) Python-level calls; kept for benchmarking and as a fallback
+    when NumPy is not installed.
+    """
+    similar_pairs = []
+
+    for i in range(len(phrases)):
+        for j in range(i + 1, len(phrases)):
+            similarity = fuzz.ratio(phrases[i], phrases[j])
+            if similarity > SIMILARITY_THRESHOLD:
+                similar_pairs.append({
+                    "phrase1": phrases[i],
+                    "phrase2": phrases[j],
+                    "similarity": similarity
+                })
+                if len(similar_pairs) >= limit:
+                    return similar_pairs
+
+    return similar_pairs
+
+
+def _bigram_layers(phrases: List[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Build the bigram index as stacked 0/1 matrices.
+
+    Layer k marks phrases containing a bigram at least k+1 times, so the
+    multiset overlap sum(min(count_a, count_b)) of two phrases is the sum
+    of their row dot products over all layers.
+    """
+    vocabulary = {}
+    postings = []  # (phrase index, bigram index, occurrence number)
+
+    for row, phrase in enumerate(phrases):
+        seen = {}
+        for k in range(len(phrase) - 1):
+            column = vocabulary.setdefault(phrase[k:k + 2], len(vocabulary))
+            occurrence = seen.get(column, 0)
+            seen[column] = occurrence + 1
+            postings.append((row, column, occurrence))
+
+    depth = max((p[2] for p in postings), default=0) + 1
+    layers = np.zeros((depth, len(phrases), max(1, len(vocabulary))), dtype=np.float32)
+    if postings:
+        index = np.array(postings, dtype=np.int64)
+        layers[index[:, 2], index[:, 0], index[:, 1]] = 1.0
+
+    lengths = np.fromiter((len(p) for p in phrases), dtype=np.int64, count=len(phrases))
+    return layers, lengths
+
+
+def find_similar_pairs_indexed(phrases: List[str], limit: int) -> List[Dict[str, any]]:
+    """
+    Indexed engine: same pairs, in the same (i, j) order, as
+    find_similar_pairs_pairwise, but only candidates that survive the
+    bigram/length filter are scored.
+    """
+    phrases = phrases[:MAX_FUZZY_PHRASES]
+    n = len(phrases)
+    if n < 2 or limit <= 0:
+        return []
+
+    layers, lengths = _bigram_layers(phrases)
+    similar_pairs = []
+
+    for start in range(0, n - 1, BLOCK_SIZE):
+        stop = min(n, start + BLOCK_SIZE)
+
+        # Multiset bigram overlap of the block rows against every later phrase
+        shared = sum(layer[start:stop] @ layer[start:].T for layer in layers)
+
+        row_lengths = lengths[start:stop, None]
+        col_lengths = lengths[None, start:]
+        total = row_lengths + col_lengths
+
+        candidates = (
+            # Upper triangle only: pair (i, j) with j > i
+            (np.arange(start, n)[None, :] > np.arange(start, stop)[:, None]) &
+            # ratio >= 80 needs 2 * shorter length >= 0.8 * total length
+            (10 * np.minimum(row_lengths, col_lengths) >= 4 * total) &
+            # ...and, by the q-gram lemma, at least (total - 5) / 5 shared bigrams
+            (5 * shared >= total - 5)
+        )
+
+        rows, cols = np.nonzero(candidates)
+        if rows.size == 0:
+            continue
+        rows += start
+        cols += start
+
+        scores = process.cpdist(
+            [phrases[i] for i in rows],
+            [phrases[j] for j in cols],
+            scorer=fuzz.ratio,
+            score_cutoff=SIMILARITY_THRESHOLD,
+            dtype=np.float64
+        )
+
+        for idx in np.nonzero(scores > SIMILARITY_THRESHOLD)[0]:
+            similar_pairs.append({
+                "phrase1": phrases[rows[idx]],
+                "phrase2": phrases[cols[idx]],
+                "similarity": float(scores[idx])
+            })
+            if len(similar_pairs) >= limit:
+                return similar_pairs
+
+    return similar_pairs
+
+
+def find_similar_pairs(phrases: List[str], limit: int) -> List[Dict[str, any]]:
+    """
+    Return up to `limit` pairs of phrases that are more than 80% similar,
+    ordered as the pairwise loop would find them.
+    """
+    if not RAPIDFUZZ_AVAILABLE:
+        return []
+    if NUMPY_AVAILABLE and len(phrases) > PAIRWISE_MAX_PHRASES:
+        return find_similar_pairs_indexed(phrases, limit)
+    return find_similar_pairs_pairwise(phrases, limit)
@@ -0,0 +1,205 @@
+"""
+NLP Result Cache Module
+
+Content-addressed cache of writing-pattern analysis results.
+
+The frontend and students re-trigger /nlp/analyze for unchanged answers,
+and every call used to rerun all text analyzers. Results are now keyed by:
+- text hash: sha256 of the answer text exactly as the analyzers read it
+  (char counts and sentence offsets depend on every character, so no
+  normalization beyond None -> "" is safe)
+- analyzer version: bumped when analyzer logic changes, combined with the
+  generic-phrase lexicon fingerprint so a lexicon reload invalidates too
+- baseline fingerprint: the style-profile baseline used for quality jumps
+
+Two tiers:
+- in-process LRU bounded by NLP_CACHE_MAX_ENTRIES and NLP_CACHE_TTL_SECONDS
+- nlp_result_cache table, shared by API and worker processes and restarts
+
+Identical keys always map to identical results, so entries are never
+updated; a new analyzer version simply stops reading the old rows.
+Rows nobody reads any more (older analyzer versions or lexicons, replaced
+style baselines) are deleted by prune_result_cache: rows of other
+analyzer versions, and every row older than NLP_CACHE_DB_TTL_DAYS. The API
+runs it every NLP_CACHE_PRUNE_INTERVAL_SECONDS (app/utils/background_jobs.py);
+python -m app.utils.prune_nlp_cache runs it on demand.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.db.upsert import dialect_insert
+from app.core.config import NLP_CACHE_DB_TTL_DAYS, NLP_CACHE_ENABLED, NLP_CACHE_MAX_ENTRIES, NLP_CACHE_TTL_SECONDS
+from app.models.nlp_result_cache import NLPResultCache
+
+# Rows per DELETE ... IN when pruning (one transaction each)
+PRUNE_CHUNK_SIZE = 900
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple]" = OrderedDict()  # cache_key -> (stored_at, result)
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "size_evictions": 0,
+    "ttl_evictions": 0
+}
+
+
+def text_hash(answer_text: Optional[str]) -> str:
+    return hashlib.sha256((answer_text or "").encode("utf-8")).hexdigest()
+
+
+def make_key(answer_text: Optional[str], analyzer_version: str, baseline_fingerprint: str) -> Dict[str, str]:
+    """Cache key parts plus the combined cache_key."""
+    parts = {
+        "text_hash": text_hash(answer_text),
+        "analyzer_version": analyzer_version,
+        "baseline_fingerprint": baseline_fingerprint
+    }
+    combined = "\x00".join([parts["text_hash"], analyzer_version, baseline_fingerprint])
+    parts["cache_key"] = hashlib.sha256(combined.encode("utf-8")).hexdigest()
+    return parts
+
+
+def _memory_get(cache_key: str) -> Optional[Dict]:
+    """LRU lookup; expired entries are dropped. Caller holds _lock."""
+    entry = _entries.get(cache_key)
+    if entry is None:
+        return None
+    stored_at, result = entry
+    if time.monotonic() - stored_at > NLP_CACHE_TTL_SECONDS:
+        del _entries[cache_key]
+        _stats["ttl_evictions"] += 1
+        return None
+    _entries.move_to_end(cache_key)
+    return result
+
+
+def _memory_put(cache_key: str, result: Dict):
+    """Insert into the LRU, evicting the least recently used entries. Caller holds _lock."""
+    _entries[cache_key] = (time.monotonic(), result)
+    _entries.move_to_end(cache_key)
+    while len(_entries) > NLP_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+        _stats["size_evictions"] += 1
+
+
+def get_many(db: Session, keys: List[Dict[str, str]]) -> Dict[str, Dict]:
+    """
+    Cached results for the given keys, by cache_key: memory tier first,
+    then one query against the table for the rest. Results are copies.
+    """
+    if not NLP_CACHE_ENABLED or not keys:
+        return {}
+
+    found = {}
+    missing = []
+    with _lock:
+        for key in keys:
+            result = _memory_get(key["cache_key"])
+            if result is not None:
+                found[key["cache_key"]] = result
+                _stats["memory_hits"] += 1
+            else:
+                missing.append(key["cache_key"])
+
+    if missing:
+        rows = db.query(NLPResultCache.cache_key, NLPResultCache.result).filter(
+            NLPResultCache.cache_key.in_(set(missing))
+        ).all()
+        with _lock:
+            for cache_key, result in rows:
+                _memory_put(cache_key, result)
+                found[cache_key] = result
+            _stats["db_hits"] += sum(1 for cache_key in missing if cache_key in found)
+            _stats["misses"] += sum(1 for cache_key in missing if cache_key not in found)
+
+    return {cache_key: copy.deepcopy(result) for cache_key, result in found.items()}
+
+
+def get(db: Session, key: Dict[str, str]) -> Optional[Dict]:
+    """Cached result for one key, or None."""
+    return get_many(db, [key]).get(key["cache_key"])
+
+
+def put(db: Session, key: Dict[str, str], result: Dict):
+    """
+    Store a result in both tiers. The row is inserted in the caller's
+    transaction; a concurrent insert of the same key is ignored, since
+    equal keys always hold equal results.
+    """
+    if not NLP_CACHE_ENABLED:
+        return
+
+    with _lock:
+        _memory_put(key["cache_key"], copy.deepcopy(result))
+        _stats["stores"] += 1
+
+    values = dict(key, result=result)
+    statement = dialect_insert(db, NLPResultCache)
+    if statement is None:
+        if db.get(NLPResultCache, key["cache_key"]) is None:
+            db.add(NLPResultCache(**values))
+        return
+    db.execute(statement.values(**values).on_conflict_do_nothing())
+
+
+def prune_result_cache(db: Session, current_versions: Iterable[str],
+                       max_age_days: int = NLP_CACHE_DB_TTL_DAYS) -> int:
+    """
+    Delete the table rows of analyzer versions other than current_versions,
+    and every row older than max_age_days (stale style baselines, texts not
+    analyzed again). Commits every PRUNE_CHUNK_SIZE rows. Returns the rows deleted.
+    """
+    current_versions = set(current_versions)
+    # The distinct versions come from the analyzer_version index; only stale ones are deleted by version
+    stale_versions = [
+        version for (version,) in db.query(NLPResultCache.analyzer_version).distinct()
+        if version not in current_versions
+    ]
+    expired = NLPResultCache.created_at < datetime.utcnow() - timedelta(days=max_age_days)
+    criteria = or_(expired, NLPResultCache.analyzer_version.in_(stale_versions)) if stale_versions else expired
+
+    deleted = 0
+    while True:
+        keys = [key for (key,) in db.query(NLPResultCache.cache_key).filter(criteria).limit(PRUNE_CHUNK_SIZE)]
+        if not keys:
+            return deleted
+        db.query(NLPResultCache).filter(NLPResultCache.cache_key.in_(keys)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(keys)
+
+
+def get_cache_stats(db: Optional[Session] = None) -> Dict[str, any]:
+    """
+    Hit/miss/eviction counters and current size of the in-process tier,
+    plus the table's row count when a session is given.
+    """
+    db_entries = db.query(func.count(NLPResultCache.cache_key)).scalar() if db is not None else None
+    with _lock:
+        lookups = _stats["memory_hits"] + _stats["db_hits"] + _stats["misses"]
+        hits = _stats["memory_hits"] + _stats["db_hits"]
+        return {
+            "enabled": NLP_CACHE_ENABLED,
+            "entries": len(_entries),
+            "db_entries": db_entries,
+            "max_entries": NLP_CACHE_MAX_ENTRIES,
+            "ttl_seconds": NLP_CACHE_TTL_SECONDS,
+            "lookups": lookups,
+            "memory_hits": _stats["memory_hits"],
+            "db_hits": _stats["db_hits"],
+            "misses": _stats["misses"],
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": _stats["stores"],
+            "size_evictions": _stats["size_evictions"],
+            "ttl_evictions": _stats["ttl_evictions"]
+        }
+
@@ -0,0 +1,280 @@
+"""
+Shadow Scoring Module
+
+Compares the current risk scoring with a candidate before its thresholds
+ship: how many risk flags flip, how far the scores move, how much feedback
+changes.
+
+A candidate is a Python module (given by its import path) defining
+calculate_risk_score and/or generate_feedback_text with the same
+signatures as in nlp_service; a function it does not define is the current
+one. A candidate usually wraps the current function, e.g. to move a risk
+flag threshold. Both configurations score the same writing, behavior,
+collusion and originality analyses, so only the scoring differs.
+
+Two ways to run it, neither of which writes anything:
+- replay: python -m app.utils.shadow_replay --candidate <module> streams
+  every stored answer through both configurations
+- live: with NLP_SHADOW_CANDIDATE set, a NLP_SHADOW_SAMPLE_RATE fraction of
+  POST /nlp/analyze requests also score their analyses with the candidate
+  on a background thread after the response is built (the request only
+  pays for a random draw and a queue put). Results are per process, at
+  GET /nlp/shadow/stats. When MAX_PENDING comparisons are queued, new
+  samples are dropped rather than queued.
+"""
+
+import importlib
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+from uuid import UUID
+from app.core.config import NLP_SHADOW_CANDIDATE, NLP_SHADOW_SAMPLE_RATE
+from app.nlp import nlp_service
+from app.nlp.stage_timing import stage
+
+logger = logging.getLogger(__name__)
+
+RISK_FLAGS = ("none", "low", "medium", "high")
+SCORING_FUNCTIONS = ("calculate_risk_score", "generate_feedback_text")
+
+# Flipped answers listed per report, and live comparisons waiting at most
+MAX_EXAMPLES = 20
+MAX_PENDING = 1000
+
+
+@lru_cache(maxsize=None)
+def load_candidate(module_path: str) -> Dict[str, Callable]:
+    """
+    Scoring functions of a candidate module, falling back to the current
+    ones. Raises ValueError if the module overrides none of them.
+    """
+    module = importlib.import_module(module_path)
+    overridden = [name for name in SCORING_FUNCTIONS if callable(getattr(module, name, None))]
+    if not overridden:
+        raise ValueError(f"Candidate {module_path} defines none of {', '.join(SCORING_FUNCTIONS)}")
+    return {name: getattr(module if name in overridden else nlp_service, name) for name in SCORING_FUNCTIONS}
+
+
+def current_scoring() -> Dict[str, Callable]:
+    """The scoring functions analyze_answer_attempt uses."""
+    return {name: getattr(nlp_service, name) for name in SCORING_FUNCTIONS}
+
+
+def score(scoring: Dict[str, Callable], label: str, writing_analysis: Dict, behavior_analysis: Dict,
+          collusion_analysis: Dict, originality_analysis: Dict) -> Tuple[Dict, Optional[str]]:
+    """(risk score, feedback text) of one configuration, timed as risk_score:<label> / feedback:<label>."""
+    with stage(f"risk_score:{label}"):
+        risk_score = scoring["calculate_risk_score"](
+            writing_analysis, behavior_analysis, collusion_analysis, originality_analysis
+        )
+    feedback_text = None
+    if risk_score["risk_flag"] in ["medium", "high"]:
+        with stage(f"feedback:{label}"):
+            feedback_text = scoring["generate_feedback_text"](
+                risk_score, writing_analysis, behavior_analysis, collusion_analysis, originality_analysis
+            )
+    return risk_score, feedback_text
+
+
+def _delta_distribution(deltas: Counter) -> Dict[str, any]:
+    """Summary of a Counter of integer score deltas (candidate minus current)."""
+    count = sum(deltas.values())
+    if not count:
+        return {"count": 0, "changed": 0, "mean": 0.0, "min": 0, "max": 0,
+                "p5": 0, "p50": 0, "p95": 0, "histogram": {}}
+    ordered = sorted(deltas.items())
+    quantiles = {}
+    for name, q in (("p5", 0.05), ("p50", 0.5), ("p95", 0.95)):
+        rank = max(1, round(q * count))
+        seen = 0
+        for delta, delta_count in ordered:
+            seen += delta_count
+            if seen >= rank:
+                quantiles[name] = delta
+                break
+    return {
+        "count": count,
+        "changed": count - deltas.get(0, 0),
+        "mean": round(sum(delta * delta_count for delta, delta_count in ordered) / count, 3),
+        "min": ordered[0][0],
+        "max": ordered[-1][0],
+        **quantiles,
+        "histogram": {str(delta): delta_count for delta, delta_count in ordered}
+    }
+
+
+class ShadowComparison:
+    """
+    Current-versus-candidate outcomes of any number of answers: flag
+    transitions, exact score-delta counts and feedback changes. Comparisons
+    of separate chunks or processes are combined with merge().
+    """
+
+    def __init__(self):
+        self.transitions: Counter = Counter()  # (current flag, candidate flag) -> answers
+        self.originality_deltas: Counter = Counter()
+        self.confidence_deltas: Counter = Counter()
+        self.feedback = {"added": 0, "removed": 0, "changed": 0}
+        self.examples = []
+
+    def add(self, answer_attempt_id: UUID, current: Tuple[Dict, Optional[str]],
+            candidate: Tuple[Dict, Optional[str]]):
+        (current_risk, current_feedback), (candidate_risk, candidate_feedback) = current, candidate
+        self.transitions[(current_risk["risk_flag"], candidate_risk["risk_flag"])] += 1
+        self.originality_deltas[candidate_risk["originality_score"] - current_risk["originality_score"]] += 1
+        self.confidence_deltas[candidate_risk["confidence_score"] - current_risk["confidence_score"]] += 1
+
+        if current_feedback is None and candidate_feedback is not None:
+            self.feedback["added"] += 1
+        elif current_feedback is not None and candidate_feedback is None:
+            self.feedback["removed"] += 1
+        elif current_feedback != candidate_feedback:
+            self.feedback["changed"] += 1
+
+        if current_risk["risk_flag"] != candidate_risk["risk_flag"] and len(self.examples) < MAX_EXAMPLES:
+            self.examples.append({
+                "answer_attempt_id": str(answer_attempt_id),
+                "current": current_risk["risk_flag"],
+                "candidate": candidate_risk["risk_flag"]
+            })
+
+    def merge(self, other: "ShadowComparison"):
+        self.transitions.update(other.transitions)
+        self.originality_deltas.update(other.originality_deltas)
+        self.confidence_deltas.update(other.confidence_deltas)
+        for key, count in other.feedback.items():
+            self.feedback[key] += count
+        self.examples.extend(other.examples[:MAX_EXAMPLES - len(self.examples)])
+
+    def report(self) -> Dict[str, any]:
+        """
+        answers, flipped (flag changed), escalated / deescalated, the full
+        transition matrix (current flag -> candidate flag -> answers), score
+        delta distributions, feedback changes and example flipped answers.
+        """
+        rank = {flag: index for index, flag in enumerate(RISK_FLAGS)}
+        escalated = deescalated = 0
+        for (current, candidate), count in self.transitions.items():
+            if rank[candidate] > rank[current]:
+                escalated += count
+            elif rank[candidate] < rank[current]:
+                deescalated += count
+        return {
+            "answers": sum(self.transitions.values()),
+            "flipped": escalated + deescalated,
+            "escalated": escalated,
+            "deescalated": deescalated,
+            "flag_transitions": {
+                current: {candidate: self.transitions.get((current, candidate), 0) for candidate in RISK_FLAGS}
+                for current in RISK_FLAGS
+            },
+            "score_deltas": {
+                "originality": _delta_distribution(self.originality_deltas),
+                "confidence": _delta_distribution(self.confidence_deltas)
+            },
+            "feedback": dict(self.feedback),
+            "examples": list(self.examples)
+        }
+
+
+# ---------------------------------------------------------------------------
+# Live shadow mode
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_comparison = ShadowComparison()
+_stats = {"sampled": 0, "completed": 0, "dropped": 0, "failed": 0, "pending": 0, "shadow_ms_total": 0.0}
+_candidate_error: Optional[str] = None
+
+
+def _live_candidate() -> Optional[Dict[str, Callable]]:
+    """The configured candidate, or None if there is none or it does not load (logged once)."""
+    global _candidate_error
+    if not NLP_SHADOW_CANDIDATE or _candidate_error is not None:
+        return None
+    try:
+        return load_candidate(NLP_SHADOW_CANDIDATE)
+    except Exception as e:
+        _candidate_error = str(e)
+        logger.error(f"Shadow scoring disabled, candidate {NLP_SHADOW_CANDIDATE} failed to load: {_candidate_error}")
+        return None
+
+
+def _run_shadow(answer_attempt_id: UUID, analysis_result: Dict[str, any], candidate: Dict[str, Callable]):
+    started = time.perf_counter()
+    analyses = (
+        analysis_result["writing_analysis"],
+        analysis_result["behavior_analysis"],
+        analysis_result["collusion_analysis"],
+        analysis_result["originality_analysis"]
+    )
+    try:
+        current = score(current_scoring(), "current", *analyses)
+        shadow = score(candidate, "candidate", *analyses)
+    except Exception as e:
+        with _lock:
+            _stats["pending"] -= 1
+            _stats["failed"] += 1
+        logger.error(f"Shadow scoring failed for {answer_attempt_id}: {str(e)}")
+        return
+    with _lock:
+        _stats["pending"] -= 1
+        _stats["completed"] += 1
+        _stats["shadow_ms_total"] += (time.perf_counter() - started) * 1000
+        _comparison.add(answer_attempt_id, current, shadow)
+
+
+def submit_shadow(answer_attempt_id: UUID, analysis_result: Dict[str, any]) -> bool:
+    """
+    Sample an analysis for candidate scoring in the background.
+    Returns True if it was queued. The analyses are only read, never modified.
+    """
+    global _executor
+    if NLP_SHADOW_SAMPLE_RATE <= 0 or random.random() >= NLP_SHADOW_SAMPLE_RATE:
+        return False
+    candidate = _live_candidate()
+    if candidate is None:
+        return False
+
+    with _lock:
+        _stats["sampled"] += 1
+        if _stats["pending"] >= MAX_PENDING:
+            _stats["dropped"] += 1
+            return False
+        _stats["pending"] += 1
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlp-shadow")
+        _executor.submit(_run_shadow, answer_attempt_id, analysis_result, candidate)
+    return True
+
+
+def get_shadow_stats() -> Dict[str, any]:
+    """Sampling counters and the comparison report of this process since startup."""
+    with _lock:
+        return {
+            "enabled": bool(NLP_SHADOW_CANDIDATE) and NLP_SHADOW_SAMPLE_RATE > 0 and _candidate_error is None,
+            "candidate": NLP_SHADOW_CANDIDATE or None,
+            "candidate_error": _candidate_error,
+            "sample_rate": NLP_SHADOW_SAMPLE_RATE,
+            "sampled": _stats["sampled"],
+            "completed": _stats["completed"],
+            "dropped": _stats["dropped"],
+            "failed": _stats["failed"],
+            "pending": _stats["pending"],
+            "avg_shadow_ms": round(_stats["shadow_ms_total"] / _stats["completed"], 3) if _stats["completed"] else 0.0,
+            "comparison": _comparison.report()
+        }
+
+
+def shutdown_shadow():
+    """Stop the shadow thread, dropping comparisons still queued."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
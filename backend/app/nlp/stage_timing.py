@@ -0,0 +1,188 @@
+"""
+Stage Timing Module
+
+Per-stage wall and CPU time of the NLP analysis (NLP_STAGE_TIMING_ENABLED=true).
+
+- stage(name) wraps one stage of analyze_answer_attempt / analyze_writing_pattern
+  (loading, each writing analyzer, collusion, originality, feedback, commit, ...).
+  When timing is disabled it returns a shared no-op context manager, so an
+  instrumented stage costs one flag check.
+- record() collects the stages run by one request (held in a ContextVar, so
+  concurrent requests in the threadpool don't mix); the NLP routes send them
+  as a Server-Timing header and in details["timings"].
+- Every timed stage also goes into a per-stage histogram with fixed
+  log-spaced buckets (GET /nlp/timing/stats). Histograms are per process:
+  background pipeline workers keep their own.
+
+Offline tools (python -m app.utils.shadow_replay) call enable_stage_timing()
+to time every stage regardless of the setting.
+
+CPU time is the thread's (time.thread_time), so work done by other requests
+in the meantime is not counted; wall minus CPU is time spent waiting, mostly
+on the database.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from app.core.config import NLP_STAGE_TIMING_ENABLED
+
+# Histogram bucket upper bounds, in ms (the last bucket is unbounded)
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class StageTimer:
+    """Stages timed during one request, aggregated by name in first-run order."""
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # name -> [wall_ms, cpu_ms, count]
+
+    def add(self, name: str, wall_ms: float, cpu_ms: float):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [wall_ms, cpu_ms, 1]
+        else:
+            entry[0] += wall_ms
+            entry[1] += cpu_ms
+            entry[2] += 1
+
+    def as_details(self) -> List[Dict[str, any]]:
+        return [
+            {"stage": name, "wall_ms": round(wall_ms, 3), "cpu_ms": round(cpu_ms, 3), "count": count}
+            for name, (wall_ms, cpu_ms, count) in self.stages.items()
+        ]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: wall time as dur, CPU time in desc."""
+        return ", ".join(
+            f'{name};dur={wall_ms:.3f};desc="cpu {cpu_ms:.3f}ms"'
+            for name, (wall_ms, cpu_ms, _) in self.stages.items()
+        )
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        index = 0
+        while index < len(BUCKET_BOUNDS_MS) and value_ms > BUCKET_BOUNDS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile_ms(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max_ms for the last bucket)."""
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+
+_enabled = NLP_STAGE_TIMING_ENABLED
+_current: ContextVar[Optional[StageTimer]] = ContextVar("nlp_stage_timer", default=None)
+_lock = threading.Lock()
+_histograms: Dict[str, Dict[str, _Histogram]] = {}  # stage -> {"wall": ..., "cpu": ...}
+
+
+class _Stage:
+    __slots__ = ("name", "wall_start", "cpu_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_ms = (time.perf_counter() - self.wall_start) * 1000
+        cpu_ms = (time.thread_time() - self.cpu_start) * 1000
+        timer = _current.get()
+        if timer is not None:
+            timer.add(self.name, wall_ms, cpu_ms)
+        with _lock:
+            histograms = _histograms.get(self.name)
+            if histograms is None:
+                histograms = _histograms[self.name] = {"wall": _Histogram(), "cpu": _Histogram()}
+            histograms["wall"].observe(wall_ms)
+            histograms["cpu"].observe(cpu_ms)
+        return False
+
+
+class _NoOpStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoOpStage()
+
+
+def stage(name: str):
+    """Context manager timing one analysis stage (a no-op when timing is disabled)."""
+    if not _enabled:
+        return _NOOP_STAGE
+    return _Stage(name)
+
+
+@contextmanager
+def record():
+    """Collect the stages timed inside the block into a StageTimer (empty when disabled)."""
+    timer = StageTimer()
+    if not _enabled:
+        yield timer
+        return
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def enable_stage_timing():
+    """Time every stage in this process from now on, whatever NLP_STAGE_TIMING_ENABLED says."""
+    global _enabled
+    _enabled = True
+
+
+def get_timing_stats() -> Dict[str, any]:
+    """Per-stage wall/CPU histograms of this process since startup."""
+    with _lock:
+        stages = {}
+        for name, histograms in _histograms.items():
+            stages[name] = {}
+            for kind, histogram in histograms.items():
+                stages[name][kind] = {
+                    "count": histogram.count,
+                    "total_ms": round(histogram.total_ms, 3),
+                    "mean_ms": round(histogram.total_ms / histogram.count, 3) if histogram.count else 0.0,
+                    "p50_ms": histogram.quantile_ms(0.5),
+                    "p95_ms": histogram.quantile_ms(0.95),
+                    "max_ms": round(histogram.max_ms, 3),
+                    "buckets": [
+                        {"le_ms": BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else None,
+                         "count": bucket_count}
+                        for index, bucket_count in enumerate(histogram.counts)
+                    ]
+                }
+    return {"enabled": _enabled, "stages": stages}
@@ -0,0 +1,250 @@
+"""
+Style Profile Module
+
+Persistent per-student stylometric baseline for quality-jump detection.
+
+Quality-jump detection used to recompute the complexity of every other
+answer in the same assessment on every call - quadratic across an
+assessment, and blind to the student's earlier assessments. Instead, each
+answer is folded ONCE into the student's StyleProfile rows (one across all
+subjects, one for the answer's subject), which keep a running mean and M2
+per metric using Welford's online algorithm:
+- folding an answer is O(1), whatever the length of the history
+- the baseline for an answer is its profile with the answer's own
+  contribution removed (also O(1)), read from its StyleSample row
+
+Metrics tracked: complexity, average word length, unique-word ratio and
+words per sentence.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.db.upsert import dialect_insert
+from app.models.answer_attempt import AnswerAttempt
+from app.models.style_profile import StyleProfile, StyleSample
+from app.nlp.text_features import TextFeatures
+
+STYLE_METRICS = ("complexity", "word_length", "unique_ratio", "words_per_sentence")
+
+
+def style_metrics(text: str, features: Optional[TextFeatures] = None) -> Dict[str, float]:
+    """
+    Style metrics of one text. complexity (0-100) combines the other three:
+    average word length, vocabulary diversity and sentence length.
+    """
+    features = features or TextFeatures(text)
+    word_count = features.word_count
+    if not word_count:
+        return {metric: 0.0 for metric in STYLE_METRICS}
+
+    word_length = features.total_word_length / word_count
+    unique_ratio = features.unique_word_count / word_count
+    sentence_count = features.sentence_count
+    words_per_sentence = word_count / sentence_count if sentence_count > 0 else word_count
+
+    complexity = (word_length * 10) + (unique_ratio * 30) + (words_per_sentence * 2)
+    return {
+        "complexity": min(100, complexity),
+        "word_length": word_length,
+        "unique_ratio": unique_ratio,
+        "words_per_sentence": words_per_sentence
+    }
+
+
+def new_profile(user_id: UUID, subject_id: Optional[UUID]) -> StyleProfile:
+    """An empty profile with every running statistic at zero."""
+    profile = StyleProfile(user_id=user_id, subject_id=subject_id, sample_count=0)
+    for metric in STYLE_METRICS:
+        setattr(profile, f"{metric}_mean", 0.0)
+        setattr(profile, f"{metric}_m2", 0.0)
+    return profile
+
+
+def fold_sample(profile: StyleProfile, metrics: Dict[str, float]):
+    """Welford update: add one answer's metrics to the profile's running statistics."""
+    profile.sample_count += 1
+    count = profile.sample_count
+    for metric in STYLE_METRICS:
+        value = metrics[metric]
+        mean = getattr(profile, f"{metric}_mean")
+        delta = value - mean
+        mean += delta / count
+        setattr(profile, f"{metric}_mean", mean)
+        setattr(profile, f"{metric}_m2", getattr(profile, f"{metric}_m2") + delta * (value - mean))
+
+
+def merge_profile(profile: StyleProfile, other: StyleProfile):
+    """Fold another profile's running statistics into this one (parallel Welford combination)."""
+    if not other.sample_count:
+        return
+    count = profile.sample_count + other.sample_count
+    for metric in STYLE_METRICS:
+        mean = getattr(profile, f"{metric}_mean")
+        delta = getattr(other, f"{metric}_mean") - mean
+        setattr(profile, f"{metric}_mean", mean + delta * other.sample_count / count)
+        setattr(profile, f"{metric}_m2", (
+            getattr(profile, f"{metric}_m2") + getattr(other, f"{metric}_m2") +
+            delta * delta * profile.sample_count * other.sample_count / count
+        ))
+    profile.sample_count = count
+
+
+def style_baseline(profile: Optional[StyleProfile],
+                   exclude: Optional[StyleSample] = None) -> Dict[str, any]:
+    """
+    Count, mean and standard deviation of each metric in the profile,
+    with the excluded sample's contribution removed (reverse Welford step).
+    The profile itself is not modified.
+    """
+    count = profile.sample_count if profile is not None else 0
+    stats = {
+        metric: (getattr(profile, f"{metric}_mean"), getattr(profile, f"{metric}_m2"))
+        for metric in STYLE_METRICS
+    } if count else {}
+
+    if exclude is not None and count:
+        remaining = count - 1
+        for metric in STYLE_METRICS:
+            mean, m2 = stats[metric]
+            value = getattr(exclude, metric)
+            if remaining:
+                previous_mean = (count * mean - value) / remaining
+                m2 = max(0.0, m2 - (value - previous_mean) * (value - mean))
+            else:
+                previous_mean, m2 = 0.0, 0.0
+            stats[metric] = (previous_mean, m2)
+        count = remaining
+
+    baseline = {"count": count}
+    for metric in STYLE_METRICS:
+        mean, m2 = stats.get(metric, (0.0, 0.0))
+        # Sample standard deviation; zero until there are two answers
+        std = (m2 / (count - 1)) ** 0.5 if count > 1 else 0.0
+        baseline[metric] = {"mean": mean if count else 0.0, "std": std}
+    return baseline
+
+
+def baseline_fingerprint(baseline: Optional[Dict[str, any]]) -> str:
+    """
+    Identifies the parts of a baseline that quality-jump detection reads,
+    so results computed against it can be cached.
+    """
+    if not baseline or not baseline["count"]:
+        return "empty"
+    complexity = baseline["complexity"]
+    raw = f"{baseline['count']}:{complexity['mean']!r}:{complexity['std']!r}:{baseline.get('scope', 'overall')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _profile_key(user_id: UUID, subject_id: Optional[UUID]) -> Tuple[UUID, Optional[UUID]]:
+    return (user_id, subject_id)
+
+
+def get_profile(db: Session, user_id: UUID, subject_id: Optional[UUID],
+                profiles: Optional[Dict] = None, create: bool = False) -> Optional[StyleProfile]:
+    """
+    The student's profile for a subject (subject_id=None: across all subjects).
+    `profiles` is an optional cache keyed by (user_id, subject_id) that batch
+    callers preload with load_profiles.
+    """
+    key = _profile_key(user_id, subject_id)
+    if profiles is not None and key in profiles:
+        profile = profiles[key]
+    else:
+        if create:
+            # Create the row first (the unique indexes make concurrent first answers
+            # insert it once), so the lock below always has a row to wait on
+            statement = dialect_insert(db, StyleProfile)
+            if statement is not None:
+                db.execute(statement.values(
+                    user_id=user_id, subject_id=subject_id, sample_count=0
+                ).on_conflict_do_nothing())
+        # Lock the row so concurrent submissions don't lose updates
+        profile = db.query(StyleProfile).filter(
+            StyleProfile.user_id == user_id,
+            StyleProfile.subject_id.is_(None) if subject_id is None else StyleProfile.subject_id == subject_id
+        ).with_for_update().first()
+
+    if profile is None and create:
+        profile = new_profile(user_id, subject_id)
+        db.add(profile)
+
+    if profiles is not None:
+        profiles[key] = profile
+    return profile
+
+
+def load_profiles(db: Session, user_ids: Iterable[UUID]) -> Dict:
+    """All profiles of the given students in one query, keyed by (user_id, subject_id)."""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    rows = db.query(StyleProfile).filter(StyleProfile.user_id.in_(user_ids)).all()
+    return {_profile_key(row.user_id, row.subject_id): row for row in rows}
+
+
+def load_samples(db: Session, answer_attempt_ids: Iterable[UUID]) -> Dict[UUID, StyleSample]:
+    """Style samples of the given answers in one query, keyed by answer attempt id."""
+    answer_attempt_ids = list(answer_attempt_ids)
+    if not answer_attempt_ids:
+        return {}
+    rows = db.query(StyleSample).filter(StyleSample.answer_attempt_id.in_(answer_attempt_ids)).all()
+    return {row.answer_attempt_id: row for row in rows}
+
+
+def record_style_sample(db: Session, answer_attempt: AnswerAttempt,
+                        features: Optional[TextFeatures] = None,
+                        profiles: Optional[Dict] = None,
+                        samples: Optional[Dict[UUID, StyleSample]] = None) -> Optional[StyleSample]:
+    """
+    Fold an answer into its student's overall and subject profiles, once.
+    Returns the answer's StyleSample (existing or new), or None for an empty answer.
+    Does not flush or commit.
+    """
+    if not answer_attempt.answer_text:
+        return None
+
+    if samples is not None:
+        sample = samples.get(answer_attempt.id)
+    else:
+        sample = db.get(StyleSample, answer_attempt.id)
+    if sample is not None:
+        return sample
+
+    assessment_attempt = answer_attempt.assessment_attempt
+    user_id = assessment_attempt.user_id
+    subject_id = assessment_attempt.subject_id
+    metrics = style_metrics(answer_attempt.answer_text, features)
+
+    sample = StyleSample(
+        answer_attempt_id=answer_attempt.id,
+        user_id=user_id,
+        subject_id=subject_id,
+        **metrics
+    )
+    db.add(sample)
+    if samples is not None:
+        samples[answer_attempt.id] = sample
+
+    for profile_subject_id in (None, subject_id):
+        profile = get_profile(db, user_id, profile_subject_id, profiles, create=True)
+        fold_sample(profile, metrics)
+
+    return sample
+
+
+def get_answer_baseline(db: Session, answer_attempt: AnswerAttempt, sample: Optional[StyleSample],
+                        per_subject: bool, profiles: Optional[Dict] = None) -> Dict[str, any]:
+    """
+    Style baseline for an answer: its student's profile (overall, or for the
+    answer's subject when per_subject) excluding the answer itself.
+    """
+    assessment_attempt = answer_attempt.assessment_attempt
+    subject_id = assessment_attempt.subject_id if per_subject else None
+    profile = get_profile(db, assessment_attempt.user_id, subject_id, profiles)
+
+    baseline = style_baseline(profile, exclude=sample)
+    baseline["scope"] = "subject" if per_subject else "overall"
+    return baseline
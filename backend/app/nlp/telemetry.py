@@ -0,0 +1,265 @@
+"""
+Telemetry Module
+
+Edit and focus events recorded while a student types an answer, for pause
+analysis based on real timestamps (see analyze_pause_behavior).
+
+Ingestion (POST /assessment/telemetry) writes one telemetry_chunks row per
+batch, never one row per event. A batch is encoded as a byte string, two
+unsigned LEB128 varints per event:
+- the time since the previous event in ms (the first event is the chunk's
+  started_ms, so its delta is 0)
+- (size << 3) | type code, size being the characters inserted, deleted or pasted
+A typical keystroke batch costs 2-3 bytes per event. A chunk is keyed by
+(assessment, question, started_ms), so a retried batch is stored once.
+
+Features are computed in a single streaming pass over an answer's chunks
+(decode_events yields events without materializing them):
+- pauses: gaps of PAUSE_MS or more between edits; idle gaps: IDLE_GAP_MS or more
+- focus losses and time away (blur until the next focus or edit)
+- bursts: insert/paste runs with gaps of at most BURST_GAP_MS adding
+  BURST_MIN_CHARS or more, i.e. text that was not typed; a burst starting
+  within RETURN_WINDOW_MS of coming back from an idle gap or another window
+  is the "left, then pasted" pattern
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.db.upsert import dialect_insert
+from app.models.telemetry import TelemetryChunk
+
+EVENT_TYPES = ("insert", "delete", "paste", "focus", "blur")
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+INSERT, DELETE, PASTE, FOCUS, BLUR = range(len(EVENT_TYPES))
+_TYPE_BITS = 3
+
+# Upper bounds on one ingestion batch
+MAX_BATCH_EVENTS = 1000
+MAX_EVENT_SIZE = 1 << 20
+
+# Gaps between edits, in ms
+PAUSE_MS = 2000
+IDLE_GAP_MS = 30000
+
+# Insertions this close together (ms) belong to one burst; bursts this large were not typed
+BURST_GAP_MS = 50
+BURST_MIN_CHARS = 20
+
+# A burst this soon (ms) after an idle gap or focus return follows an absence
+RETURN_WINDOW_MS = 10000
+
+# Copy behavior: share of inserted text arriving in bursts, and a minimum amount
+COPY_BURST_SHARE = 0.5
+COPY_MIN_BURST_CHARS = 50
+
+
+def _put_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def validate_events(events: List[Tuple[int, str, int]]):
+    """Raise ValueError unless events are (t_ms, type, size) tuples within the ingestion limits."""
+    if not events:
+        raise ValueError("No events")
+    if len(events) > MAX_BATCH_EVENTS:
+        raise ValueError(f"At most {MAX_BATCH_EVENTS} events per batch")
+    for t_ms, event_type, size in events:
+        if t_ms < 0:
+            raise ValueError("Event times must be epoch milliseconds")
+        if event_type not in EVENT_CODES:
+            raise ValueError(f"Unknown event type '{event_type}'; expected one of {', '.join(EVENT_TYPES)}")
+        if not 0 <= size <= MAX_EVENT_SIZE:
+            raise ValueError(f"Event sizes must be between 0 and {MAX_EVENT_SIZE}")
+
+
+def encode_events(events: List[Tuple[int, str, int]]) -> Tuple[int, bytes]:
+    """(started_ms, packed events) of a batch of (t_ms, type, size) events, in time order."""
+    ordered = sorted(events, key=lambda event: event[0])
+    started_ms = previous = ordered[0][0]
+    out = bytearray()
+    for t_ms, event_type, size in ordered:
+        _put_varint(out, t_ms - previous)
+        _put_varint(out, size << _TYPE_BITS | EVENT_CODES[event_type])
+        previous = t_ms
+    return started_ms, bytes(out)
+
+
+def decode_events(started_ms: int, data: bytes) -> Iterator[Tuple[int, int, int]]:
+    """Yield (t_ms, type code, size) from a packed chunk."""
+    t_ms = started_ms
+    delta = None
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if delta is None:
+            delta = value
+        else:
+            t_ms += delta
+            yield t_ms, value & 0b111, value >> _TYPE_BITS
+            delta = None
+        value = shift = 0
+
+
+def telemetry_features(chunks: Iterable[Tuple[int, bytes]]) -> Optional[Dict[str, any]]:
+    """
+    Pause, idle-gap, focus and burst features of an answer, streamed over its
+    (started_ms, events) chunks in time order. None if there are no events.
+    """
+    stats = {
+        "event_count": 0,
+        "duration_ms": 0,
+        "inserted_chars": 0,
+        "deleted_chars": 0,
+        "paste_count": 0,
+        "pasted_chars": 0,
+        "pause_count": 0,
+        "longest_pause_ms": 0,
+        "idle_gap_count": 0,
+        "idle_ms": 0,
+        "focus_loss_count": 0,
+        "away_ms": 0,
+        "burst_count": 0,
+        "burst_chars": 0,
+        "bursts_after_return": 0
+    }
+    first_ms = last_ms = last_edit_ms = None
+    blurred_at = returned_at = None
+    burst_start = burst_last = burst_returned_at = None
+    burst_size = 0
+
+    def close_burst():
+        if burst_start is not None and burst_size >= BURST_MIN_CHARS:
+            stats["burst_count"] += 1
+            stats["burst_chars"] += burst_size
+            if burst_returned_at is not None and burst_start - burst_returned_at <= RETURN_WINDOW_MS:
+                stats["bursts_after_return"] += 1
+
+    for started_ms, data in chunks:
+        for t_ms, code, size in decode_events(started_ms, data):
+            stats["event_count"] += 1
+            if first_ms is None:
+                first_ms = t_ms
+            last_ms = t_ms
+
+            if code == BLUR:
+                burst_last = None
+                if blurred_at is None:
+                    blurred_at = t_ms
+                    stats["focus_loss_count"] += 1
+                continue
+            if blurred_at is not None:
+                # Back on the answer: a focus event, or an edit if focus went unreported
+                stats["away_ms"] += t_ms - blurred_at
+                blurred_at = None
+                returned_at = t_ms
+            if code == FOCUS:
+                continue
+
+            if last_edit_ms is not None:
+                gap = t_ms - last_edit_ms
+                stats["longest_pause_ms"] = max(stats["longest_pause_ms"], gap)
+                if gap >= IDLE_GAP_MS:
+                    stats["idle_gap_count"] += 1
+                    stats["idle_ms"] += gap
+                    returned_at = t_ms
+                elif gap >= PAUSE_MS:
+                    stats["pause_count"] += 1
+            last_edit_ms = t_ms
+
+            if code == DELETE:
+                stats["deleted_chars"] += size
+                burst_last = None
+                continue
+            stats["inserted_chars"] += size
+            if code == PASTE:
+                stats["paste_count"] += 1
+                stats["pasted_chars"] += size
+            if burst_last is not None and t_ms - burst_last <= BURST_GAP_MS:
+                burst_size += size
+            else:
+                close_burst()
+                burst_start, burst_size, burst_returned_at = t_ms, size, returned_at
+            burst_last = t_ms
+
+    if first_ms is None:
+        return None
+    close_burst()
+    stats["duration_ms"] = last_ms - first_ms
+    stats["burst_share"] = round(stats["burst_chars"] / stats["inserted_chars"], 3) if stats["inserted_chars"] else 0.0
+    return stats
+
+
+def telemetry_behavior(features: Dict[str, any]) -> Dict[str, bool]:
+    """Behavior flags backed by telemetry features."""
+    return {
+        "suspicious_pause": features["bursts_after_return"] > 0,
+        "possible_copy_behavior": (
+            features["burst_chars"] >= COPY_MIN_BURST_CHARS and
+            features["burst_share"] >= COPY_BURST_SHARE
+        )
+    }
+
+
+def store_events(db: Session, assessment_id: UUID, question_id: UUID,
+                 events: List[Tuple[int, str, int]]) -> Dict[str, any]:
+    """
+    Encode a batch of (t_ms, type, size) events and store it as one chunk.
+    A batch already stored (same first event time) is ignored. Raises
+    ValueError for invalid events; does not commit.
+    """
+    validate_events(events)
+    started_ms, data = encode_events(events)
+    values = {
+        "assessment_id": assessment_id,
+        "question_id": question_id,
+        "started_ms": started_ms,
+        "event_count": len(events),
+        "events": data
+    }
+
+    statement = dialect_insert(db, TelemetryChunk)
+    if statement is not None:
+        stored = db.execute(statement.values(**values).on_conflict_do_nothing()).rowcount == 1
+    else:
+        stored = db.get(TelemetryChunk, (assessment_id, question_id, started_ms)) is None
+        if stored:
+            db.add(TelemetryChunk(**values))
+
+    return {"accepted": len(events), "stored_bytes": len(data), "duplicate": not stored}
+
+
+def load_telemetry_chunks(db: Session, keys: List[Tuple[UUID, UUID]]) -> Dict[Tuple[UUID, UUID], List[Tuple[int, bytes]]]:
+    """(started_ms, events) chunks in time order for each (assessment_id, question_id), in one query."""
+    wanted = set(keys)
+    if not wanted:
+        return {}
+    rows = db.query(
+        TelemetryChunk.assessment_id, TelemetryChunk.question_id, TelemetryChunk.started_ms, TelemetryChunk.events
+    ).filter(
+        TelemetryChunk.assessment_id.in_({assessment_id for assessment_id, _ in wanted}),
+        TelemetryChunk.question_id.in_({question_id for _, question_id in wanted})
+    ).order_by(TelemetryChunk.started_ms).all()
+
+    chunks: Dict[Tuple[UUID, UUID], List[Tuple[int, bytes]]] = {}
+    for row in rows:
+        key = (row.assessment_id, row.question_id)
+        if key in wanted:
+            chunks.setdefault(key, []).append((row.started_ms, row.events))
+    return chunks
+
+
+def load_telemetry_features(db: Session, keys: List[Tuple[UUID, UUID]]) -> Dict[Tuple[UUID, UUID], Dict[str, any]]:
+    """telemetry_features for each (assessment_id, question_id) that has events."""
+    results = {}
+    for key, chunks in load_telemetry_chunks(db, keys).items():
+        features = telemetry_features(chunks)
+        if features is not None:
+            results[key] = features
+    return results
@@ -0,0 +1,270 @@
+"""
+Text Features Module
+
+Tokenizes an answer ONCE and shares the result with every NLP analyzer.
+
+Before this, each analyzer re-split the same text: whitespace tokens for
+length, a sentence regex plus per-sentence splits for variety, a lowercase
+copy and split for repetition and generic phrasing, and all of it again for
+the current and every previous answer in quality-jump detection.
+
+TextFeatures holds everything those analyzers read, without keeping any
+token list alive:
+- word_count, char_count, total_word_length, unique_word_count
+- token_starts / token_ends: character offsets of each whitespace token
+- sentence_starts / sentence_ends: character offsets of each non-empty
+  sentence, and sentence_word_counts: words per sentence
+- lower, and lower_ngrams(n): the lowercase n-grams of consecutive tokens
+  (what repetition and near-duplicate shingling read)
+
+Offsets and counts are compact arrays ('i', 4 bytes per entry) instead of
+lists of str objects (about 60 bytes per token). They are all derived from
+one "class map" of the text, one byte per character: b' ' for whitespace
+(the str.split definition), b'.' for '.', '!' and '?', b'x' for anything
+else. Counting words and splitting sentences are then bytes.count and
+bytes.split calls on the map, and token offsets are read from it in
+fixed-size numpy chunks, so no step allocates per-token objects.
+
+Every field is computed on first use and cached, so a text only pays for
+what its analyzers read (quality-jump baselines never build token offsets).
+"""
+
+import re
+from array import array
+from itertools import chain, repeat
+from operator import add
+from typing import List, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Class map bytes
+SPACE, PUNCT, OTHER = 32, 46, 120
+
+# Unicode whitespace (the characters str.split() splits on)
+WHITESPACE = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+
+# ASCII text: one bytes.translate call per text
+_ASCII_CLASSES = bytes(
+    SPACE if chr(c) in WHITESPACE else PUNCT if chr(c) in ".!?" else OTHER
+    for c in range(256)
+)
+# Other text: runs of "other" characters first, then whitespace and punctuation
+_OTHER_RUN = re.compile(r"[^\s.!?]+")
+_SPACE_PUNCT_TABLE = str.maketrans({**dict.fromkeys(WHITESPACE, " "), "!": ".", "?": "."})
+
+# Characters of the class map scanned per numpy chunk when reading token offsets
+OFFSET_CHUNK_SIZE = 4096
+# Characters per str.split call when collecting the vocabulary
+VOCABULARY_CHUNK_SIZE = 256
+
+
+def class_map(text: str) -> bytes:
+    """One class byte (SPACE, PUNCT or OTHER) per character of text."""
+    if text.isascii():
+        return text.encode("ascii").translate(_ASCII_CLASSES)
+    others = _OTHER_RUN.sub(lambda match: "x" * len(match.group()), text)
+    return others.translate(_SPACE_PUNCT_TABLE).encode("ascii")
+
+
+def _word_count(classes: bytes) -> int:
+    """Whitespace tokens in a class map (or in a slice of one): non-space bytes after a space or at the start."""
+    return (
+        classes.count(b" x") + classes.count(b" .") +
+        (1 if classes[:1] in (b"x", b".") else 0)
+    )
+
+
+class TextFeatures:
+    """Tokenized view of an answer shared by all analyzers."""
+
+    __slots__ = (
+        "text",
+        "char_count",
+        "_classes",
+        "_word_count",
+        "_total_word_length",
+        "_lower",
+        "_unique_word_count",
+        "_token_starts",
+        "_token_ends",
+        "_sentence_starts",
+        "_sentence_ends",
+        "_sentence_word_counts",
+        "_sentence_count",
+    )
+
+    def __init__(self, text: str):
+        text = text or ""
+        self.text = text
+        self.char_count = len(text)
+        self._classes: Optional[bytes] = None
+        self._word_count: Optional[int] = None
+        self._total_word_length: Optional[int] = None
+        self._lower: Optional[str] = None
+        self._unique_word_count: Optional[int] = None
+        self._token_starts: Optional[array] = None
+        self._token_ends: Optional[array] = None
+        self._sentence_starts: Optional[array] = None
+        self._sentence_ends: Optional[array] = None
+        self._sentence_word_counts: Optional[array] = None
+        self._sentence_count: Optional[int] = None
+
+    @property
+    def classes(self) -> bytes:
+        if self._classes is None:
+            self._classes = class_map(self.text)
+        return self._classes
+
+    @property
+    def word_count(self) -> int:
+        if self._word_count is None:
+            self._word_count = _word_count(self.classes)
+        return self._word_count
+
+    @property
+    def total_word_length(self) -> int:
+        if self._total_word_length is None:
+            self._total_word_length = self.char_count - self.classes.count(b" ")
+        return self._total_word_length
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    @property
+    def unique_word_count(self) -> int:
+        if self._unique_word_count is None:
+            # Split a chunk at a time (cut at whitespace), so only one chunk's tokens exist at once
+            vocabulary = set()
+            text, classes, start = self.text, self.classes, 0
+            while start < self.char_count:
+                end = classes.find(b" ", start + VOCABULARY_CHUNK_SIZE)
+                if end < 0:
+                    end = self.char_count
+                vocabulary.update(text[start:end].split())
+                start = end
+            self._unique_word_count = len(vocabulary)
+        return self._unique_word_count
+
+    def _token_boundaries(self):
+        """(starts, ends) of the whitespace tokens, read from the class map."""
+        starts, ends = array("i"), array("i")
+        if NUMPY_AVAILABLE:
+            classes = np.frombuffer(self.classes, dtype=np.uint8)
+            previous_space = True
+            for offset in range(0, self.char_count, OFFSET_CHUNK_SIZE):
+                is_space = classes[offset:offset + OFFSET_CHUNK_SIZE] == SPACE
+                # Token starts: non-space after space; token ends: space after non-space
+                changes = np.flatnonzero(is_space[1:] != is_space[:-1]) + (offset + 1)
+                if is_space[0] != previous_space:
+                    changes = np.concatenate(([offset], changes))
+                if len(changes):
+                    first_is_start = not is_space[changes[0] - offset]
+                    changes = changes.astype(np.int32)
+                    starts.frombytes(changes[0 if first_is_start else 1::2].tobytes())
+                    ends.frombytes(changes[1 if first_is_start else 0::2].tobytes())
+                previous_space = bool(is_space[-1])
+            if not previous_space:
+                ends.append(self.char_count)
+        else:
+            for match in re.finditer(rb"[^ ]+", self.classes):
+                starts.append(match.start())
+                ends.append(match.end())
+        return starts, ends
+
+    @property
+    def token_starts(self) -> array:
+        if self._token_starts is None:
+            self._token_starts = self._token_boundaries()[0]
+        return self._token_starts
+
+    @property
+    def token_ends(self) -> array:
+        # Not kept with the starts: n-grams of single-spaced text only need the starts
+        if self._token_ends is None:
+            self._token_ends = self._token_boundaries()[1]
+        return self._token_ends
+
+    def lower_ngrams(self, n: int) -> List[str]:
+        """
+        The lowercase n-grams of consecutive tokens, joined by single spaces:
+        " ".join(tokens[i:i + n]) for every i, with tokens = text.lower().split().
+        Empty if there are fewer than n tokens.
+        """
+        count = self.word_count - n + 1
+        if n < 1 or count < 1:
+            return []
+        lower = self.lower
+        single_spaced = (
+            len(lower) == self.char_count and
+            self.char_count - self.total_word_length == self.word_count - 1 == self.text.count(" ")
+        )
+        if single_spaced:
+            # Tokens are separated by exactly one ' ', so each n-gram is a slice of the text
+            # ending one character before the start of the token n positions later
+            starts = self.token_starts
+            stops = chain(map(add, starts[n:], repeat(-1)), (self.char_count,))
+            return list(map(lower.__getitem__, map(slice, starts[:count], stops)))
+        tokens = lower.split()
+        return [" ".join(tokens[i:i + n]) for i in range(count)]
+
+    def _scan_sentences(self):
+        # A sentence is a run of text between '.', '!' or '?' runs; its words are its whitespace tokens
+        starts, ends = array("i"), array("i")
+        position = 0
+        for piece in self.classes.split(b"."):
+            # Whitespace-only pieces are not sentences
+            if b"x" in piece:
+                starts.append(position)
+                ends.append(position + len(piece))
+            position += len(piece) + 1
+        self._sentence_starts = starts
+        self._sentence_ends = ends
+
+    @property
+    def sentence_starts(self) -> array:
+        if self._sentence_starts is None:
+            self._scan_sentences()
+        return self._sentence_starts
+
+    @property
+    def sentence_ends(self) -> array:
+        if self._sentence_ends is None:
+            self._scan_sentences()
+        return self._sentence_ends
+
+    @property
+    def sentence_word_counts(self) -> array:
+        if self._sentence_word_counts is None:
+            # Words of each piece between '.' bytes (word characters after a space or at the
+            # piece start), counted by C-level maps; pieces without words are not sentences
+            pieces = self.classes.split(b".")
+            word_counts = map(
+                add, map(bytes.count, pieces, repeat(b" x")), map(bytes.startswith, pieces, repeat(b"x"))
+            )
+            self._sentence_word_counts = array("i", [words for words in word_counts if words])
+        return self._sentence_word_counts
+
+    @property
+    def sentence_count(self) -> int:
+        if self._sentence_count is None:
+            if self._sentence_word_counts is not None:
+                self._sentence_count = len(self._sentence_word_counts)
+            else:
+                # Counted without per-sentence word counts (style metrics only need the count)
+                self._sentence_count = sum(map(bytes.__contains__, self.classes.split(b"."), repeat(b"x")))
+        return self._sentence_count
+
+    def sentence(self, index: int) -> str:
+        """Text of the index-th sentence, stripped as the analyzers see it."""
+        return self.text[self.sentence_starts[index]:self.sentence_ends[index]].strip()
+
+    def __repr__(self) -> str:
+        return f"TextFeatures(word_count={self.word_count}, char_count={self.char_count})"
@@ -0,0 +1,109 @@
+"""
+TF-IDF Module
+
+Sparse TF-IDF vectors and cosine similarity for per-question originality
+scoring (see app/nlp/originality.py).
+
+- Terms are lowercase alphanumeric words hashed to 31 bits with CRC32, so
+  vectors need no shared vocabulary table and stay comparable across
+  processes and restarts.
+- Weights are sublinear TF (1 + log count) times smoothed IDF
+  (log((1 + N) / (1 + df)) + 1), L2-normalized: the dot product of two
+  vectors is their cosine similarity.
+- A vector is a pair of parallel sorted arrays (terms, weights), packed as
+  little-endian uint32 terms followed by float32 weights.
+- Similarities of one vector against many packed vectors are computed in
+  one vectorized pass with NumPy (the packed arrays are read in place,
+  searchsorted over the concatenated terms, then bincount), with a
+  pure-Python fallback.
+"""
+
+import math
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_TERM_MASK = 0x7FFFFFFF  # fits a signed 32-bit Integer column
+
+SparseVector = Tuple[List[int], List[float]]
+
+
+def term_counts(lower_text: str) -> Dict[int, int]:
+    """Hashed term -> count for a lowercased text; single characters are ignored."""
+    return dict(Counter(
+        zlib.crc32(word.encode("utf-8")) & _TERM_MASK
+        for word in _WORD_PATTERN.findall(lower_text)
+        if len(word) > 1
+    ))
+
+
+def idf(doc_freq: int, doc_count: int) -> float:
+    """Smoothed inverse document frequency; never zero, so unseen terms still count."""
+    return math.log((1 + doc_count) / (1 + doc_freq)) + 1
+
+
+def tfidf_vector(counts: Dict[int, int], doc_freqs: Dict[int, int], doc_count: int) -> SparseVector:
+    """L2-normalized TF-IDF vector of term counts, against a corpus of doc_count documents."""
+    terms = sorted(counts)
+    weights = [(1 + math.log(counts[term])) * idf(doc_freqs.get(term, 0), doc_count) for term in terms]
+    norm = math.sqrt(sum(weight * weight for weight in weights))
+    if norm:
+        weights = [weight / norm for weight in weights]
+    return terms, weights
+
+
+def vector_to_bytes(vector: SparseVector) -> bytes:
+    terms, weights = vector
+    count = len(terms)
+    return struct.pack(f"<I{count}I{count}f", count, *terms, *weights)
+
+
+def vector_from_bytes(data: bytes) -> SparseVector:
+    (count,) = struct.unpack_from("<I", data)
+    values = struct.unpack_from(f"<{count}I{count}f", data, 4)
+    return list(values[:count]), list(values[count:])
+
+
+def similarities(query: SparseVector, packed_vectors: List[bytes]) -> List[float]:
+    """Cosine similarity of the query with each packed vector (all L2-normalized)."""
+    if not packed_vectors or not query[0]:
+        return [0.0] * len(packed_vectors)
+
+    if NUMPY_AVAILABLE:
+        query_terms = np.asarray(query[0], dtype=np.int64)
+        query_weights = np.asarray(query[1], dtype=np.float64)
+        lengths = np.array([struct.unpack_from("<I", data)[0] for data in packed_vectors], dtype=np.int64)
+        if not lengths.sum():
+            return [0.0] * len(packed_vectors)
+        all_terms = np.concatenate([
+            np.frombuffer(data, dtype="<u4", count=length, offset=4)
+            for data, length in zip(packed_vectors, lengths.tolist())
+        ]).astype(np.int64)
+        all_weights = np.concatenate([
+            np.frombuffer(data, dtype="<f4", count=length, offset=4 + 4 * length)
+            for data, length in zip(packed_vectors, lengths.tolist())
+        ]).astype(np.float64)
+        rows = np.repeat(np.arange(len(packed_vectors)), lengths)
+
+        # Position of each stored term in the (sorted) query terms, if present
+        positions = np.minimum(np.searchsorted(query_terms, all_terms), len(query_terms) - 1)
+        shared = query_terms[positions] == all_terms
+        products = all_weights[shared] * query_weights[positions[shared]]
+        return np.bincount(rows[shared], weights=products, minlength=len(packed_vectors)).tolist()
+
+    query_map = dict(zip(*query))
+    results = []
+    for data in packed_vectors:
+        terms, weights = vector_from_bytes(data)
+        results.append(sum(weight * query_map.get(term, 0.0) for term, weight in zip(terms, weights)))
+    return results
@@ -0,0 +1,96 @@
+"""
+Background Jobs
+
+Periodic maintenance run by a background thread of each API process,
+started and stopped by the app lifespan (app/main.py):
+- daily rollups, every ROLLUP_INTERVAL_SECONDS (app/analytics/daily_rollups.py)
+- NLP result cache pruning, every NLP_CACHE_PRUNE_INTERVAL_SECONDS
+  (app/nlp/result_cache.py)
+
+Each job runs once at startup, then on its interval, with its own
+database session; a job with an interval of 0 is not scheduled (run its
+python -m app.utils command from cron instead). Both jobs are safe to run
+from several processes at once. Errors are logged and the job is retried
+on its next run.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import NLP_CACHE_PRUNE_INTERVAL_SECONDS, ROLLUP_INTERVAL_SECONDS
+from app.db.database import SessionLocal
+from app.analytics.daily_rollups import run_daily_rollups
+from app.nlp.nlp_service import analyzer_version
+from app.nlp.result_cache import prune_result_cache
+
+logger = logging.getLogger(__name__)
+
+
+def rollups_job(db: Session):
+    totals = run_daily_rollups(db)
+    if totals["answers"]:
+        logger.info(f"Rolled up {totals['answers']} answers; watermark {totals['processed_until']}")
+
+
+def prune_nlp_cache_job(db: Session):
+    # Both the lazy and the full writing-analysis keys of the running analyzers are current
+    version = analyzer_version()
+    deleted = prune_result_cache(db, (version, f"{version}+full"))
+    if deleted:
+        logger.info(f"Pruned {deleted} NLP result cache rows")
+
+
+# (name, interval in seconds, job(db))
+JOBS: List[Tuple[str, int, Callable[[Session], None]]] = [
+    ("daily rollups", ROLLUP_INTERVAL_SECONDS, rollups_job),
+    ("nlp cache prune", NLP_CACHE_PRUNE_INTERVAL_SECONDS, prune_nlp_cache_job),
+]
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _run_job(name: str, job: Callable[[Session], None]):
+    db = SessionLocal()
+    try:
+        job(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Background job {name} failed: {str(e)}")
+    finally:
+        db.close()
+
+
+def _run_jobs(jobs: List[Tuple[str, int, Callable[[Session], None]]]):
+    """Run each job now and then every interval until stopped."""
+    next_runs = [0.0] * len(jobs)
+    while True:
+        for index, (name, interval, job) in enumerate(jobs):
+            if time.monotonic() >= next_runs[index]:
+                _run_job(name, job)
+                next_runs[index] = time.monotonic() + interval
+        if _stop.wait(max(0.0, min(next_runs) - time.monotonic())):
+            return
+
+
+def start_background_jobs(jobs: Optional[List[Tuple[str, int, Callable[[Session], None]]]] = None):
+    """Start the job thread (at API startup) for the jobs with a positive interval."""
+    global _thread
+    jobs = [job for job in (JOBS if jobs is None else jobs) if job[1] > 0]
+    if not jobs or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run_jobs, args=(jobs,), name="background-jobs", daemon=True)
+    _thread.start()
+
+
+def stop_background_jobs():
+    """Stop the job thread, letting a job in progress finish."""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join()
+    _thread = None
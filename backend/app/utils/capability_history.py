@@ -0,0 +1,81 @@
+"""
+Capability History Maintenance
+
+backfill: one point per capability score without history. Run it once
+after deploying the capability_history table; growth is measured from
+those points on.
+
+downsample: merge points older than --days (CAPABILITY_HISTORY_RAW_DAYS by
+default) into one point per student, topic and day. Safe to run
+repeatedly, e.g. nightly.
+
+Usage:
+    python -m app.utils.capability_history backfill
+    python -m app.utils.capability_history downsample [--days N] [--batch-size N]
+"""
+
+import argparse
+import logging
+import time
+from sqlalchemy.orm import Session
+from app.core.config import CAPABILITY_HISTORY_RAW_DAYS
+from app.db.database import SessionLocal, engine
+from app.db.base import Base
+from app.analytics.capability_history import (
+    DEFAULT_BATCH_SIZE,
+    backfill_capability_history,
+    downsample_capability_history,
+    raw_cutoff
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def backfill():
+    db: Session = SessionLocal()
+    try:
+        points = backfill_capability_history(db)
+        db.commit()
+        logger.info(f"Backfilled {points} capability history points")
+    except Exception as e:
+        logger.error(f"Error backfilling capability_history: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def downsample(days: int, batch_size: int):
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        before = raw_cutoff(days)
+        totals = downsample_capability_history(db, before, batch_size)
+        logger.info(
+            f"Downsampled capability history before {before:%Y-%m-%d} for {totals['students']} students: "
+            f"{totals['days_merged']} days merged, {totals['points_deleted']} points deleted "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+    except Exception as e:
+        logger.error(f"Error downsampling capability_history: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or downsample the capability_history table.")
+    parser.add_argument("command", choices=["backfill", "downsample"])
+    parser.add_argument("--days", type=int, default=CAPABILITY_HISTORY_RAW_DAYS,
+                        help="keep points of the last N days at full resolution")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="students per transaction")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if args.command == "backfill":
+        backfill()
+    else:
+        downsample(args.days, args.batch_size)
@@ -0,0 +1,56 @@
+"""
+Daily Rollups Job
+
+Aggregates answers submitted since the last run into student_topic_daily
+and topic_daily (see app/analytics/daily_rollups.py). Incremental and safe
+to run concurrently. The API already runs it every ROLLUP_INTERVAL_SECONDS;
+with ROLLUP_INTERVAL_SECONDS=0, schedule this command instead, e.g. every
+5 minutes from cron.
+
+Usage:
+    python -m app.utils.daily_rollups            # process new answers
+    python -m app.utils.daily_rollups --rebuild  # empty the rollups and re-aggregate every answer
+"""
+
+import argparse
+import logging
+import time
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal, engine
+from app.db.base import Base
+from app.analytics.daily_rollups import reset_daily_rollups, run_daily_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def run(rebuild: bool = False):
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if rebuild:
+            reset_daily_rollups(db)
+            db.commit()
+            logger.info("Emptied the daily rollups")
+        totals = run_daily_rollups(db)
+        logger.info(
+            f"Rolled up {totals['answers']} answers into {totals['rows']} student rows in "
+            f"{totals['windows']} window(s), {time.perf_counter() - started:.2f}s; "
+            f"watermark {totals['processed_until']}"
+        )
+    except Exception as e:
+        logger.error(f"Error running daily rollups: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate new answers into the daily rollup tables.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="empty the rollups and re-aggregate every answer")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run(args.rebuild)
@@ -0,0 +1,198 @@
+"""
+Query Plan Check
+
+Runs the main assessment, NLP and analytics code paths against a
+throwaway in-memory SQLite database built from the models, records every
+statement they issue, and asks SQLite for each one's plan (EXPLAIN QUERY
+PLAN). Exits non-zero when a statement reads one of the HOT_TABLES in
+full ("SCAN <table>", with or without an index, rather than "SEARCH"),
+so a query change or a dropped index that turns a hot path into a scan is
+caught before it ships.
+
+SQLite without ANALYZE statistics assumes every table is large, so the
+plans do not depend on the few rows seeded here. Scans that are full by
+design (offline rebuilds) are listed per scenario in ALLOWED_SCANS.
+
+The test suite runs run_check (tests/test_explain_check.py); the command
+prints each scenario's statements and scans.
+
+Usage:
+    python -m app.utils.explain_check [--verbose]
+"""
+
+import argparse
+import logging
+import re
+import sys
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.user import User, UserRole
+from app.models.subject import Subject
+from app.models.topic import Topic
+from app.models.question import Question, CognitiveType
+from app.models.capability import CapabilityScore
+from app.assessment import assessment_service
+from app.analytics import analytics_service
+from app.analytics.export import _export_query
+from app.analytics.leaderboard import load_board
+from app.analytics.topic_stats import rebuild_topic_stats
+from app.nlp.nlp_service import analyze_answer_attempt
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tables that grow with students and answers
+HOT_TABLES = ("answer_attempts", "questions", "capability_scores", "feedback", "assessment_attempts")
+
+# (scenario, table): full scans that are the point of the query
+ALLOWED_SCANS = {
+    # Offline rebuild of every topic's counters (python -m app.utils.rebuild_topic_stats)
+    ("topic stats rebuild", "answer_attempts"),
+    ("topic stats rebuild", "capability_scores"),
+    ("topic stats rebuild", "questions"),
+    ("topic stats rebuild", "feedback"),
+}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+ANSWER_TEXT = (
+    "The binary tree uses recursion to compute its height, visiting every node once, "
+    "so the time complexity is linear and the extra space is the height of the tree."
+)
+
+
+def _scanned_table(detail: str) -> str:
+    """Table a plan step scans in full (aliases like answer_attempts_1 included), or ''."""
+    match = SCAN_PATTERN.match(detail)
+    if not match:
+        return ""
+    table = re.sub(r"_\d+$", "", match.group(1))
+    return table if table in HOT_TABLES else ""
+
+
+@contextmanager
+def captured_statements(engine) -> List[Tuple[str, object]]:
+    """Collect (statement, parameters) of every SELECT, UPDATE and DELETE run on the engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_scans(engine, statements: List[Tuple[str, object]]) -> List[Tuple[str, str]]:
+    """(table, statement) of each hot table scanned in full by the statements' plans."""
+    scans = []
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for statement, parameters in statements:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            for row in cursor.fetchall():
+                table = _scanned_table(row[-1])
+                if table:
+                    scans.append((table, statement))
+    finally:
+        connection.close()
+    return scans
+
+
+def seed(db: Session) -> Dict[str, object]:
+    """One subject with two topics, two students and a faculty user, plus capability scores."""
+    faculty = User(name="Faculty", email="faculty@explain.check", role=UserRole.faculty)
+    students = [User(name=f"Student {i}", email=f"student{i}@explain.check", role=UserRole.student) for i in range(2)]
+    subject = Subject(name="Coding")
+    db.add_all([faculty, subject, *students])
+    db.flush()
+    topics = [Topic(subject_id=subject.id, name=f"Topic {i}") for i in range(2)]
+    db.add_all(topics)
+    db.flush()
+    for topic in topics:
+        for level in (3, 5, 7):
+            db.add(Question(
+                topic_id=topic.id,
+                question_text=f"{topic.name} question {level}",
+                difficulty_level=level,
+                cognitive_type=CognitiveType.procedural,
+                expected_concepts=["binary tree", "recursion", "time complexity"]
+            ))
+        for student in students:
+            db.add(CapabilityScore(user_id=student.id, topic_id=topic.id, capability_level=50, streak=0))
+    db.commit()
+    return {"student": students[0], "subject": subject, "topic": topics[0]}
+
+
+def scenarios(fixtures: Dict[str, object]) -> List[Tuple[str, Callable[[Session], object]]]:
+    """(name, fn(db)) of the code paths to check, in order (later ones read earlier ones' rows)."""
+    student, subject, topic = fixtures["student"], fixtures["subject"], fixtures["topic"]
+    state = {}
+
+    def start(db):
+        state["assessment"], state["question"] = assessment_service.start_assessment(db, student.id, subject.id)
+
+    def answer(db):
+        state["answer"], _ = assessment_service.submit_answer(
+            db, state["assessment"].id, state["question"].id, ANSWER_TEXT, 100, None
+        )
+
+    return [
+        ("start assessment", start),
+        ("submit answer", answer),
+        ("assessment status", lambda db: assessment_service.get_assessment_status(db, state["assessment"].id)),
+        ("nlp analysis", lambda db: analyze_answer_attempt(state["answer"].id, db)),
+        ("faculty overview", analytics_service.get_faculty_overview),
+        ("student detail", lambda db: analytics_service.get_student_detail(db, student.id)),
+        ("topics heatmap", analytics_service.get_topics_heatmap),
+        ("topic trend", lambda db: analytics_service.get_topic_trend(db, topic.id)),
+        ("student self insights", lambda db: analytics_service.get_student_self_insights(db, student.id)),
+        ("global leaderboard", lambda db: load_board(db, ("global", None))),
+        ("subject leaderboard", lambda db: load_board(db, ("subject", subject.id))),
+        ("topic leaderboard", lambda db: load_board(db, ("topic", topic.id))),
+        ("cohort export", lambda db: _export_query(db, subject.id).all()),
+        ("topic stats rebuild", rebuild_topic_stats),
+    ]
+
+
+def run_check(verbose: bool = False) -> List[Tuple[str, str, str]]:
+    """(scenario, table, statement) of every full scan of a hot table not in ALLOWED_SCANS."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    failures = []
+    try:
+        for name, run in scenarios(seed(db)):
+            with captured_statements(engine) as statements:
+                run(db)
+            scans = full_scans(engine, statements)
+            unexpected = [(table, statement) for table, statement in scans if (name, table) not in ALLOWED_SCANS]
+            failures.extend((name, table, statement) for table, statement in unexpected)
+            logger.info(f"{name}: {len(statements)} statements, {len(unexpected)} unexpected full scans")
+            if verbose:
+                for table, statement in scans:
+                    logger.info(f"  SCAN {table}: {' '.join(statement.split())}")
+    finally:
+        db.close()
+        engine.dispose()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if a hot query path scans a large table in full.")
+    parser.add_argument("--verbose", action="store_true", help="print every full scan, allowed or not")
+    args = parser.parse_args()
+
+    failures = run_check(args.verbose)
+    for name, table, statement in failures:
+        logger.error(f"{name}: full scan of {table} in: {' '.join(statement.split())}")
+    if failures:
+        sys.exit(1)
+    logger.info("No unexpected full scans")
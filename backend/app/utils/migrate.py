@@ -0,0 +1,203 @@
+"""
+Schema Migrations
+
+The API creates missing tables at startup (Base.metadata.create_all), but
+create_all never changes a table that already exists. Changes to existing
+tables are applied by this command instead, as a list of idempotent steps:
+each one inspects the live schema and only does what is still missing, so
+the command is safe to rerun, and a fresh database created by the API is
+already up to date.
+
+Usage:
+    python -m app.utils.migrate
+"""
+
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import delete, func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from app.db.database import engine
+from app.db.base import Base
+from app.models.answer_attempt import AnswerAttempt
+from app.models.assessment import AssessmentAttempt
+from app.models.capability import CapabilityScore
+from app.models.feedback import Feedback
+from app.models.nlp_result_cache import NLPResultCache
+from app.models.question import Question
+from app.models.style_profile import StyleProfile
+from app.models.topic import Topic
+from app.analytics.topic_stats import rebuild_topic_stats
+from app.nlp.style_profile import merge_profile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _columns(connection: Connection, table: str) -> set:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def _indexes(connection: Connection, table: str) -> set:
+    return {index["name"] for index in inspect(connection).get_indexes(table)}
+
+
+def add_answer_submitted_at(connection: Connection) -> bool:
+    """
+    answer_attempts.submitted_at (read by the daily rollups job). Existing
+    answers get their assessment's start time, the closest recorded time.
+    """
+    changed = False
+    if "submitted_at" not in _columns(connection, "answer_attempts"):
+        column_type = "TIMESTAMP WITH TIME ZONE" if connection.dialect.name == "postgresql" else "DATETIME"
+        connection.execute(text(f"ALTER TABLE answer_attempts ADD COLUMN submitted_at {column_type}"))
+        connection.execute(text(
+            "UPDATE answer_attempts SET submitted_at = ("
+            "SELECT started_at FROM assessment_attempts WHERE assessment_attempts.id = answer_attempts.assessment_id"
+            ") WHERE submitted_at IS NULL"
+        ))
+        if connection.dialect.name == "postgresql":
+            # SQLite cannot add a column default afterwards; the model's ORM-side default fills new rows there
+            connection.execute(text("ALTER TABLE answer_attempts ALTER COLUMN submitted_at SET DEFAULT now()"))
+        changed = True
+    if "ix_answer_attempts_submitted_at" not in _indexes(connection, "answer_attempts"):
+        connection.execute(text("CREATE INDEX ix_answer_attempts_submitted_at ON answer_attempts (submitted_at)"))
+        changed = True
+    return changed
+
+
+def dedupe_capability_scores(connection: Connection) -> bool:
+    """
+    Keep one capability score per (user_id, topic_id), the most recently
+    updated, so the unique index can be built; topic_stats is rebuilt
+    since its capability counters included the removed rows.
+    """
+    if "uq_capability_scores_user_topic" in _indexes(connection, "capability_scores"):
+        return False
+    ranked = select(
+        CapabilityScore.id,
+        func.row_number().over(
+            partition_by=(CapabilityScore.user_id, CapabilityScore.topic_id),
+            order_by=(CapabilityScore.last_updated.desc(), CapabilityScore.id.desc())
+        ).label("position")
+    ).subquery()
+    duplicates = [row.id for row in connection.execute(select(ranked.c.id).where(ranked.c.position > 1))]
+    if not duplicates:
+        return False
+    logger.info(f"Removing {len(duplicates)} duplicate capability scores")
+    connection.execute(delete(CapabilityScore).where(CapabilityScore.id.in_(duplicates)))
+    session = Session(bind=connection)
+    rebuild_topic_stats(session)
+    session.flush()
+    return True
+
+
+# Indexes on the hot filters of the assessment, NLP and analytics queries (declared on the models)
+HOT_FILTER_INDEXES = (
+    "ix_answer_attempts_assessment_question",
+    "ix_answer_attempts_question_id",
+    "ix_questions_topic_id",
+    "ix_topics_subject_id",
+    "ix_capability_scores_topic_id",
+    "uq_capability_scores_user_topic",
+    "ix_feedback_answer_attempt_id",
+    "ix_feedback_gap_type",
+    "ix_assessment_attempts_user_started",
+    "ix_assessment_attempts_status",
+)
+
+
+def add_hot_filter_indexes(connection: Connection) -> bool:
+    """The indexes declared on the models for hot filters (created only where missing)."""
+    declared = {
+        index.name: index
+        for model in (AnswerAttempt, Question, Topic, CapabilityScore, Feedback, AssessmentAttempt)
+        for index in model.__table__.indexes
+    }
+    changed = False
+    for name in HOT_FILTER_INDEXES:
+        index = declared[name]
+        if name not in _indexes(connection, index.table.name):
+            index.create(bind=connection)
+            logger.info(f"Created index {name}")
+            changed = True
+    return changed
+
+
+STYLE_PROFILE_INDEXES = ("uq_style_profiles_user_subject", "uq_style_profiles_user_overall")
+
+
+def dedupe_style_profiles(connection: Connection) -> bool:
+    """
+    Merge duplicate style profiles of a (user_id, subject_id) into the most
+    recently updated one, combining their running statistics, so the
+    unique indexes can be built.
+    """
+    if set(STYLE_PROFILE_INDEXES) <= _indexes(connection, "style_profiles"):
+        return False
+    session = Session(bind=connection)
+    kept = {}
+    removed = 0
+    profiles = session.query(StyleProfile).order_by(
+        StyleProfile.last_updated.desc(), StyleProfile.id.desc()
+    )
+    for profile in profiles:
+        key = (profile.user_id, profile.subject_id)
+        if key not in kept:
+            kept[key] = profile
+            continue
+        merge_profile(kept[key], profile)
+        session.delete(profile)
+        removed += 1
+    if not removed:
+        return False
+    logger.info(f"Merged {removed} duplicate style profiles")
+    session.flush()
+    return True
+
+
+def add_style_profile_indexes(connection: Connection) -> bool:
+    """One style profile per (user_id, subject_id), including the overall (NULL subject) profile."""
+    declared = {index.name: index for index in StyleProfile.__table__.indexes}
+    changed = False
+    for name in STYLE_PROFILE_INDEXES:
+        if name not in _indexes(connection, "style_profiles"):
+            declared[name].create(bind=connection)
+            logger.info(f"Created index {name}")
+            changed = True
+    return changed
+
+
+def add_nlp_result_cache_created_at_index(connection: Connection) -> bool:
+    """nlp_result_cache.created_at index, read by the cache's age-based pruning."""
+    name = "ix_nlp_result_cache_created_at"
+    if name in _indexes(connection, "nlp_result_cache"):
+        return False
+    declared = {index.name: index for index in NLPResultCache.__table__.indexes}
+    declared[name].create(bind=connection)
+    logger.info(f"Created index {name}")
+    return True
+
+
+# Applied in order; append new steps at the end
+STEPS: List[Tuple[str, Callable[[Connection], bool]]] = [
+    ("answer_attempts.submitted_at", add_answer_submitted_at),
+    ("capability_scores duplicates", dedupe_capability_scores),
+    ("hot filter indexes", add_hot_filter_indexes),
+    ("style_profiles duplicates", dedupe_style_profiles),
+    ("style_profiles unique indexes", add_style_profile_indexes),
+    ("nlp_result_cache.created_at index", add_nlp_result_cache_created_at_index),
+]
+
+
+def migrate():
+    """Create missing tables, then apply each step in its own transaction."""
+    Base.metadata.create_all(bind=engine)
+    for name, step in STEPS:
+        with engine.begin() as connection:
+            changed = step(connection)
+        logger.info(f"{name}: {'applied' if changed else 'up to date'}")
+
+
+if __name__ == "__main__":
+    migrate()
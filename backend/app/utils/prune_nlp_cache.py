@@ -0,0 +1,54 @@
+"""
+NLP Result Cache Pruning
+
+Deletes nlp_result_cache rows written by other analyzer versions (or
+generic-phrase lexicons) and rows older than NLP_CACHE_DB_TTL_DAYS (see
+app/nlp/result_cache.py). The API already runs it every
+NLP_CACHE_PRUNE_INTERVAL_SECONDS; with NLP_CACHE_PRUNE_INTERVAL_SECONDS=0,
+schedule this command instead, e.g. daily from cron.
+
+Usage:
+    python -m app.utils.prune_nlp_cache            # default retention
+    python -m app.utils.prune_nlp_cache --days 7   # custom retention
+"""
+
+import argparse
+import logging
+import time
+from sqlalchemy.orm import Session
+from app.core.config import NLP_CACHE_DB_TTL_DAYS
+from app.db.database import SessionLocal, engine
+from app.db.base import Base
+from app.nlp.nlp_service import analyzer_version
+from app.nlp.result_cache import prune_result_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def run(days: int = NLP_CACHE_DB_TTL_DAYS):
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        version = analyzer_version()
+        deleted = prune_result_cache(db, (version, f"{version}+full"), days)
+        logger.info(
+            f"Deleted {deleted} NLP result cache rows (kept analyzer version {version}, "
+            f"rows newer than {days} days) in {time.perf_counter() - started:.2f}s"
+        )
+    except Exception as e:
+        logger.error(f"Error pruning the NLP result cache: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stale rows of the NLP result cache table.")
+    parser.add_argument("--days", type=int, default=NLP_CACHE_DB_TTL_DAYS,
+                        help="delete rows older than this many days")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    run(args.days)
@@ -0,0 +1,550 @@
+"""
+Bulk NLP Re-analysis
+
+Re-scores every stored answer with the current analyzers, e.g. after an
+analyzer version bump or a generic-phrase lexicon change. Calling
+analyze_answer_attempt per answer costs several queries and a commit each,
+which does not scale to historical data. Instead:
+- answers are streamed in id order with keyset pagination
+  (WHERE id > last_id ORDER BY id LIMIT chunk_size), never loaded at once
+- per chunk, the main process loads everything the analyzers read from the
+  database in a few set-based queries (style samples and profiles, LSH
+  candidate pairs, candidate signatures and texts, edit telemetry chunks)
+- the CPU-bound analysis of a chunk runs in a process pool on plain data
+- results are written per chunk in bulk (feedback inserts and updates,
+  one nlp_analysis upsert) and committed once
+- a JSON checkpoint records the last committed answer id, so an
+  interrupted run resumes where it stopped
+
+Two phases:
+1. index - answers stored before style profiles, collusion signatures and
+   TF-IDF vectors existed get their style sample, MinHash signature and
+   vector (vectors are added to each question's corpus in answer id order)
+2. rescore - every answer is analyzed again
+
+Usage:
+    python -m app.utils.reanalyze [--workers N] [--chunk-size N]
+                                  [--checkpoint PATH] [--restart] [--skip-index]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.orm import Session, aliased
+from app.db.database import SessionLocal, engine
+from app.db.base import Base
+from app.models.answer_attempt import AnswerAttempt
+from app.models.answer_signature import AnswerSignature, AnswerLSHBucket
+from app.models.answer_vector import AnswerVector
+from app.models.assessment import AssessmentAttempt
+from app.models.feedback import Feedback, GapType
+from app.models.question import Question
+from app.models.style_profile import StyleSample
+from app.analytics.topic_stats import apply_topic_deltas, gap_change
+from app.nlp.collusion import MIN_COLLUSION_WORDS, rank_candidates, verify_near_duplicates
+from app.nlp.minhash import band_keys, compute_signature, feature_shingles, signature_from_bytes, signature_to_bytes
+from app.nlp.originality import originality_from_vector, record_vector_counts
+from app.nlp.stage_timing import stage
+from app.nlp.telemetry import load_telemetry_chunks, telemetry_features
+from app.nlp.tfidf import term_counts
+from app.nlp.nlp_service import (
+    analyze_pause_behavior, analyzer_version, calculate_risk_score, combine_writing_analyses,
+    detect_quality_jump, generate_feedback_text, save_nlp_analyses
+)
+from app.nlp.style_profile import fold_sample, get_profile, load_profiles, load_samples, style_baseline, style_metrics
+from app.nlp.text_features import TextFeatures
+from app.core.config import NLP_STYLE_BASELINE_PER_SUBJECT
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHECKPOINT = "reanalyze_checkpoint.json"
+PHASES = ("index", "rescore")
+
+_EMPTY_COLLUSION = {
+    "collusion_detected": False,
+    "max_similarity": 0,
+    "matching_answer_ids": [],
+    "candidates_checked": 0
+}
+
+
+# ---------------------------------------------------------------------------
+# Workers: pure functions on plain data, run in the process pool
+# ---------------------------------------------------------------------------
+
+def index_chunk(items: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """Style metrics, MinHash signature and TF-IDF term counts of each answer that lacks them."""
+    results = []
+    for item in items:
+        features = TextFeatures(item["answer_text"])
+        result = {"answer_attempt_id": item["answer_attempt_id"], "metrics": None,
+                  "signature": None, "term_counts": None}
+        if item["needs_vector"]:
+            result["term_counts"] = term_counts(features.lower)
+        if item["needs_sample"]:
+            result["metrics"] = style_metrics(item["answer_text"], features)
+        if item["needs_signature"] and features.word_count >= MIN_COLLUSION_WORDS:
+            signature = compute_signature(feature_shingles(features))
+            result["signature"] = signature_to_bytes(signature)
+            result["buckets"] = band_keys(signature)
+        results.append(result)
+    return results
+
+
+def analyze_rescore_item(item: Dict[str, any]) -> Tuple[Dict, Dict, Dict, Dict]:
+    """(writing, behavior, collusion, originality) analyses of one fetched answer, with no database access."""
+    answer_text = item["answer_text"]
+    with stage("features"):
+        features = TextFeatures(answer_text)
+
+    # Transient objects: analyze_pause_behavior reads these attributes only
+    answer_attempt = AnswerAttempt(
+        id=item["answer_attempt_id"],
+        answer_text=answer_text,
+        progress_percentage=item["progress_percentage"],
+        stopped_at_step=item["stopped_at_step"]
+    )
+    assessment_attempt = AssessmentAttempt(started_at=item["started_at"])
+
+    with stage("quality_jump"):
+        quality_jump_analysis = detect_quality_jump(answer_text, item["style_baseline"], features)
+    writing_analysis = combine_writing_analyses(answer_text, quality_jump_analysis, features)
+    with stage("behavior"):
+        telemetry = telemetry_features(item["telemetry_chunks"]) if item["telemetry_chunks"] else None
+        behavior_analysis = analyze_pause_behavior(answer_attempt, assessment_attempt, features, telemetry)
+
+    collusion_analysis = _EMPTY_COLLUSION
+    if item["signature"] is not None:
+        with stage("collusion"):
+            matches = rank_candidates(signature_from_bytes(item["signature"]), item["candidates"])
+            collusion_analysis = verify_near_duplicates(answer_text, matches)
+
+    return writing_analysis, behavior_analysis, collusion_analysis, item["originality_analysis"]
+
+
+def rescore_chunk(items: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    """Risk scores and feedback text of each answer, as analyze_answer_attempt computes them."""
+    results = []
+    for item in items:
+        writing_analysis, behavior_analysis, collusion_analysis, originality_analysis = analyze_rescore_item(item)
+        risk_score = calculate_risk_score(writing_analysis, behavior_analysis, collusion_analysis, originality_analysis)
+        feedback_text = None
+        if risk_score["risk_flag"] in ["medium", "high"]:
+            feedback_text = generate_feedback_text(
+                risk_score, writing_analysis, behavior_analysis, collusion_analysis, originality_analysis
+            )
+
+        results.append({
+            "answer_attempt_id": item["answer_attempt_id"],
+            "user_id": item["user_id"],
+            "originality_score": risk_score["originality_score"],
+            "confidence_score": risk_score["confidence_score"],
+            "risk_flag": risk_score["risk_flag"],
+            "feedback_text": feedback_text
+        })
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Main process: chunk reads and bulk writes
+# ---------------------------------------------------------------------------
+
+def _after(query, after_id: Optional[UUID], chunk_size: int):
+    if after_id is not None:
+        query = query.filter(AnswerAttempt.id > after_id)
+    return query.order_by(AnswerAttempt.id).limit(chunk_size).all()
+
+
+def fetch_index_chunk(db: Session, after_id: Optional[UUID], chunk_size: int) -> Dict[str, any]:
+    """Next page of non-empty answers missing a style sample, a signature or a TF-IDF vector."""
+    rows = _after(db.query(
+        AnswerAttempt.id,
+        AnswerAttempt.answer_text,
+        AnswerAttempt.question_id,
+        AssessmentAttempt.user_id,
+        AssessmentAttempt.subject_id,
+        StyleSample.answer_attempt_id.is_(None),
+        AnswerSignature.answer_attempt_id.is_(None),
+        AnswerVector.answer_attempt_id.is_(None)
+    ).join(
+        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
+    ).outerjoin(
+        StyleSample, StyleSample.answer_attempt_id == AnswerAttempt.id
+    ).outerjoin(
+        AnswerSignature, AnswerSignature.answer_attempt_id == AnswerAttempt.id
+    ).outerjoin(
+        AnswerVector, AnswerVector.answer_attempt_id == AnswerAttempt.id
+    ).filter(
+        AnswerAttempt.answer_text.isnot(None),
+        AnswerAttempt.answer_text != "",
+        or_(
+            StyleSample.answer_attempt_id.is_(None),
+            AnswerSignature.answer_attempt_id.is_(None),
+            AnswerVector.answer_attempt_id.is_(None)
+        )
+    ), after_id, chunk_size)
+
+    meta = {}
+    items = []
+    for answer_id, answer_text, question_id, user_id, subject_id, needs_sample, needs_signature, needs_vector in rows:
+        meta[answer_id] = {"question_id": question_id, "user_id": user_id, "subject_id": subject_id}
+        items.append({
+            "answer_attempt_id": answer_id,
+            "answer_text": answer_text,
+            "needs_sample": bool(needs_sample),
+            "needs_signature": bool(needs_signature),
+            "needs_vector": bool(needs_vector)
+        })
+    return {"last_id": rows[-1][0] if rows else None, "items": items, "meta": meta}
+
+
+def write_index_chunk(db: Session, chunk: Dict[str, any], results: List[Dict[str, any]]):
+    """
+    Insert the new style samples and signatures, fold the samples into the
+    profiles and add the vectors to their questions' corpora (one at a time,
+    since each is measured against the ones before it).
+    """
+    meta = chunk["meta"]
+    samples = [result for result in results if result["metrics"] is not None]
+    signatures = [result for result in results if result["signature"] is not None]
+
+    if samples:
+        db.execute(insert(StyleSample), [
+            dict(
+                result["metrics"],
+                answer_attempt_id=result["answer_attempt_id"],
+                user_id=meta[result["answer_attempt_id"]]["user_id"],
+                subject_id=meta[result["answer_attempt_id"]]["subject_id"]
+            )
+            for result in samples
+        ])
+        profiles = load_profiles(db, [meta[result["answer_attempt_id"]]["user_id"] for result in samples])
+        for result in samples:
+            answer_meta = meta[result["answer_attempt_id"]]
+            for profile_subject_id in (None, answer_meta["subject_id"]):
+                profile = get_profile(db, answer_meta["user_id"], profile_subject_id, profiles, create=True)
+                fold_sample(profile, result["metrics"])
+
+    if signatures:
+        db.execute(insert(AnswerSignature), [
+            {
+                "answer_attempt_id": result["answer_attempt_id"],
+                "question_id": meta[result["answer_attempt_id"]]["question_id"],
+                "user_id": meta[result["answer_attempt_id"]]["user_id"],
+                "signature": result["signature"]
+            }
+            for result in signatures
+        ])
+        db.execute(insert(AnswerLSHBucket), [
+            {
+                "answer_attempt_id": result["answer_attempt_id"],
+                "band": band,
+                "question_id": meta[result["answer_attempt_id"]]["question_id"],
+                "bucket": bucket
+            }
+            for result in signatures
+            for band, bucket in enumerate(result["buckets"])
+        ])
+
+    for result in results:
+        if result["term_counts"]:
+            answer_meta = meta[result["answer_attempt_id"]]
+            record_vector_counts(
+                db, result["answer_attempt_id"], answer_meta["question_id"],
+                answer_meta["user_id"], result["term_counts"]
+            )
+
+
+def load_collusion_candidates(db: Session, answer_ids: List[UUID]) -> Dict[UUID, List[Dict]]:
+    """
+    Every answer sharing an LSH bucket with one of the given answers, found
+    with one self-join on answer_lsh_buckets, with signatures and texts loaded
+    in one more query. Keyed by the answer they are candidates for.
+    """
+    own = aliased(AnswerLSHBucket)
+    other = aliased(AnswerLSHBucket)
+    pairs = db.query(own.answer_attempt_id, other.answer_attempt_id).join(
+        other, and_(
+            other.question_id == own.question_id,
+            other.band == own.band,
+            other.bucket == own.bucket,
+            other.answer_attempt_id != own.answer_attempt_id
+        )
+    ).filter(own.answer_attempt_id.in_(answer_ids)).distinct().all()
+    if not pairs:
+        return {}
+
+    candidate_ids = {candidate_id for _, candidate_id in pairs}
+    rows = db.query(
+        AnswerSignature.answer_attempt_id,
+        AnswerSignature.user_id,
+        AnswerSignature.signature,
+        AnswerAttempt.answer_text
+    ).join(
+        AnswerAttempt, AnswerAttempt.id == AnswerSignature.answer_attempt_id
+    ).filter(AnswerSignature.answer_attempt_id.in_(candidate_ids)).all()
+    by_id = {
+        answer_id: {"answer_attempt_id": answer_id, "user_id": user_id,
+                    "signature": signature, "answer_text": answer_text}
+        for answer_id, user_id, signature, answer_text in rows
+    }
+
+    candidates: Dict[UUID, List[Dict]] = {}
+    for answer_id, candidate_id in pairs:
+        if candidate_id in by_id:
+            candidates.setdefault(answer_id, []).append(by_id[candidate_id])
+    return candidates
+
+
+def fetch_rescore_chunk(db: Session, after_id: Optional[UUID], chunk_size: int) -> Dict[str, any]:
+    """Next page of answers, with the style baselines and collusion candidates they need."""
+    rows = _after(db.query(
+        AnswerAttempt.id,
+        AnswerAttempt.assessment_id,
+        AnswerAttempt.question_id,
+        AnswerAttempt.answer_text,
+        AnswerAttempt.progress_percentage,
+        AnswerAttempt.stopped_at_step,
+        AssessmentAttempt.user_id,
+        AssessmentAttempt.subject_id,
+        AssessmentAttempt.started_at
+    ).join(
+        AssessmentAttempt, AssessmentAttempt.id == AnswerAttempt.assessment_id
+    ), after_id, chunk_size)
+
+    answer_ids = [row.id for row in rows]
+    samples = load_samples(db, answer_ids)
+    profiles = load_profiles(db, [row.user_id for row in rows])
+    signatures = dict(db.query(AnswerSignature.answer_attempt_id, AnswerSignature.signature).filter(
+        AnswerSignature.answer_attempt_id.in_(answer_ids)
+    ).all()) if answer_ids else {}
+    candidates = load_collusion_candidates(db, list(signatures))
+    telemetry = load_telemetry_chunks(db, [(row.assessment_id, row.question_id) for row in rows])
+    vectors = {
+        row.answer_attempt_id: row
+        for row in db.query(AnswerVector).filter(AnswerVector.answer_attempt_id.in_(answer_ids)).all()
+    } if answer_ids else {}
+
+    items = []
+    for row in rows:
+        baseline = None
+        if row.answer_text:
+            subject_id = row.subject_id if NLP_STYLE_BASELINE_PER_SUBJECT else None
+            baseline = style_baseline(profiles.get((row.user_id, subject_id)), exclude=samples.get(row.id))
+            baseline["scope"] = "subject" if NLP_STYLE_BASELINE_PER_SUBJECT else "overall"
+        items.append({
+            "answer_attempt_id": row.id,
+            "user_id": row.user_id,
+            "answer_text": row.answer_text or "",
+            "progress_percentage": row.progress_percentage,
+            "stopped_at_step": row.stopped_at_step,
+            "started_at": row.started_at,
+            "telemetry_chunks": telemetry.get((row.assessment_id, row.question_id), []),
+            "style_baseline": baseline,
+            "signature": signatures.get(row.id),
+            "originality_analysis": originality_from_vector(vectors.get(row.id)),
+            "candidates": [
+                candidate for candidate in candidates.get(row.id, [])
+                if candidate["user_id"] != row.user_id
+            ]
+        })
+    return {"last_id": rows[-1].id if rows else None, "items": items}
+
+
+def write_rescore_chunk(db: Session, chunk: Dict[str, any], results: List[Dict[str, any]]):
+    """
+    Bulk-write a chunk's results: new feedback rows in one insert, changed
+    ones in one update by primary key, gap type changes in one topic_stats
+    upsert, and every score in one nlp_analysis upsert.
+    """
+    flagged = {result["answer_attempt_id"]: result["feedback_text"]
+               for result in results if result["feedback_text"]}
+
+    existing = {}
+    if flagged:
+        rows = db.query(Feedback.id, Feedback.answer_attempt_id, Feedback.feedback_text, Feedback.gap_type).filter(
+            Feedback.answer_attempt_id.in_(list(flagged))
+        ).order_by(Feedback.created_at).all()
+        for row in rows:
+            existing.setdefault(row.answer_attempt_id, row)
+
+    inserts = []
+    updates = []
+    gap_changes = {}
+    for answer_id, feedback_text in flagged.items():
+        row = existing.get(answer_id)
+        if row is None:
+            inserts.append({
+                "answer_attempt_id": answer_id,
+                "gap_type": GapType.logic,
+                "feedback_text": feedback_text,
+                "suggested_next_topic": None
+            })
+            gap_changes[answer_id] = None
+        elif row.feedback_text != feedback_text or row.gap_type != GapType.logic:
+            updates.append({"id": row.id, "feedback_text": feedback_text, "gap_type": GapType.logic})
+            if row.gap_type != GapType.logic:
+                gap_changes[answer_id] = row.gap_type
+    if inserts:
+        db.execute(insert(Feedback), inserts)
+    if updates:
+        db.execute(update(Feedback), updates)
+
+    if gap_changes:
+        topic_deltas = {}
+        for answer_id, topic_id in db.query(AnswerAttempt.id, Question.topic_id).join(
+            Question, Question.id == AnswerAttempt.question_id
+        ).filter(AnswerAttempt.id.in_(list(gap_changes))).all():
+            gap_change(topic_deltas, topic_id, gap_changes[answer_id], GapType.logic)
+        apply_topic_deltas(db, topic_deltas)
+
+    save_nlp_analyses(db, [
+        {key: result[key] for key in
+         ("answer_attempt_id", "user_id", "originality_score", "confidence_score", "risk_flag")}
+        for result in results
+    ])
+
+
+PHASE_STEPS = {
+    "index": (fetch_index_chunk, index_chunk, write_index_chunk),
+    "rescore": (fetch_rescore_chunk, rescore_chunk, write_rescore_chunk)
+}
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint and driver
+# ---------------------------------------------------------------------------
+
+def load_checkpoint(path: str, version: str) -> Optional[Dict[str, any]]:
+    """The saved checkpoint, or None if there is none for this analyzer version."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("analyzer_version") != version:
+        logger.info(f"Ignoring checkpoint for analyzer version {checkpoint.get('analyzer_version')}")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, any]):
+    """Write the checkpoint atomically, so a crash never leaves it half-written."""
+    checkpoint["updated_at"] = datetime.utcnow().isoformat()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def run_phase(db: Session, phase: str, checkpoint: Dict[str, any], checkpoint_path: str,
+              pool: Optional[ProcessPoolExecutor], workers: int, chunk_size: int):
+    """
+    Stream one phase's chunks through the pool. Up to 2 * workers chunks are
+    in flight; results are written in chunk order, so the checkpoint only
+    ever advances past committed answers.
+    """
+    fetch, analyze, write = PHASE_STEPS[phase]
+    last_id = UUID(checkpoint["last_id"]) if checkpoint.get("last_id") else None
+    started = time.perf_counter()
+    processed = 0
+    pending = deque()
+    exhausted = False
+
+    while pending or not exhausted:
+        while not exhausted and len(pending) < max(1, workers * 2):
+            chunk = fetch(db, last_id, chunk_size)
+            if chunk["last_id"] is None:
+                exhausted = True
+                break
+            last_id = chunk["last_id"]
+            if pool is None:
+                pending.append((chunk, analyze(chunk["items"])))
+            else:
+                pending.append((chunk, pool.submit(analyze, chunk["items"])))
+        if not pending:
+            break
+
+        chunk, outcome = pending.popleft()
+        results = outcome if pool is None else outcome.result()
+        write(db, chunk, results)
+        db.commit()
+
+        processed += len(results)
+        checkpoint["processed"] = checkpoint.get("processed", 0) + len(results)
+        checkpoint["last_id"] = str(chunk["last_id"])
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"{phase}: {processed} answers in {elapsed:.1f}s ({processed / elapsed:.0f}/s)")
+
+    logger.info(f"{phase} complete: {processed} answers")
+
+
+def reanalyze(workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              checkpoint_path: str = DEFAULT_CHECKPOINT, restart: bool = False,
+              skip_index: bool = False):
+    """Run (or resume) both phases over every stored answer."""
+    version = analyzer_version()
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, version)
+    if checkpoint is None:
+        checkpoint = {"analyzer_version": version, "phase": PHASES[0], "last_id": None, "processed": 0}
+    if checkpoint["phase"] == "done":
+        logger.info(f"Re-analysis for analyzer version {version} already complete (use --restart to run again)")
+        return
+
+    logger.info(f"Re-analyzing answers with analyzer version {version}, {workers} worker(s), "
+                f"chunks of {chunk_size}, resuming at {checkpoint['phase']}/{checkpoint['last_id']}")
+
+    db: Session = SessionLocal()
+    # spawn: workers must not inherit the parent's database connections
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) if workers > 1 else None
+    try:
+        for phase in PHASES[PHASES.index(checkpoint["phase"]):]:
+            if phase == "index" and skip_index:
+                logger.info("Skipping index phase")
+            else:
+                run_phase(db, phase, checkpoint, checkpoint_path, pool, workers, chunk_size)
+            next_phase = PHASES.index(phase) + 1
+            checkpoint["phase"] = PHASES[next_phase] if next_phase < len(PHASES) else "done"
+            checkpoint["last_id"] = None
+            save_checkpoint(checkpoint_path, checkpoint)
+        logger.info(f"Re-analysis complete: {checkpoint['processed']} answers processed")
+    except Exception as e:
+        logger.error(f"Re-analysis stopped, resume from checkpoint {checkpoint_path}: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-analyze every stored answer with the current NLP analyzers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="analysis processes (1 runs in the main process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="answers per read, analysis task and commit")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT,
+                        help="checkpoint file used to resume an interrupted run")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint and start from the first answer")
+    parser.add_argument("--skip-index", action="store_true",
+                        help="skip backfilling style samples and signatures")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    reanalyze(args.workers, args.chunk_size, args.checkpoint, args.restart, args.skip_index)
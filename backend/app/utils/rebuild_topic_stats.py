@@ -0,0 +1,41 @@
+"""
+Rebuild the topic_stats Rollup
+
+Recomputes every topic's counters (answers, failures, capability levels,
+feedback gap types) from the source tables in one transaction. Run it once
+after deploying the table, since existing data is not counted until then,
+or whenever the rollup is suspected to have drifted.
+
+Usage:
+    python -m app.utils.rebuild_topic_stats
+"""
+
+import logging
+import time
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal, engine
+from app.db.base import Base
+from app.analytics.topic_stats import rebuild_topic_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild():
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        topics = rebuild_topic_stats(db)
+        db.commit()
+        logger.info(f"Rebuilt topic_stats for {topics} topics in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"Error rebuilding topic_stats: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    rebuild()
@@ -7,6 +7,11 @@ from app.models.subject import Subject
 from app.models.topic import Topic
 from app.models.question import Question, CognitiveType
 from app.models.capability import CapabilityScore
+from app.models.topic_stats import TopicStats
+from app.models.capability_history import CapabilityHistory
+from app.analytics.topic_stats import apply_topic_deltas, capability_change
+from app.analytics.capability_history import save_capability_changes
+from app.analytics.leaderboard import refresh_students
 from app.auth.auth_utils import get_password_hash
 
 logging.basicConfig(level=logging.INFO)
@@ -151,7 +156,8 @@ def seed_demo_data():
             else:
                 logger.info(f"Questions already exist for topic: {topic.name}")
         
-        # Create capability scores for students
+        # Create capability scores for students (counted in topic_stats, logged in capability_history)
+        changes = []
         for student in students:
             for topic in topics:
                 capability = db.query(CapabilityScore).filter(
@@ -172,8 +178,9 @@ def seed_demo_data():
                         streak=0
                     )
                     db.add(capability)
+                    changes.append((student.id, topic.id, None, initial_score, 0))
         
-        db.commit()
+        save_capability_changes(db, changes)
         logger.info("Created capability scores for students")
         
         logger.info("Demo data seeding completed successfully!")
@@ -199,11 +206,20 @@ def clear_demo_data():
             "charlie.demo@gradientiq.com"
         ]
         
+        topic_deltas = {}
+        removed_ids = []
         for email in demo_emails:
             user = db.query(User).filter(User.email == email).first()
             if user:
+                removed_ids.append(user.id)
+                for topic_id, capability_level in db.query(
+                    CapabilityScore.topic_id, CapabilityScore.capability_level
+                ).filter(CapabilityScore.user_id == user.id).all():
+                    capability_change(topic_deltas, topic_id, capability_level, None)
                 db.query(CapabilityScore).filter(CapabilityScore.user_id == user.id).delete()
+                db.query(CapabilityHistory).filter(CapabilityHistory.user_id == user.id).delete()
                 db.delete(user)
+        apply_topic_deltas(db, topic_deltas)
         
         demo_subjects = ["Coding", "Physics", "Cryptography"]
         for subject_name in demo_subjects:
@@ -212,10 +228,15 @@ def clear_demo_data():
                 topics = db.query(Topic).filter(Topic.subject_id == subject.id).all()
                 for topic in topics:
                     db.query(Question).filter(Question.topic_id == topic.id).delete()
+                    db.query(TopicStats).filter(TopicStats.topic_id == topic.id).delete()
+                    db.query(CapabilityHistory).filter(CapabilityHistory.topic_id == topic.id).delete()
                     db.delete(topic)
                 db.delete(subject)
         
         db.commit()
+        # Removed students leave the leaderboards (their history is deleted, not appended to,
+        # so this does not go through save_capability_changes)
+        refresh_students(db, removed_ids)
         logger.info("Demo data cleared successfully!")
         
     except Exception as e:
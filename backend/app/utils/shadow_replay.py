@@ -0,0 +1,160 @@
+"""
+Shadow Replay
+
+Replays every stored answer through the current risk scoring and a
+candidate one (see app/nlp/shadow.py) and reports what would change,
+without writing anything: the risk flag transition matrix, the
+distributions of originality and confidence score deltas, feedback text
+changes, and the throughput of each analyzer.
+
+Answers are read exactly as in the rescore phase of app.utils.reanalyze
+(keyset-paginated chunks, set-based loads in the main process, analysis in
+a process pool), so a replay sees the same inputs a re-analysis would. The
+analyses are computed once per answer and scored by both configurations.
+
+Usage:
+    python -m app.utils.shadow_replay --candidate <module> [--workers N]
+                                      [--chunk-size N] [--limit N] [--output PATH]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
+from app.nlp.shadow import ShadowComparison, current_scoring, load_candidate, score
+from app.nlp.stage_timing import enable_stage_timing, record
+from app.utils.reanalyze import DEFAULT_CHUNK_SIZE, analyze_rescore_item, fetch_rescore_chunk
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "shadow_report.json"
+
+
+def replay_chunk(items: List[Dict[str, any]], candidate_path: str) -> Tuple[ShadowComparison, Dict[str, List[float]]]:
+    """Comparison of a chunk's answers and its per-stage [wall_ms, cpu_ms, count] totals."""
+    enable_stage_timing()
+    current = current_scoring()
+    candidate = load_candidate(candidate_path)
+    comparison = ShadowComparison()
+    with record() as timer:
+        for item in items:
+            analyses = analyze_rescore_item(item)
+            comparison.add(
+                item["answer_attempt_id"],
+                score(current, "current", *analyses),
+                score(candidate, "candidate", *analyses)
+            )
+    return comparison, timer.stages
+
+
+def throughput_report(stages: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Calls, total and mean wall/CPU time, and calls per second of wall time for each stage."""
+    return {
+        name: {
+            "count": count,
+            "wall_ms": round(wall_ms, 3),
+            "cpu_ms": round(cpu_ms, 3),
+            "mean_ms": round(wall_ms / count, 4),
+            "per_second": round(count / (wall_ms / 1000), 1) if wall_ms else None
+        }
+        for name, (wall_ms, cpu_ms, count) in sorted(stages.items())
+    }
+
+
+def shadow_replay(candidate_path: str, workers: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  limit: Optional[int] = None) -> Dict[str, any]:
+    """
+    Stream answers in id order through replay_chunk, up to 2 * workers
+    chunks in flight, and return the combined report. Stops after about
+    limit answers (whole chunks) when given.
+    """
+    load_candidate(candidate_path)  # fail before reading anything
+    logger.info(f"Replaying answers against candidate {candidate_path}, {workers} worker(s), chunks of {chunk_size}")
+
+    comparison = ShadowComparison()
+    stages: Dict[str, List[float]] = {}
+    started = time.perf_counter()
+    processed = 0
+    fetched = 0
+    last_id = None
+    pending = deque()
+    exhausted = False
+
+    db: Session = SessionLocal()
+    # spawn: workers must not inherit the parent's database connections
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) if workers > 1 else None
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max(1, workers * 2):
+                size = chunk_size if limit is None else min(chunk_size, limit - fetched)
+                chunk = fetch_rescore_chunk(db, last_id, size) if size > 0 else {"last_id": None}
+                if chunk["last_id"] is None:
+                    exhausted = True
+                    break
+                last_id = chunk["last_id"]
+                fetched += len(chunk["items"])
+                if pool is None:
+                    pending.append(replay_chunk(chunk["items"], candidate_path))
+                else:
+                    pending.append(pool.submit(replay_chunk, chunk["items"], candidate_path))
+            # Nothing is written: release the read transaction between chunks
+            db.rollback()
+            if not pending:
+                break
+
+            outcome = pending.popleft()
+            chunk_comparison, chunk_stages = outcome if pool is None else outcome.result()
+            comparison.merge(chunk_comparison)
+            for name, (wall_ms, cpu_ms, count) in chunk_stages.items():
+                totals = stages.setdefault(name, [0.0, 0.0, 0])
+                totals[0] += wall_ms
+                totals[1] += cpu_ms
+                totals[2] += count
+
+            processed = sum(comparison.transitions.values())
+            elapsed = time.perf_counter() - started
+            logger.info(f"replay: {processed} answers in {elapsed:.1f}s ({processed / elapsed:.0f}/s)")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        db.close()
+
+    report = comparison.report()
+    report["candidate"] = candidate_path
+    report["elapsed_s"] = round(time.perf_counter() - started, 3)
+    report["throughput"] = throughput_report(stages)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the current risk scoring with a candidate over every stored answer, without writing."
+    )
+    parser.add_argument("--candidate", required=True,
+                        help="import path of a module defining calculate_risk_score and/or generate_feedback_text")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="analysis processes (1 runs in the main process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="answers per read and analysis task")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="replay only the first N answers")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="file the JSON report is written to")
+    args = parser.parse_args()
+
+    result = shadow_replay(args.candidate, args.workers, args.chunk_size, args.limit)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"{result['answers']} answers: {result['flipped']} flags flipped "
+                f"({result['escalated']} up, {result['deescalated']} down), "
+                f"{sum(result['feedback'].values())} feedback texts changed; report written to {args.output}")
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from app.analytics import analytics_service
+from app.assessment import assessment_service
+from app.nlp.nlp_service import analyze_answer_attempt
+from app.utils.explain_check import ANSWER_TEXT, seed
+
+# get_student_detail: student with capabilities, recent feedback, gap counts,
+# weekly trends (NLP scores and daily rollup in one UNION ALL)
+STUDENT_DETAIL_MAX_QUERIES = 4
+# get_student_self_insights: student with capabilities, capability growth,
+# answer aggregates, recommended topics
+SELF_INSIGHTS_MAX_QUERIES = 4
+
+
+@contextmanager
+def counted_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def student_id(db):
+    """A student with capability scores and an analyzed answer."""
+    fixtures = seed(db)
+    student_id, subject_id = fixtures["student"].id, fixtures["subject"].id
+    assessment, question = assessment_service.start_assessment(db, student_id, subject_id)
+    answer, _ = assessment_service.submit_answer(db, assessment.id, question.id, ANSWER_TEXT, 100, None)
+    analyze_answer_attempt(answer.id, db)
+    return student_id
+
+
+def test_student_detail_query_count(engine, db, student_id):
+    with counted_statements(engine) as statements:
+        detail = analytics_service.get_student_detail(db, student_id)
+    assert len(statements) <= STUDENT_DETAIL_MAX_QUERIES
+    assert len(detail.topic_capabilities) == 2
+    assert len(detail.accuracy_trend) == len(detail.originality_trend) == analytics_service.TREND_WEEKS
+
+
+def test_student_self_insights_query_count(engine, db, student_id):
+    with counted_statements(engine) as statements:
+        insights = analytics_service.get_student_self_insights(db, student_id)
+    assert len(statements) <= SELF_INSIGHTS_MAX_QUERIES
+    assert insights.learning_wheel.accuracy >= 0
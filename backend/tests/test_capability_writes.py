@@ -0,0 +1,31 @@
+from app.analytics.analytics_service import get_student_detail
+from app.analytics.capability_history import save_capability_changes
+from app.analytics.leaderboard import GLOBAL_SCOPE, get_board, rebuild_leaderboards
+from app.analytics.result_cache import cached
+from app.models.capability import CapabilityScore
+from app.utils.explain_check import seed
+
+
+def test_capability_changes_invalidate_analytics_and_leaderboards(db):
+    fixtures = seed(db)
+    student_id, topic_id = fixtures["student"].id, fixtures["topic"].id
+    rebuild_leaderboards(db)
+
+    def student_detail():
+        return cached(
+            "faculty_student_detail", student_id, ("capabilities", "feedback"),
+            lambda: get_student_detail(db, student_id)
+        )
+
+    assert student_detail().overall_capability_score == 50.0
+
+    score = db.query(CapabilityScore).filter(
+        CapabilityScore.user_id == student_id,
+        CapabilityScore.topic_id == topic_id
+    ).one()
+    score.capability_level = 90
+    save_capability_changes(db, [(student_id, topic_id, 50, 90, 0)])
+
+    # Cached detail recomputed, and the student re-placed on the board held in memory
+    assert student_detail().overall_capability_score == 70.0
+    assert get_board(db, GLOBAL_SCOPE).entries[student_id][1] == 70.0
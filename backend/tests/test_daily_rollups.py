@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import sessionmaker
+from app.analytics import daily_rollups
+from app.assessment import assessment_service
+from app.models.daily_rollup import StudentTopicDaily
+from app.utils import background_jobs
+from app.utils.explain_check import ANSWER_TEXT, seed
+
+
+def test_scheduler_rolls_up_at_startup(engine, db, monkeypatch):
+    fixtures = seed(db)
+    student_id, subject_id = fixtures["student"].id, fixtures["subject"].id
+    assessment, question = assessment_service.start_assessment(db, student_id, subject_id)
+    answer, _ = assessment_service.submit_answer(db, assessment.id, question.id, ANSWER_TEXT, 100, None)
+    answer.submitted_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    monkeypatch.setattr(background_jobs, "SessionLocal", sessionmaker(bind=engine))
+    background_jobs.start_background_jobs([("daily rollups", 3600, background_jobs.rollups_job)])
+    # The first run starts immediately; stopping waits for it
+    background_jobs.stop_background_jobs()
+
+    rows = db.query(StudentTopicDaily).filter(StudentTopicDaily.user_id == student_id).all()
+    assert [(row.attempts, row.progress_sum) for row in rows] == [(1, 100)]
+
+
+def test_run_is_dropped_when_the_watermark_moved(db, monkeypatch):
+    fixtures = seed(db)
+    student_id, subject_id = fixtures["student"].id, fixtures["subject"].id
+    assessment, question = assessment_service.start_assessment(db, student_id, subject_id)
+    answer, _ = assessment_service.submit_answer(db, assessment.id, question.id, ANSWER_TEXT, 100, None)
+    answer.submitted_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    # Another run moves the watermark while this one aggregates its window
+    aggregate_answers = daily_rollups.aggregate_answers
+
+    def concurrent_run(session, start, end):
+        aggregated = aggregate_answers(session, start, end)
+        session.query(daily_rollups.RollupWatermark).update(
+            {daily_rollups.RollupWatermark.processed_until: end}, synchronize_session=False
+        )
+        return aggregated
+
+    monkeypatch.setattr(daily_rollups, "aggregate_answers", concurrent_run)
+    totals = daily_rollups.run_daily_rollups(db)
+
+    assert totals["answers"] == 0
+    assert db.query(StudentTopicDaily).count() == 0
@@ -0,0 +1,5 @@
+from app.utils.explain_check import run_check
+
+
+def test_hot_paths_do_not_scan_hot_tables():
+    assert run_check() == []
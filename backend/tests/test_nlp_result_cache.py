@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+from app.models.nlp_result_cache import NLPResultCache
+from app.nlp import result_cache
+
+
+def store(db, text, version, age_days=0):
+    key = result_cache.make_key(text, version, "empty")
+    result_cache.put(db, key, {"text": text})
+    db.flush()
+    if age_days:
+        row = db.get(NLPResultCache, key["cache_key"])
+        row.created_at = datetime.utcnow() - timedelta(days=age_days)
+    db.commit()
+    return key["cache_key"]
+
+
+def test_prune_deletes_old_versions_and_expired_rows(db):
+    kept = [store(db, "current", "v2"), store(db, "current full", "v2+full")]
+    store(db, "old version", "v1")
+    store(db, "expired", "v2", age_days=40)
+
+    assert result_cache.get_cache_stats(db)["db_entries"] == 4
+    assert result_cache.prune_result_cache(db, ("v2", "v2+full"), max_age_days=30) == 2
+    assert sorted(key for (key,) in db.query(NLPResultCache.cache_key)) == sorted(kept)
+    assert result_cache.get_cache_stats(db)["db_entries"] == 2
@@ -0,0 +1,49 @@
+import math
+from datetime import datetime
+from uuid import uuid4
+from app.models.answer_signature import AnswerLSHBucket
+from app.models.answer_vector import AnswerVector, QuestionCorpus, QuestionTerm
+from app.nlp import originality
+from app.nlp.tfidf import term_counts, vector_from_bytes
+from app.utils.explain_check import ANSWER_TEXT
+
+OTHER_TEXT = "Photosynthesis turns light, water and carbon dioxide into glucose and oxygen inside chloroplasts."
+
+
+def record(db, question_id, text, bucket=None):
+    answer_id = uuid4()
+    if bucket is not None:
+        db.add(AnswerLSHBucket(answer_attempt_id=answer_id, band=0, question_id=question_id, bucket=bucket))
+    row = originality.record_vector_counts(db, answer_id, question_id, uuid4(), term_counts(text.lower()))
+    db.flush()
+    return row
+
+
+def test_lsh_candidates_are_compared_beyond_the_recent_window(db, monkeypatch):
+    monkeypatch.setattr(originality, "ORIGINALITY_NEIGHBOR_WINDOW", 1)
+    question_id = uuid4()
+    copied = record(db, question_id, ANSWER_TEXT, bucket=7)
+    copied.created_at = datetime(2020, 1, 1)
+    recent = record(db, question_id, OTHER_TEXT)
+    recent.created_at = datetime(2030, 1, 1)
+    db.flush()
+
+    # The copied answer is older than the window: only found through its bucket
+    assert record(db, question_id, ANSWER_TEXT, bucket=8).nearest_similarity < 0.5
+    assert record(db, question_id, ANSWER_TEXT, bucket=7).nearest_similarity > 0.9
+
+
+def test_corpus_statistics_match_the_recorded_vectors(db):
+    question_id = uuid4()
+    for text in (ANSWER_TEXT, OTHER_TEXT, ANSWER_TEXT):
+        record(db, question_id, text)
+
+    corpus = db.get(QuestionCorpus, question_id)
+    assert corpus.doc_count == 3
+    centroid = {}
+    for row in db.query(AnswerVector).filter(AnswerVector.question_id == question_id):
+        for term, weight in zip(*vector_from_bytes(row.vector)):
+            centroid[term] = centroid.get(term, 0.0) + weight
+    assert math.isclose(corpus.centroid_norm_sq, sum(weight * weight for weight in centroid.values()), rel_tol=1e-6)
+    weight_sums = dict(db.query(QuestionTerm.term, QuestionTerm.weight_sum).filter(QuestionTerm.question_id == question_id))
+    assert all(math.isclose(weight_sums[term], weight, rel_tol=1e-6) for term, weight in centroid.items())
@@ -0,0 +1,45 @@
+from app.assessment import assessment_service
+from app.models.answer_signature import AnswerSignature
+from app.models.answer_vector import AnswerVector
+from app.models.style_profile import StyleSample
+from app.nlp import nlp_service
+from app.utils.explain_check import ANSWER_TEXT, seed
+
+
+def submit(db):
+    fixtures = seed(db)
+    assessment, question = assessment_service.start_assessment(db, fixtures["student"].id, fixtures["subject"].id)
+    answer, _ = assessment_service.submit_answer(db, assessment.id, question.id, ANSWER_TEXT, 100, None)
+    return answer.id
+
+
+def indexed(db, answer_id):
+    return [db.get(model, answer_id) is not None for model in (StyleSample, AnswerSignature, AnswerVector)]
+
+
+def test_submit_records_answer_indexes(db, monkeypatch):
+    monkeypatch.setattr(assessment_service, "NLP_ASYNC_MODE", False)
+    assert indexed(db, submit(db)) == [True, True, True]
+
+
+def test_async_submit_leaves_answer_indexes_to_the_analysis_job(db, monkeypatch):
+    monkeypatch.setattr(assessment_service, "NLP_ASYNC_MODE", True)
+    scheduled = []
+    monkeypatch.setattr(assessment_service, "schedule_answer_analysis", lambda db, answer_id: scheduled.append(answer_id))
+    answer_id = submit(db)
+    assert scheduled == [answer_id]
+    assert indexed(db, answer_id) == [False, False, False]
+
+    # What the job runs records all three
+    assessment_service.analyze_answer_attempt(answer_id, db)
+    assert indexed(db, answer_id) == [True, True, True]
+
+
+def test_answer_analysis_runs_every_analyzer_in_full(db, monkeypatch):
+    monkeypatch.setattr(assessment_service, "NLP_ASYNC_MODE", False)
+    modes = []
+    cache_key = nlp_service.writing_analysis_cache_key
+    monkeypatch.setattr(nlp_service, "writing_analysis_cache_key",
+                        lambda text, baseline, full: modes.append(full) or cache_key(text, baseline, full))
+    assessment_service.analyze_answer_attempt(submit(db), db)
+    assert modes == [True]